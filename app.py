@@ -3,29 +3,96 @@ Food Tracker - Main Flask Application
 Simplified food detection and calorie tracking using YOLOv8
 """
 import os
-from flask import Flask, render_template, Response, jsonify, request
-import cv2
+import hmac
+import math
+from flask import Flask, render_template, Response, jsonify, request, g
 import json
 from datetime import datetime
-import time
 
 # Import our custom modules
 from config import Config
 from utils.food_detector import FoodDetector
 from utils.calorie_mapper import CalorieMapper
-from utils.file_handler import FileHandler
+from utils.partitions import PartitionRegistry, PartitionError, partition_path
+from utils.storage import empty_summary
+from utils.camera_registry import CameraRegistry
+from utils.event_bus import EventBus, format_sse
+from utils.batch_detection import UploadError, read_uploaded_images, detect_uploaded_images
+from utils.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.export import EXPORT_FORMATS, iter_export
+from utils.profiler import Span, SamplingProfiler, ProfilerBusy
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Initialize components
+event_bus = EventBus()
 food_detector = FoodDetector()
 calorie_mapper = CalorieMapper()
-file_handler = FileHandler()
 
-# Global variables for real-time detection
-pending_detections = []
+def publish_storage_event(partition_id, event, record):
+    """Push a logged or deleted item and the new daily totals to the partition's event subscribers"""
+    event_bus.publish(event, record, topic=partition_id)
+    event_bus.publish('daily_summary', partitions.get(partition_id).get_daily_summary(), topic=partition_id)
+
+# Detection history, one database per user or station
+partitions = PartitionRegistry(on_change=publish_storage_event)
+
+# Header naming the user or station a request belongs to, the 'user' query parameter also works
+USER_HEADER = 'X-User-Id'
+
+def request_partition():
+    """User or station ID of the current request"""
+    return request.headers.get(USER_HEADER) or request.args.get('user') or Config.DEFAULT_USER_ID
+
+def user_file_handler(create=False):
+    """
+    FileHandler of the current request's user or station
+    
+    Only writes create a partition, so read requests for made-up IDs don't leave files behind.
+    
+    Returns:
+        FileHandler: The partition's handler, or None if it doesn't exist and create is False
+    """
+    return partitions.get(request_partition(), create=create)
+
+# Stack sampler behind /admin/profile, idle until a capture is requested
+profiler = SamplingProfiler()
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+
+# Global variables for real-time detection, per camera id
+pending_detections = {}
+
+# Multipart header sent before every JPEG frame
+FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+# Metrics exposed at /metrics
+STREAM_CLIENTS = REGISTRY.gauge('stream_clients', 'Clients currently watching /video_feed')
+FRAMES_SENT = REGISTRY.counter('stream_frames_sent_total', 'Frames sent to /video_feed clients')
+REGISTRY.gauge('pending_detections', 'Detections waiting for confirmation').set_function(
+    lambda: sum(len(detections) for detections in list(pending_detections.values()))
+)
+REGISTRY.gauge('tracked_objects', 'Objects currently tracked across all cameras').set_function(
+    lambda: camera_registry.tracked_objects()
+)
+
+@app.before_request
+def start_request_span():
+    """Time every request and mark it in sampled stacks while profiling is on"""
+    if Config.PROFILING:
+        g.request_span = Span(f"request.{request.endpoint}")
+        g.request_span.start()
+
+@app.teardown_request
+def stop_request_span(exc):
+    span = g.pop('request_span', None)
+    if span is not None:
+        span.stop()
+
+@app.errorhandler(PartitionError)
+def invalid_partition(e):
+    return jsonify({'success': False, 'error': str(e)}), 400
 
 @app.route('/')
 def index():
@@ -33,114 +100,280 @@ def index():
     return render_template('index.html')
 
 @app.route('/detect')
-def detect():
+@app.route('/detect/<camera_id>')
+def detect(camera_id=Config.DEFAULT_CAMERA_ID):
     """Food detection page"""
-    global camera_active, pending_detections
+    global camera_active
+    if camera_registry.get(camera_id) is None:
+        return jsonify({'success': False, 'error': f'Unknown camera: {camera_id}'}), 404
     camera_active = True  # Reset camera state
-    pending_detections = []  # Clear pending detections
-    return render_template('detect.html')
+    pending_detections[camera_id] = []  # Clear pending detections
+    event_bus.publish('pending', _pending_event(camera_id))
+    return render_template('detect.html', camera_id=camera_id, camera_ids=camera_registry.ids())
 
 @app.route('/video_feed')
-def video_feed():
+@app.route('/video_feed/<camera_id>')
+def video_feed(camera_id=Config.DEFAULT_CAMERA_ID):
     """Clean video streaming route - no overlays"""
+    camera_hub = camera_registry.get(camera_id)
+    if camera_hub is None:
+        return jsonify({'error': f'Unknown camera: {camera_id}'}), 404
     try:
         return Response(
-            generate_frames(),
+            generate_frames(camera_hub),
             mimetype='multipart/x-mixed-replace; boundary=frame'
         )
     except Exception as e:
         print(f"Error in video_feed route: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def generate_frames():
+def generate_frames(camera_hub):
     """Generate clean video frames without overlays"""
-    global pending_detections
-    
-    cap = cv2.VideoCapture(Config.CAMERA_INDEX)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, Config.FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, Config.FRAME_HEIGHT)
-    
+    STREAM_CLIENTS.inc()
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Run detection but don't draw on frame
-            _, _, new_pending = food_detector.detect_food(frame, draw_on_frame=False)
-            
-            # Update pending detections
-            if new_pending:
-                pending_detections = new_pending
-            
-            # Encode frame to JPEG
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            
-            # Yield the frame for streaming
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                   
-            # Slow down the frame rate a bit
-            time.sleep(0.03)
+        for frame_bytes in camera_hub.stream():
+            # Yield the shared frame bytes as-is instead of concatenating a copy per client
+            yield FRAME_HEADER
+            yield frame_bytes
+            yield b'\r\n'
+            FRAMES_SENT.inc()
             
     except Exception as e:
         print(f"Error in generate_frames: {str(e)}")
     finally:
-        cap.release()
+        STREAM_CLIENTS.dec()
+
+def update_pending_detections(camera_id, new_pending):
+    """Store the latest pending detections of a camera from the inference stage"""
+    if not new_pending:
+        return
+    
+    # Only push an event when the set of pending items changed
+    previous = pending_detections.get(camera_id, [])
+    pending_detections[camera_id] = new_pending
+    if _pending_signature(new_pending) != _pending_signature(previous):
+        event_bus.publish('pending', _pending_event(camera_id))
+
+def _pending_event(camera_id):
+    """Payload of a pending event for one camera"""
+    return {'camera_id': camera_id, 'detections': pending_detections.get(camera_id, [])}
+
+def _pending_signature(detections):
+    """Identify pending detections by track and food, ignoring box jitter"""
+    return [(d.get('track_id'), d['food']) for d in detections]
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def _parse_log_request(data):
+    """
+    Check the body of a /log_detection request
+    
+    Returns:
+        tuple: (food, confidence, bbox or None, frame_size or None)
+    
+    Raises:
+        ValueError: If a field has the wrong type or shape
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    food_item = data.get('food')
+    if not food_item:
+        raise ValueError('No food item specified')
+    if not isinstance(food_item, str):
+        raise ValueError('food must be a string')
+    confidence = data.get('confidence', 0.0)
+    if not _is_number(confidence):
+        raise ValueError('confidence must be a number')
+    
+    bbox = data.get('bbox')
+    if bbox is not None:
+        if not isinstance(bbox, list) or len(bbox) != 4 or not all(_is_number(v) for v in bbox):
+            raise ValueError('bbox must be a list of 4 numbers')
+        if bbox[2] <= bbox[0] or bbox[3] <= bbox[1]:
+            raise ValueError('bbox must satisfy x2 > x1 and y2 > y1')
+    
+    frame_size = data.get('frame_size')
+    if frame_size is not None:
+        if (not isinstance(frame_size, list) or len(frame_size) != 2
+                or not all(isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in frame_size)):
+            raise ValueError('frame_size must be a list of 2 positive integers')
+    return food_item, confidence, bbox, frame_size
+
+# Configured cameras, each shared by every client watching its /video_feed
+camera_registry = CameraRegistry(food_detector, on_pending=update_pending_detections)
+
+@app.route('/cameras')
+def cameras():
+    """List the configured camera ids"""
+    return jsonify({'cameras': camera_registry.ids()})
+
+@app.route('/pipeline_stats')
+def pipeline_stats():
+    """Get inference batching and per-camera stage FPS and queue depth"""
+    return jsonify(camera_registry.stats())
+
+@app.route('/result_cache')
+def result_cache():
+    """Get hit rate and memory use of the detection result cache"""
+    cache = food_detector.result_cache
+    return jsonify({'enabled': cache is not None, **(cache.stats() if cache is not None else {})})
+
+@app.route('/stream_settings')
+def stream_settings():
+    """Get the inference size, JPEG quality and stride chosen by the adaptive controller"""
+    return jsonify(camera_registry.settings())
+
+@app.route('/metrics')
+def metrics():
+    """Counters, gauges and latency histograms in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype=METRICS_CONTENT_TYPE)
+
+@app.route('/events')
+def events():
+    """Server-Sent Events stream of pending detections, logged items and daily totals"""
+    partition_id = request_partition()
+    partition_path(partition_id)  # reject a malformed ID before the stream starts
+    return Response(
+        generate_events(partition_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def generate_events(partition_id=None):
+    """Send the current state, then every change as it happens"""
+    yield from event_bus.subscribe(
+        topic=partition_id or Config.DEFAULT_USER_ID,
+        initial=lambda: initial_events(partition_id)
+    )
+
+def initial_events(partition_id=None):
+    """Messages that bring a new event subscriber of a user or station up to date"""
+    handler = partitions.get(partition_id, create=False)
+    yield format_sse('daily_summary', handler.get_daily_summary() if handler is not None else empty_summary())
+    for camera_id in camera_registry.ids():
+        yield format_sse('pending', _pending_event(camera_id))
 
 @app.route('/get_pending_detections')
 def get_pending_detections():
-    """Get current pending detections"""
-    global pending_detections
+    """Get current pending detections of a camera"""
+    camera_id = request.args.get('camera_id', Config.DEFAULT_CAMERA_ID)
     return jsonify({
-        'detections': pending_detections
+        'camera_id': camera_id,
+        'detections': pending_detections.get(camera_id, [])
     })
 
 @app.route('/log_detection', methods=['POST'])
 def log_detection():
     """Log a detected food item"""
-    data = request.json
-    food_item = data.get('food')
-    confidence = data.get('confidence', 0.0)
-    
-    if not food_item:
-        return jsonify({'success': False, 'error': 'No food item specified'}), 400
+    try:
+        food_item, confidence, bbox, frame_size = _parse_log_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    # Get calories for this food
-    calories = calorie_mapper.get_calories(food_item)
+    # Estimate calories from the box size when the client sends it
+    nutrition = calorie_mapper.get_nutrition(food_item, bbox, frame_size)
+    calories = nutrition['calories']
     
     # Log the detection
-    file_handler.log_detection(food_item, confidence, calories)
+    record = user_file_handler(create=True).log_detection(food_item, confidence, calories)
     
     return jsonify({
         'success': True,
+        'id': record['id'],
         'food': food_item,
-        'calories': calories
+        'calories': calories,
+        'nutrition': nutrition
+    })
+
+@app.route('/detect_images', methods=['POST'])
+def detect_images():
+    """Detect food in uploaded images (multipart files or a zip archive)"""
+    try:
+        items = read_uploaded_images(request)
+    except UploadError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if not items:
+        return jsonify({'success': False, 'error': 'No images uploaded'}), 400
+    
+    images, batch_count = detect_uploaded_images(food_detector, calorie_mapper, items)
+    
+    return jsonify({
+        'success': True,
+        'images': images,
+        'batches': batch_count
     })
 
 @app.route('/get_daily_summary')
 def get_daily_summary():
     """Get today's summary"""
-    summary = file_handler.get_daily_summary()
+    handler = user_file_handler()
+    summary = handler.get_daily_summary() if handler is not None else empty_summary()
     return jsonify(summary)
 
 @app.route('/get_todays_items')
 def get_todays_items():
     """Get all food items logged today"""
-    items = file_handler.get_todays_detections()
+    handler = user_file_handler()
+    items = handler.get_todays_detections() if handler is not None else []
     return jsonify({'items': items})
 
 @app.route('/get_recent_detections')
 def get_recent_detections():
     """Get recent detections"""
-    items = file_handler.get_recent_detections(10)
+    handler = user_file_handler()
+    items = handler.get_recent_detections(10) if handler is not None else []
     return jsonify({'items': items})
 
+@app.route('/history')
+def history():
+    """Page through logged detections, newest first, filtered by date range and food"""
+    handler = user_file_handler()
+    if handler is None:
+        return jsonify({'items': [], 'next_cursor': None})
+    try:
+        items, next_cursor = handler.query_history(
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            food=request.args.get('food'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+@app.route('/export_data')
+def export_data():
+    """Stream the detection history as CSV or JSON Lines"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f'Unsupported format: {export_format}'}), 400
+    
+    handler = user_file_handler()
+    try:
+        records = handler.export_records(
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            food=request.args.get('food')
+        ) if handler is not None else iter(())
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    filename = f"food-tracker-export-{datetime.now().date().isoformat()}.{export_format}"
+    return Response(
+        iter_export(records, export_format),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/delete_detection/<detection_id>', methods=['POST'])
 def delete_detection(detection_id):
     """Delete a food detection by its ID"""
-    success = file_handler.delete_detection(detection_id)
+    handler = user_file_handler()
+    success = handler is not None and handler.delete_detection(detection_id)
     
     if success:
         return jsonify({
@@ -153,6 +386,94 @@ def delete_detection(detection_id):
             'error': 'Failed to delete food item'
         }), 404
 
+@app.route('/delete_detections', methods=['POST'])
+def delete_detections():
+    """Delete several food detections by ID"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not all(str(i).isdigit() for i in ids):
+        return jsonify({'success': False, 'error': 'ids must be a list of detection IDs'}), 400
+    
+    handler = user_file_handler()
+    deleted = handler.delete_detections(ids) if handler is not None else []
+    return jsonify({
+        'success': True,
+        'deleted': [record['id'] for record in deleted]
+    })
+
+@app.route('/clear_today_logs', methods=['POST'])
+def clear_today_logs():
+    """Delete every food item logged today"""
+    handler = user_file_handler()
+    deleted = handler.clear_day() if handler is not None else []
+    return jsonify({
+        'status': 'success',
+        'message': f"Cleared {len(deleted)} items from today's log",
+        'deleted': len(deleted)
+    })
+
+@app.route('/users')
+def users():
+    """List the users and stations with a detection history"""
+    return jsonify({'users': partitions.ids(), 'open': partitions.open_ids()})
+
+@app.route('/users/<user_id>/summary')
+def user_summary(user_id):
+    """Get one user's or station's daily, weekly and all-time totals"""
+    target_date = request.args.get('date', datetime.now().date().isoformat())
+    try:
+        datetime.strptime(target_date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'success': False, 'error': f'Invalid date: {target_date}'}), 400
+    
+    handler = partitions.get(user_id, create=False)
+    if handler is None:
+        return jsonify({'success': False, 'error': f'Unknown user or station: {user_id}'}), 404
+    
+    return jsonify({
+        'user_id': user_id,
+        'date': target_date,
+        'daily': handler.get_daily_summary(target_date),
+        'weekly': handler.get_weekly_summary(),
+        'all_time': handler.get_all_time_stats()
+    })
+
+@app.route('/admin/profile')
+def admin_profile():
+    """Sample every thread for a while and return the stacks as a collapsed flamegraph file"""
+    if not Config.PROFILING:
+        return jsonify({'success': False, 'error': 'Profiling is disabled, set PROFILING=1'}), 404
+    # Without a token nobody may capture, the route stays closed
+    if not Config.PROFILE_TOKEN:
+        return jsonify({'success': False, 'error': 'Profile captures are disabled, set PROFILE_TOKEN'}), 404
+    token = request.headers.get(PROFILE_TOKEN_HEADER, '')
+    if not hmac.compare_digest(token, Config.PROFILE_TOKEN):
+        return jsonify({'success': False, 'error': 'Invalid profiling token'}), 403
+    
+    # The capture holds this request's thread, so it stays short
+    seconds = request.args.get('seconds', Config.PROFILE_MAX_SECONDS, type=float)
+    if not 0 < seconds <= Config.PROFILE_MAX_SECONDS:
+        return jsonify({
+            'success': False, 'error': f'seconds must be between 0 and {Config.PROFILE_MAX_SECONDS}'
+        }), 400
+    profile_format = request.args.get('format', 'collapsed')
+    if profile_format not in ('collapsed', 'json'):
+        return jsonify({'success': False, 'error': f'Unsupported format: {profile_format}'}), 400
+    
+    try:
+        profile = profiler.capture(seconds, include_idle=request.args.get('idle') == '1')
+    except ProfilerBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
+    if profile_format == 'json':
+        return jsonify(profile.summary())
+    filename = f"food-tracker-profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    return Response(
+        profile.collapsed(),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000)) 
     app.run(debug=Config.DEBUG, host='0.0.0.0', port=port)
@@ -0,0 +1,251 @@
+"""
+Food Tracker - ASGI Application
+Serves the live streams as coroutines and every other route through the Flask app in worker threads
+
+Usage:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import asyncio
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from urllib.parse import parse_qs
+
+from app import (
+    app as flask_app, camera_registry, event_bus, initial_events,
+    FRAME_HEADER, STREAM_CLIENTS, FRAMES_SENT, USER_HEADER
+)
+from config import Config
+from utils.partitions import PartitionError, partition_path
+
+VIDEO_FEED_PATH = re.compile(r"^/video_feed(?:/(?P<camera_id>[^/]+))?/?$")
+
+# Bytes a Flask response may buffer in its worker thread before they are sent
+WSGI_CHUNK_BYTES = 64 * 1024
+
+
+async def application(scope, receive, send):
+    """
+    ASGI entry point
+
+    /video_feed and /events run as coroutines on the event loop, so an idle
+    viewer costs a future instead of a worker thread. Every other request is
+    handed to the Flask app in a worker thread, which keeps database and file
+    I/O off the event loop.
+    """
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    _use_thread_pool(asyncio.get_running_loop())
+    if scope["method"] == "GET":
+        match = VIDEO_FEED_PATH.match(scope["path"])
+        camera_hub = camera_registry.get(match["camera_id"] or Config.DEFAULT_CAMERA_ID) if match else None
+        if camera_hub is not None:
+            await _stream(receive, send, "multipart/x-mixed-replace; boundary=frame", video_frames(camera_hub))
+            return
+        partition_id = _partition_id(scope)
+        if scope["path"] == "/events" and partition_id is not None:
+            await _stream(
+                receive, send, "text/event-stream", events(partition_id),
+                headers=[(b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]
+            )
+            return
+    # Unknown cameras and malformed user IDs fall through to Flask, which answers with its usual errors
+    await _call_flask(scope, receive, send)
+
+
+async def video_frames(camera_hub):
+    """Async counterpart of app.generate_frames"""
+    STREAM_CLIENTS.inc()
+    try:
+        async with aclosing(camera_hub.stream_async()) as frames:
+            async for frame_bytes in frames:
+                yield FRAME_HEADER
+                yield frame_bytes
+                yield b"\r\n"
+                FRAMES_SENT.inc()
+    except Exception as e:
+        print(f"Error in video_frames: {str(e)}")
+    finally:
+        STREAM_CLIENTS.dec()
+
+
+async def events(partition_id):
+    """Async counterpart of app.generate_events"""
+    async with aclosing(
+        event_bus.subscribe_async(topic=partition_id, initial=lambda: initial_events(partition_id))
+    ) as messages:
+        async for message in messages:
+            yield message
+
+
+def _partition_id(scope):
+    """
+    User or station ID of a request, read like app.request_partition
+
+    Returns:
+        str: The ID, or None if it is malformed
+    """
+    header = USER_HEADER.lower().encode("latin-1")
+    partition_id = next(
+        (value.decode("latin-1") for name, value in scope.get("headers", []) if name == header), None
+    )
+    if not partition_id:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        partition_id = query.get("user", [None])[0] or Config.DEFAULT_USER_ID
+    try:
+        partition_path(partition_id)
+    except PartitionError:
+        return None
+    return partition_id
+
+
+_thread_pool_loop = None
+
+
+def _use_thread_pool(loop):
+    """Size the default executor behind asyncio.to_thread once per event loop"""
+    global _thread_pool_loop
+    if _thread_pool_loop is not loop:
+        loop.set_default_executor(ThreadPoolExecutor(Config.ASGI_THREADS, thread_name_prefix="asgi"))
+        _thread_pool_loop = loop
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            _use_thread_pool(asyncio.get_running_loop())
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _stream(receive, send, content_type, chunks, headers=()):
+    """Send an async iterator as a streaming response until it ends or the client leaves"""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", content_type.encode()), *headers]
+    })
+
+    async def pump():
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _call_flask(scope, receive, send):
+    """Run one request through the Flask app in a worker thread"""
+    body = io.BytesIO()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        body.write(message.get("body", b""))
+        if body.tell() > Config.UPLOAD_MAX_BYTES:
+            await _send_text(send, 413, "Request body too large")
+            return
+        if not message.get("more_body"):
+            break
+    body.seek(0)
+
+    response = {}
+    written = []
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return written.append
+
+    def run():
+        result = flask_app(_environ(scope, body), start_response)
+        iterator = iter(result)
+        return result, iterator, _read_chunks(iterator)
+
+    result, iterator, (chunks, done) = await asyncio.to_thread(run)
+    try:
+        await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+        chunks = written + chunks
+        while True:
+            await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": not done})
+            if done:
+                return
+            chunks, done = await asyncio.to_thread(_read_chunks, iterator)
+    except Exception as e:
+        # Headers are already out, all that is left is to cut the response short
+        print(f"Error streaming response for {scope['path']}: {str(e)}", file=sys.stderr)
+    finally:
+        if hasattr(result, "close"):
+            await asyncio.to_thread(result.close)
+
+
+def _read_chunks(iterator):
+    """Pull response chunks until enough bytes are buffered or the response ends"""
+    chunks = []
+    size = 0
+    for chunk in iterator:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= WSGI_CHUNK_BYTES:
+            return chunks, False
+    return chunks, True
+
+
+def _environ(scope, body):
+    """Build the WSGI environ of an ASGI HTTP request"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    # The body is fully buffered, so its length is known even for chunked requests
+    environ["CONTENT_LENGTH"] = str(len(body.getbuffer()))
+    return environ
+
+
+async def _send_text(send, status, text):
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": text.encode()})
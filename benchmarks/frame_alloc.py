@@ -0,0 +1,132 @@
+"""
+Frame Allocation Benchmark
+Compares peak working memory per streamed frame with per-frame buffers and with pooled capture buffers
+
+Usage:
+    python -m benchmarks.frame_alloc [--frames 300]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+from tempfile import TemporaryDirectory
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.stubs import SyntheticFrameSource
+from utils.frame_pipeline import FramePool
+
+FRAME_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+
+
+def write_video(path, frames):
+    """Record synthetic frames so both loops decode the same capture"""
+    source = SyntheticFrameSource()
+    height, width = source.frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    for _ in range(frames):
+        writer.write(source.read()[1])
+    writer.release()
+
+
+def per_frame_loop(cap):
+    """Stream loop as it was: new frame, drawing copy, encode buffer and concatenated chunk per frame"""
+    ret, frame = cap.read()
+    if not ret:
+        return False
+    annotated = frame.copy()
+    cv2.rectangle(annotated, (10, 10), (200, 200), (0, 255, 0), 2)
+    _, buffer = cv2.imencode(".jpg", annotated)
+    chunk = FRAME_HEADER + buffer.tobytes() + b"\r\n"
+    return len(chunk) > 0
+
+
+def pooled_loop(cap, pool, canvas):
+    """Stream loop with a pooled capture buffer, a reused drawing buffer and the encoded array sent as a view"""
+    buffer = pool.acquire()
+    ret, frame = cap.read(buffer)
+    if not ret:
+        return False
+    pool.hold(frame, 1)
+    np.copyto(canvas, frame)
+    cv2.rectangle(canvas, (10, 10), (200, 200), (0, 255, 0), 2)
+    _, encoded = cv2.imencode(".jpg", canvas)
+    pool.release(frame)
+    pieces = (FRAME_HEADER, memoryview(encoded.reshape(-1)), b"\r\n")
+    return sum(len(piece) for piece in pieces) > 0
+
+
+def measure(path, frames, step):
+    """
+    Run a loop over the video and collect per-frame memory figures
+
+    The memory figure is the tracemalloc peak above the memory held before
+    the frame, so it shows how much a frame needs at once, not how many bytes
+    it allocated in total.
+    """
+    cap = cv2.VideoCapture(path)
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    peaks = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(frames):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        if not step(cap):
+            break
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    cap.release()
+    count = max(len(peaks), 1)
+    return {
+        "frames": len(peaks),
+        "peak_kb_per_frame": float(np.median(peaks)) / 1024 if peaks else 0.0,
+        "page_faults_per_frame": (resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults) / count,
+        "gc_collections": sum(stat["collections"] for stat in gc.get_stats()) - collections,
+        "ms_per_frame": elapsed / count * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--frames", type=int, default=300, help="frames streamed per loop")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    shape = SyntheticFrameSource(count=1).frames[0].shape
+    pool = FramePool(size=4)
+    canvas = np.empty(shape, dtype=np.uint8)
+    loops = {
+        "per-frame buffers": per_frame_loop,
+        "pooled buffers": lambda cap: pooled_loop(cap, pool, canvas),
+    }
+    with TemporaryDirectory() as directory:
+        path = os.path.join(directory, "capture.avi")
+        write_video(path, args.frames)
+        results = {name: measure(path, args.frames, step) for name, step in loops.items()}
+
+    print(f"{args.frames} frames of {shape[1]}x{shape[0]}, median peak working memory per frame")
+    print(f"{'loop':>18} {'peak KB':>9} {'faults/frame':>13} {'gc runs':>8} {'ms/frame':>9}")
+    for name, report in results.items():
+        print(
+            f"{name:>18} {report['peak_kb_per_frame']:>9.1f} "
+            f"{report['page_faults_per_frame']:>13.1f} {report['gc_collections']:>8} {report['ms_per_frame']:>9.2f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
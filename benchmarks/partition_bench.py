@@ -0,0 +1,146 @@
+"""
+Partition Benchmark
+Compares logging and summary cost of many users sharing one database with one database per user
+
+Usage:
+    python -m benchmarks.partition_bench [--users 20] [--records 5000] [--threads 8]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config import Config
+
+DAYS = 30  # history is spread over this many days, today included
+
+
+def populate(db_path, records, seed):
+    """Fill a fresh database with records spread over the last DAYS days"""
+    from utils.storage import DetectionStore
+
+    store = DetectionStore(db_path)
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for _ in range(records):
+        timestamp = (now - timedelta(seconds=rng.randrange(DAYS * 86400))).isoformat()
+        rows.append((timestamp, timestamp[:10], rng.choice(Config.FOOD_CLASSES), 0.9, 100))
+    with store.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO detections (timestamp, day, food, confidence, calories) VALUES (?, ?, ?, ?, ?)", rows
+        )
+    store.close()
+
+
+def layouts(directory, users, records):
+    """
+    Build both storage layouts with the same history
+
+    Returns:
+        dict: Layout name -> function opening a FileHandler for a user
+    """
+    from utils.file_handler import FileHandler
+    from utils.partitions import partition_path
+
+    Config.DATA_DIR = directory
+    Config.DETECTION_HISTORY_FILE = os.path.join(directory, "detection_history.json")
+    Config.PARTITION_DIR = os.path.join(directory, "users")
+    os.makedirs(Config.PARTITION_DIR)
+
+    shared = os.path.join(directory, "shared.db")
+    populate(shared, users * records, seed=0)
+    for user in range(users):
+        populate(partition_path(f"user{user}"), records, seed=user + 1)
+
+    return {
+        "shared database": lambda user: FileHandler(db_path=shared, partition_id=f"user{user}"),
+        "per-user databases": lambda user: FileHandler(db_path=partition_path(f"user{user}"), partition_id=f"user{user}"),
+    }
+
+
+def measure(open_handler, users, writes, threads):
+    """Time the first summary, summaries while other workers write, and concurrent logging"""
+    started = time.perf_counter()
+    handler = open_handler(0)
+    handler.get_daily_summary()
+    cold_ms = (time.perf_counter() - started) * 1000
+
+    # Another worker process logs for a different user between two summary requests
+    other_worker = open_handler(1)
+    samples = []
+    for _ in range(writes):
+        other_worker.log_detection("Apple", 0.9, 95)
+        handler.cache._checked_at = 0.0  # as after the recheck interval
+        started = time.perf_counter()
+        handler.get_daily_summary()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+
+    handlers = [open_handler(user % users) for user in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def writer(handler):
+        barrier.wait()
+        for _ in range(writes):
+            handler.log_detection("Banana", 0.9, 105)
+
+    workers = [threading.Thread(target=writer, args=(handler,)) for handler in handlers]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    for open_handle in [handler, other_worker] + handlers:
+        open_handle.store.close()
+    return {
+        "cold_summary_ms": cold_ms,
+        "summary_after_other_write_p50_ms": samples[len(samples) // 2],
+        "concurrent_logs_per_second": threads * writes / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--records", type=int, default=5000, help="history records per user")
+    parser.add_argument("--threads", type=int, default=8, help="threads logging for different users at once")
+    parser.add_argument("--writes", type=int, default=200, help="writes per measurement")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = {
+            name: measure(open_handler, args.users, args.writes, args.threads)
+            for name, open_handler in layouts(directory, args.users, args.records).items()
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{args.users} users with {args.records} records each, {args.threads} concurrent writers")
+    print(f"{'layout':>20} {'cold summary ms':>16} {'summary after write ms':>23} {'logs/s':>9}")
+    for name, report in results.items():
+        print(
+            f"{name:>20} {report['cold_summary_ms']:>16.2f} "
+            f"{report['summary_after_other_write_p50_ms']:>23.3f} {report['concurrent_logs_per_second']:>9.0f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Post-processing Micro-benchmark
+Measures per-frame cost of FoodDetector.detect_food result handling against box count
+
+Usage:
+    python -m benchmarks.postprocess_bench [--frames 500]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.stubs import StubModel, torch
+from config import Config
+from utils.detections import results_to_array, filter_detections, class_names
+from utils.food_detector import FoodDetector
+
+def legacy_postprocess(results):
+    """Per-box extraction used before detections were vectorized"""
+    detections = []
+    for result in results:
+        for box in result.boxes:
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            confidence = float(box.conf[0].cpu().numpy())
+            class_id = int(box.cls[0].cpu().numpy())
+            if class_id < len(Config.FOOD_CLASSES):
+                food_name = Config.FOOD_CLASSES[class_id]
+                detections.append((f"{food_name}_{int(x1)}_{int(y1)}", confidence))
+    return detections
+
+
+def vectorized_postprocess(results):
+    """Array based extraction used by detect_food"""
+    detections = filter_detections(results_to_array(results))
+    return class_names(detections).tolist(), detections[:, 4].tolist()
+
+
+def time_per_frame(func, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        func()
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=500, help="frames per box count")
+    args = parser.parse_args()
+
+    # The same frame is timed over and over, it must not be answered by the motion gate or the result cache
+    Config.MOTION_GATING = False
+    Config.RESULT_CACHE_SIZE = 0
+    frame = np.zeros((Config.FRAME_HEIGHT, Config.FRAME_WIDTH, 3), dtype=np.uint8)
+    backend = "torch" if torch is not None else "numpy stub"
+    print(f"Tensor backend: {backend}, {args.frames} frames per row")
+    print(f"{'boxes':>6} {'legacy ms':>10} {'vectorized ms':>14} {'speedup':>8} {'detect_food ms':>15}")
+
+    for num_boxes in (1, 5, 10, 25, 50, 100, 200):
+        model = StubModel(num_boxes)
+        detector = FoodDetector(model=model)
+        results = model(frame)
+
+        legacy_ms = time_per_frame(lambda: legacy_postprocess(results), args.frames)
+        vector_ms = time_per_frame(lambda: vectorized_postprocess(results), args.frames)
+        # Full post-processing including tracking, with the model call stubbed out
+        detect_ms = time_per_frame(lambda: detector.detect_food(frame), args.frames)
+        print(
+            f"{num_boxes:>6} {legacy_ms:>10.3f} {vector_ms:>14.3f} "
+            f"{legacy_ms / vector_ms:>7.1f}x {detect_ms:>15.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark Suite
+Times the detection, streaming, logging and summary hot paths and compares them with a baseline
+
+Usage:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json [--tolerance 0.2]
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+from benchmarks.stubs import StubModel, SyntheticFrameSource
+from config import Config
+
+FULL_HISTORY_SIZES = (10_000, 100_000, 1_000_000)
+QUICK_HISTORY_SIZES = (10_000, 100_000)
+
+
+ROUNDS = 3  # each measurement keeps its best round to reduce noise
+
+
+def _time_per_call(func, repeat):
+    """Average milliseconds per call in the fastest of several rounds"""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat * 1000)
+    return best
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def bench_postprocess(results, frames):
+    """detect_food with a stub model, so only post-processing and tracking are timed"""
+    from utils.food_detector import FoodDetector
+
+    source = SyntheticFrameSource()
+    for num_boxes in (10, 50):
+        detector = FoodDetector(model=StubModel(num_boxes))
+        # Every frame must go through the stub, not be answered by the motion gate or the result cache
+        detector.state.motion_gate = None
+        detector.result_cache = None
+        results[f"detect_food_postprocess_{num_boxes}_boxes"] = {
+            "value": _time_per_call(lambda: detector.detect_food(source.read()[1]), frames),
+            "unit": "ms"
+        }
+
+
+def bench_encode(results, frames):
+    """JPEG encoding and broadcast publish as done by the streaming encoder stage"""
+    from utils.frame_pipeline import FrameBroadcaster
+
+    source = SyntheticFrameSource()
+    broadcaster = FrameBroadcaster()
+
+    def encode():
+        _, buffer = cv2.imencode('.jpg', source.read()[1])
+        broadcaster.publish(memoryview(buffer.reshape(-1)).toreadonly())
+
+    results["stream_jpeg_encode"] = {"value": _time_per_call(encode, frames), "unit": "ms"}
+
+
+def _populate_history(db_path, size):
+    """Fill a fresh database with ``size`` records spread over the last year"""
+    from utils.storage import DetectionStore
+
+    store = DetectionStore(db_path)
+    rng = random.Random(size)
+    now = datetime.now()
+    rows = []
+    for _ in range(size):
+        timestamp = (now - timedelta(seconds=rng.randrange(365 * 86400))).isoformat()
+        food = rng.choice(Config.FOOD_CLASSES)
+        rows.append((timestamp, timestamp[:10], food, round(rng.uniform(0.5, 1.0), 2), 100))
+    with store.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO detections (timestamp, day, food, confidence, calories) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated_at', 'benchmark')")
+    store.close()
+
+
+def bench_log_detection(results, history_sizes, writes):
+    """FileHandler.log_detection against databases of growing size"""
+    from utils.file_handler import FileHandler
+
+    for size in history_sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            Config.DATA_DIR = directory
+            Config.DATABASE_FILE = os.path.join(directory, "food_tracker.db")
+            Config.DETECTION_HISTORY_FILE = os.path.join(directory, "detection_history.json")
+            _populate_history(Config.DATABASE_FILE, size)
+
+            file_handler = FileHandler()
+            results[f"log_detection_{size}_history"] = {
+                "value": _time_per_call(lambda: file_handler.log_detection("Apple", 0.9, 95), writes),
+                "unit": "ms"
+            }
+            file_handler.store.close()
+
+
+def bench_summary_endpoints(results, history_size, requests_per_endpoint, concurrency):
+    """Summary endpoints served over HTTP by the threaded development server"""
+    from werkzeug.serving import make_server
+    import utils.food_detector
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    directory = tempfile.mkdtemp()
+    Config.DATA_DIR = directory
+    Config.DATABASE_FILE = os.path.join(directory, "food_tracker.db")
+    Config.DETECTION_HISTORY_FILE = os.path.join(directory, "detection_history.json")
+    Config.PARTITION_DIR = os.path.join(directory, "users")
+    _populate_history(Config.DATABASE_FILE, history_size)
+
+    # Keep the app from loading the real model
+    utils.food_detector.FoodDetector.load_model = lambda self: None
+    import app as food_app
+
+    server = make_server("127.0.0.1", 0, food_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def fetch(path):
+        start = time.perf_counter()
+        with urllib.request.urlopen(base_url + path) as response:
+            response.read()
+        return (time.perf_counter() - start) * 1000
+
+    try:
+        for path in ("/get_daily_summary", "/get_todays_items", "/get_recent_detections"):
+            fetch(path)  # warm up caches
+            best = None
+            for _ in range(ROUNDS):
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    start = time.perf_counter()
+                    latencies = list(executor.map(fetch, [path] * requests_per_endpoint))
+                    elapsed = time.perf_counter() - start
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, latencies)
+            elapsed, latencies = best
+            name = path.strip("/")
+            results[f"{name}_p50"] = {"value": _percentile(latencies, 50), "unit": "ms"}
+            results[f"{name}_p95"] = {"value": _percentile(latencies, 95), "unit": "ms"}
+            results[f"{name}_throughput"] = {
+                "value": requests_per_endpoint / elapsed, "unit": "req/s", "higher_is_better": True
+            }
+    finally:
+        server.shutdown()
+        food_app.partitions.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline
+
+    Returns:
+        list: (name, baseline value, current value, change) for every regression
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        if current.get("higher_is_better"):
+            change = -change
+        status = "REGRESSION" if change > tolerance else "ok"
+        print(f"{status:>10} {name}: {previous['value']:.3f} -> {current['value']:.3f} {current['unit']} ({change:+.1%})")
+        if change > tolerance:
+            regressions.append((name, previous["value"], current["value"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the food tracker benchmark suite")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with a saved baseline and fail on regressions")
+    parser.add_argument("--save-baseline", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M history size and use fewer iterations")
+    args = parser.parse_args()
+
+    frames = 200 if args.quick else 1000
+    results = {}
+
+    print("Benchmarking detect_food post-processing...", file=sys.stderr)
+    bench_postprocess(results, frames)
+    print("Benchmarking JPEG encoding...", file=sys.stderr)
+    bench_encode(results, frames)
+    print("Benchmarking FileHandler.log_detection...", file=sys.stderr)
+    bench_log_detection(results, QUICK_HISTORY_SIZES if args.quick else FULL_HISTORY_SIZES, 200)
+    print("Benchmarking summary endpoints...", file=sys.stderr)
+    bench_summary_endpoints(results, 100_000, 200 if args.quick else 1000, 8)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__
+        },
+        "results": {
+            name: dict(result, value=round(result["value"], 4)) for name, result in results.items()
+        }
+    }
+
+    for name, result in report["results"].items():
+        print(f"{name:>40}: {result['value']:>10.3f} {result['unit']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report["results"], baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
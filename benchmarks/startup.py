@@ -0,0 +1,111 @@
+"""
+Startup Benchmark
+Measures app import time and worker memory with eager, lazy and model-server loading
+
+Usage:
+    python -m benchmarks.startup [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs in a fresh interpreter per mode so earlier imports don't skew the numbers
+CHILD = r"""
+import json, os, sys, tempfile, time
+import numpy as np
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+from config import Config
+directory = tempfile.mkdtemp()
+Config.DATA_DIR = directory
+Config.DATABASE_FILE = os.path.join(directory, "food_tracker.db")
+Config.DETECTION_HISTORY_FILE = os.path.join(directory, "detection_history.json")
+
+baseline = rss_mb()
+start = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - start
+import_rss = rss_mb()
+
+first_detection_seconds = None
+if not Config.MODEL_SERVER_ADDRESS:
+    frame = np.zeros((Config.FRAME_HEIGHT, Config.FRAME_WIDTH, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    app.food_detector.detect_food(frame)
+    first_detection_seconds = time.perf_counter() - start
+
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "rss_before_import_mb": baseline,
+    "rss_after_import_mb": import_rss,
+    "first_detection_seconds": first_detection_seconds,
+    "rss_after_first_detection_mb": rss_mb(),
+    "model_loaded": app.food_detector.model is not None,
+    "ultralytics_imported": "ultralytics" in sys.modules
+}))
+"""
+
+MODES = {
+    "eager": {"LAZY_MODEL_LOADING": "0"},
+    "lazy": {"LAZY_MODEL_LOADING": "1"},
+    # Workers only hold a socket client, the model lives in the server process
+    "model-server worker": {
+        "LAZY_MODEL_LOADING": "0",
+        "MODEL_SERVER_ADDRESS": "data/model_server.sock",
+        "MODEL_SERVER_AUTHKEY": "startup-benchmark"
+    },
+}
+
+
+def measure(mode_env):
+    """Run the child script with extra environment variables and parse its report"""
+    env = dict(os.environ)
+    env.pop("MODEL_SERVER_ADDRESS", None)
+    env.update(mode_env)
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app startup time and memory per loading mode")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for mode, mode_env in MODES.items():
+        results[mode] = report = measure(mode_env)
+        first = report["first_detection_seconds"]
+        print(
+            f"{mode:>20}: import {report['import_seconds'] * 1000:8.1f} ms, "
+            f"RSS {report['rss_after_import_mb']:6.1f} MB after import, "
+            f"{report['rss_after_first_detection_mb']:6.1f} MB after first detection"
+            + (f" ({first * 1000:.1f} ms)" if first is not None else "")
+            + ("" if report["model_loaded"] else ", model not loaded")
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
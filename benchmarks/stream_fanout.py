@@ -0,0 +1,132 @@
+"""
+Stream Fan-out Benchmark
+Compares the cost of idle video viewers served by worker threads (WSGI) and by coroutines (ASGI)
+
+Usage:
+    python -m benchmarks.stream_fanout [--clients 10 100 500] [--seconds 3] [--fps 15]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+
+from utils.frame_pipeline import FrameBroadcaster
+
+FRAME = b"\xff" * 40_000  # roughly one 640x480 JPEG
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def publish(broadcaster, fps, stop):
+    """Camera stand-in publishing frames at a fixed rate"""
+    while not stop.is_set():
+        broadcaster.publish(FRAME)
+        time.sleep(1 / fps)
+
+
+def measure(clients, seconds, fps, start_clients, stop_clients):
+    """Run one fan-out mode and report memory, threads, CPU use and delivered frames"""
+    broadcaster = FrameBroadcaster()
+    delivered = [0]
+    stop = threading.Event()
+    baseline = rss_mb()
+    handle = start_clients(broadcaster, clients, delivered)
+    while broadcaster.subscribers < clients:
+        time.sleep(0.01)
+
+    publisher = threading.Thread(target=publish, args=(broadcaster, fps, stop), daemon=True)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    publisher.start()
+    time.sleep(seconds)
+    report = {
+        "clients": clients,
+        "rss_per_client_kb": (rss_mb() - baseline) * 1024 / clients,
+        "threads": threading.active_count(),
+        "cpu_percent": (time.process_time() - cpu_start) / (time.perf_counter() - wall_start) * 100,
+        "frames_per_client_per_second": delivered[0] / clients / seconds,
+    }
+    stop.set()
+    publisher.join()
+    broadcaster.close()
+    stop_clients(handle)
+    return report
+
+
+def start_threads(broadcaster, clients, delivered):
+    """One thread per viewer, as a sync or gthread worker serves /video_feed"""
+    def viewer():
+        for _ in broadcaster.subscribe():
+            delivered[0] += 1
+
+    threads = [threading.Thread(target=viewer, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def stop_threads(threads):
+    for thread in threads:
+        thread.join()
+
+
+def start_coroutines(broadcaster, clients, delivered):
+    """One coroutine per viewer on a single event loop, as asgi.py serves /video_feed"""
+    async def viewer():
+        async for _ in broadcaster.subscribe_async():
+            delivered[0] += 1
+
+    async def serve():
+        await asyncio.gather(*(viewer() for _ in range(clients)))
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_coroutines(thread):
+    thread.join()
+
+
+MODES = {
+    "threads (WSGI)": (start_threads, stop_threads),
+    "coroutines (ASGI)": (start_coroutines, stop_coroutines),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--seconds", type=float, default=3.0, help="measurement time per run")
+    parser.add_argument("--fps", type=float, default=15.0, help="published frames per second")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'mode':>18} {'clients':>8} {'KB/client':>10} {'threads':>8} {'CPU %':>7} {'fps/client':>11}")
+    for mode, (start_clients, stop_clients) in MODES.items():
+        results[mode] = []
+        for clients in args.clients:
+            report = measure(clients, args.seconds, args.fps, start_clients, stop_clients)
+            results[mode].append(report)
+            print(
+                f"{mode:>18} {clients:>8} {report['rss_per_client_kb']:>10.1f} {report['threads']:>8} "
+                f"{report['cpu_percent']:>7.1f} {report['frames_per_client_per_second']:>11.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Benchmark Stubs
+Synthetic frames and a stub model so benchmarks run without a camera or models/best.pt
+"""
+
+import cv2
+import numpy as np
+
+from config import Config
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+class StubTensor:
+    """Minimal stand-in for a torch tensor when torch is not installed"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def __getitem__(self, index):
+        return StubTensor(self.array[index])
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+def make_tensor(array):
+    return torch.from_numpy(array) if torch is not None else StubTensor(array)
+
+
+class StubBoxes:
+    """Boxes object exposing the attributes detect_food reads"""
+
+    def __init__(self, data):
+        self.data = make_tensor(data)
+        self.xyxy = make_tensor(data[:, :4])
+        self.conf = make_tensor(data[:, 4])
+        self.cls = make_tensor(data[:, 5])
+        self._rows = data
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        for row in self._rows:
+            yield StubBoxes(row[None, :])
+
+
+class StubResult:
+    def __init__(self, data):
+        self.boxes = StubBoxes(data)
+
+
+class StubModel:
+    """Model returning a fixed set of boxes so only post-processing is timed"""
+
+    def __init__(self, num_boxes, seed=0):
+        rng = np.random.default_rng(seed)
+        xy = rng.uniform(0, 600, size=(num_boxes, 2))
+        wh = rng.uniform(20, 120, size=(num_boxes, 2))
+        conf = rng.uniform(Config.CONFIDENCE_THRESHOLD, 1.0, size=(num_boxes, 1))
+        cls = rng.integers(0, len(Config.FOOD_CLASSES), size=(num_boxes, 1))
+        self.data = np.hstack([xy, xy + wh, conf, cls]).astype(np.float32)
+
+    def __call__(self, frames, **kwargs):
+        if isinstance(frames, list):
+            return [StubResult(self.data) for _ in frames]
+        return [StubResult(self.data)]
+
+
+class BlobModel:
+    """
+    Resolution-limited model finding solid colour blobs, one colour per class
+
+    Like YOLO, each input is scaled so its long side matches imgsz before
+    anything is detected, and blobs smaller than min_side pixels at that
+    scale are missed. Small items in large frames are therefore lost at low
+    input sizes, which makes the stub useful for comparing tiling modes.
+    Returns detection arrays, as the model server does.
+    """
+
+    def __init__(self, colors, imgsz=640, min_side=6, tolerance=40):
+        self.colors = np.asarray(colors, dtype=np.int16)
+        self.imgsz = imgsz
+        self.min_side = min_side
+        self.tolerance = tolerance
+        self.inputs = 0
+        self.pixels = 0
+
+    def __call__(self, source, imgsz=None, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        return [self._detect(frame, imgsz or self.imgsz) for frame in frames]
+
+    def _detect(self, frame, imgsz):
+        height, width = frame.shape[:2]
+        scale = imgsz / max(height, width)
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        self.inputs += 1
+        self.pixels += imgsz * imgsz  # letterboxed input
+
+        rows = []
+        for class_id, color in enumerate(self.colors):
+            mask = cv2.inRange(small, np.clip(color - self.tolerance, 0, 255), np.clip(color + self.tolerance, 0, 255))
+            _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            for x, y, w, h, _ in stats[1:]:
+                if min(w, h) >= self.min_side:
+                    rows.append([x / scale, y / scale, (x + w) / scale, (y + h) / scale, 0.9, class_id])
+        return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+class SyntheticFrameSource:
+    """
+    Camera stand-in producing frames with moving plates on a noisy background
+
+    A fixed number of frames is rendered up front and replayed in a loop, so
+    reading a frame costs about as little as a real capture.
+    """
+
+    def __init__(self, count=60, width=None, height=None, seed=0):
+        width = width or Config.FRAME_WIDTH
+        height = height or Config.FRAME_HEIGHT
+        rng = np.random.default_rng(seed)
+        self.frames = []
+        for index in range(count):
+            frame = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+            x = (index * 7) % (width - 160)
+            frame[120:280, x:x + 160] = (40, 160, 220)
+            frame[300:380, width - x - 120:width - x] = (60, 200, 80)
+            self.frames.append(frame)
+        self._index = 0
+
+    def read(self):
+        frame = self.frames[self._index % len(self.frames)]
+        self._index += 1
+        return True, frame
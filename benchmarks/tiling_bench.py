@@ -0,0 +1,160 @@
+"""
+Tiling Benchmark
+Compares accuracy and per-frame cost of full-frame, tiled and ROI inference on high-resolution trays
+
+Usage:
+    python -m benchmarks.tiling_bench [--frames 20] [--width 1920 --height 1080] [--output tiling.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.stubs import BlobModel
+from config import Config
+
+# One solid colour per class, far enough apart that blended edges match no class
+CLASS_COLORS = [
+    (0, 0, 255), (0, 255, 255), (0, 255, 0), (255, 0, 0),
+    (0, 128, 255), (255, 0, 255), (255, 255, 0), (128, 0, 255),
+]
+SMALL_ITEM_SIDE = 40  # items below this side in frame pixels count as small
+
+# name -> (inference mode, model input size, regions of interest)
+MODES = {
+    "full 640": ("full", 640, ()),
+    "full 1280": ("full", 1280, ()),
+    "tiled 640": ("tiled", 640, ()),
+    "roi halves 640": ("roi", 640, ((0.0, 0.0, 0.55, 1.0), (0.45, 0.0, 1.0, 1.0))),
+}
+
+
+def make_tray(width, height, rng, large=3, small=40):
+    """
+    Draw a tray with a few large plates and many small items
+
+    Returns:
+        tuple: (frame, ground truth array of shape (N, 5) with x1, y1, x2, y2, class_id)
+    """
+    frame = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+    boxes = []
+    for count, sides in ((large, (250, 450)), (small, (14, 36))):
+        placed = 0
+        while placed < count:
+            w, h = rng.integers(*sides, size=2)
+            x, y = rng.integers(0, width - w), rng.integers(0, height - h)
+            box = (x, y, x + w, y + h)
+            # Keep a margin so items never touch
+            if any(x < b[2] + 10 and b[0] < x + w + 10 and y < b[3] + 10 and b[1] < y + h + 10 for b in boxes):
+                continue
+            class_id = int(rng.integers(len(CLASS_COLORS)))
+            cv2.rectangle(frame, box[:2], (box[2] - 1, box[3] - 1), CLASS_COLORS[class_id], -1)
+            boxes.append((*box, class_id))
+            placed += 1
+    return frame, np.array(boxes, dtype=np.float32)
+
+
+def box_iou(a, b):
+    """IoU matrix between two (N, 4) box arrays"""
+    width = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    height = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = width * height
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter)
+
+
+def match(predictions, truth, iou_threshold=0.5):
+    """
+    Greedily match predictions to ground truth of the same class
+
+    Returns:
+        np.ndarray: Boolean per ground-truth item, True if it was found
+    """
+    found = np.zeros(len(truth), dtype=bool)
+    if not len(predictions):
+        return found
+    iou = box_iou(predictions[:, :4], truth[:, :4])
+    iou[predictions[:, 5][:, None] != truth[:, 4][None, :]] = 0
+    for row in iou[np.argsort(-predictions[:, 4])]:
+        row = np.where(found, 0, row)
+        best = int(np.argmax(row))
+        if row[best] >= iou_threshold:
+            found[best] = True
+    return found
+
+
+def run_mode(mode, imgsz, regions, trays):
+    """Detect every tray in one mode and collect accuracy and cost"""
+    from utils.food_detector import FoodDetector
+
+    Config.INFERENCE_REGIONS = regions
+    model = BlobModel(CLASS_COLORS, imgsz=imgsz)
+    detector = FoodDetector(model=model, inference_mode=mode)
+
+    true_positives = predicted = small_found = small_total = total = 0
+    seconds = []
+    for frame, truth in trays:
+        start = time.perf_counter()
+        detections = detector._infer([frame], "frame", imgsz)[0][0]
+        seconds.append(time.perf_counter() - start)
+
+        found = match(detections, truth)
+        small = np.minimum(truth[:, 2] - truth[:, 0], truth[:, 3] - truth[:, 1]) < SMALL_ITEM_SIDE
+        true_positives += int(found.sum())
+        predicted += len(detections)
+        total += len(truth)
+        small_found += int(found[small].sum())
+        small_total += int(small.sum())
+
+    return {
+        "precision": true_positives / predicted if predicted else 0.0,
+        "recall": true_positives / total,
+        "small_item_recall": small_found / small_total if small_total else 0.0,
+        "ms_per_frame": float(np.median(seconds)) * 1000,
+        "model_inputs_per_frame": model.inputs / len(trays),
+        "model_pixels_per_frame": model.pixels / len(trays),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--frames", type=int, default=20, help="trays per mode")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Every mode must run the model, not reuse results of the previous one
+    Config.RESULT_CACHE_SIZE = 0
+    rng = np.random.default_rng(0)
+    trays = [make_tray(args.width, args.height, rng) for _ in range(args.frames)]
+
+    results = {name: run_mode(*settings, trays) for name, settings in MODES.items()}
+    reference = results["full 640"]["model_pixels_per_frame"]
+    print(f"{args.frames} trays of {args.width}x{args.height}, stub model with a 6 px minimum item side")
+    print(
+        f"{'mode':>16} {'precision':>10} {'recall':>7} {'small recall':>13} "
+        f"{'inputs':>7} {'model cost':>11} {'stub ms':>8}"
+    )
+    for name, report in results.items():
+        report["model_cost_vs_full"] = report["model_pixels_per_frame"] / reference
+        print(
+            f"{name:>16} {report['precision']:>10.3f} {report['recall']:>7.3f} "
+            f"{report['small_item_recall']:>13.3f} {report['model_inputs_per_frame']:>7.1f} "
+            f"{report['model_cost_vs_full']:>10.2f}x {report['ms_per_frame']:>8.2f}"
+        )
+    print("model cost: input pixels relative to full 640, a proxy for real model time")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
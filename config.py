@@ -1,27 +1,139 @@
 import os
 
+
+def _parse_cameras(value):
+    """Read CAMERAS="id=source,..." into a camera id -> source dict"""
+    cameras = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        camera_id, separator, source = item.partition("=")
+        if not separator or not camera_id.strip() or not source.strip():
+            raise ValueError(f"Invalid CAMERAS entry {item!r}, expected id=source")
+        cameras[camera_id.strip()] = source.strip()
+    if not cameras:
+        raise ValueError("CAMERAS lists no cameras, expected id=source entries")
+    return cameras
+
 class Config:
     # Model configuration
     MODEL_PATH = "models/best.pt"
+    INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")  # torch, onnx, onnx-int8 or openvino
+    INFERENCE_IMGSZ = 640  # input size used when exporting converted models
+    PARITY_MIN_MATCH_RATE = 0.95  # share of torch detections a converted model must reproduce
+    LAZY_MODEL_LOADING = os.environ.get("LAZY_MODEL_LOADING", "1") != "0"  # load on first detection
+    MODEL_SERVER_ADDRESS = os.environ.get("MODEL_SERVER_ADDRESS")  # socket of a shared model server, unset runs the model in-process
+    MODEL_SERVER_AUTHKEY = os.environ.get("MODEL_SERVER_AUTHKEY", "").encode()  # shared secret, required to use the model server
     
     # Camera configuration
     CAMERA_INDEX = 0  # Default webcam
     FRAME_WIDTH = 640
     FRAME_HEIGHT = 480
     
+    # Multi-camera configuration, CAMERAS="front=0,back=rtsp://..." overrides the camera list
+    DEFAULT_CAMERA_ID = "default"
+    CAMERAS = (
+        _parse_cameras(os.environ["CAMERAS"])
+        if os.environ.get("CAMERAS") else {DEFAULT_CAMERA_ID: CAMERA_INDEX}
+    )  # camera id -> device index, video file or stream URL
+    INFERENCE_BATCH_SIZE = 4  # camera frames per shared model call
+    INFERENCE_BATCH_MAX_WAIT = 0.02  # seconds to wait for other cameras before running a partial batch
+    
+    # Streaming pipeline configuration
+    ENCODE_QUEUE_SIZE = 2  # captured frames waiting for JPEG encoding
+    FRAME_POOL_SIZE = 8  # reusable capture buffers per camera, 0 allocates every frame
+    
+    # Adaptive streaming configuration
+    ADAPTIVE_STREAMING = True  # trade image size, JPEG quality and stride for latency
+    INFERENCE_LATENCY_BUDGET = 0.15  # target seconds per model call
+    ENCODE_LATENCY_BUDGET = 0.02  # target seconds per JPEG encode
+    IMGSZ_LADDER = (640, 512, 416, 320)  # inference sizes, largest first, multiples of 32
+    JPEG_QUALITY_RANGE = (50, 90)  # lowest and highest JPEG quality
+    JPEG_QUALITY_STEP = 10
+    MAX_INFERENCE_STRIDE = 4  # run inference on at most every Nth frame
+    ADAPT_INTERVAL = 2.0  # seconds between adjustments
+    
+    # Server-Sent Events configuration
+    EVENT_QUEUE_SIZE = 32  # undelivered events kept per client
+    EVENT_KEEPALIVE_SECONDS = 15
+    
     # Detection configuration
     CONFIDENCE_THRESHOLD = 0.5
     DETECTION_COOLDOWN = 3  # seconds between logging same food item
     
+    # Motion gating configuration
+    MOTION_GATING = True  # reuse the last result while the scene is unchanged
+    MOTION_THRESHOLD = 4.0  # mean gray-level difference that counts as a scene change
+    MOTION_MAX_STALENESS = 1.0  # seconds before inference runs again regardless
+    MOTION_THUMBNAIL_SIZE = (32, 24)  # width, height of the comparison thumbnail
+    
+    # Tiled inference configuration, INFERENCE_REGIONS="0,0,0.5,1;0.5,0,1,1" sets regions of interest
+    INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "full")  # full, tiled or roi
+    TILE_SIZE = 640  # tile side in frame pixels
+    TILE_OVERLAP = 0.2  # share of a tile shared with its neighbour, should exceed the largest small item
+    TILE_INCLUDE_FULL_FRAME = True  # also run the whole frame so items larger than a tile stay whole
+    TILE_MERGE_THRESHOLD = 0.6  # intersection over the smaller box above which seam duplicates merge
+    INFERENCE_REGIONS = tuple(
+        tuple(float(value) for value in region.split(","))
+        for region in os.environ.get("INFERENCE_REGIONS", "").split(";") if region
+    )  # (x1, y1, x2, y2) as fractions of the frame, empty runs the whole frame
+    
+    # Result cache configuration
+    RESULT_CACHE_SIZE = 256  # cached batch upload results, 0 disables the cache
+    RESULT_CACHE_TTL = 300  # seconds a cached result stays valid, entries are keyed by exact image content
+    
+    # Nutrition configuration
+    PORTION_ESTIMATION = True  # scale servings by bounding-box area
+    PORTION_RANGE = (0.25, 4.0)  # fewest and most servings one detection can count as
+    PORTION_STEP = 0.25  # servings are rounded to this step
+    
+    # Tracking configuration
+    TRACK_IOU_THRESHOLD = 0.3  # minimum overlap to continue a track
+    TRACK_CENTROID_THRESHOLD = 0.5  # max centre distance as a fraction of the box diagonal
+    TRACK_MAX_AGE = 1.0  # seconds a track survives without a matching detection
+    TRACK_CONFIRM_SECONDS = 0.5  # seconds a track must exist before it is offered for logging
+    
+    # Batch upload configuration
+    BATCH_MAX_SIZE = 8  # images per model call
+    BATCH_MAX_BYTES = 64 * 1024 * 1024  # decoded pixel memory per model call
+    DECODE_WORKERS = 4  # threads decoding uploaded images, also the number decoded ahead of the model
+    DECODE_MAX_PIXELS = 4096 * 4096  # larger JPEGs are decoded at 1/2, 1/4 or 1/8 scale, other formats rejected
+    UPLOAD_MAX_IMAGES = 200
+    UPLOAD_MAX_BYTES = 100 * 1024 * 1024  # request body and unzipped archive limit
+    MAX_CONTENT_LENGTH = UPLOAD_MAX_BYTES  # enforced by Flask
+    
     # Data storage paths
     DATA_DIR = "data"
     CALORIE_LOGS_FILE = os.path.join(DATA_DIR, "calorie_logs.json")
     DETECTION_HISTORY_FILE = os.path.join(DATA_DIR, "detection_history.json")
+    DATABASE_FILE = os.path.join(DATA_DIR, "food_tracker.db")
+    PARTITION_DIR = os.path.join(DATA_DIR, "users")  # one database per user or station besides the default one
+    NUTRITION_FILE = os.path.join(DATA_DIR, "nutrition.csv")  # per-serving nutrition and reference areas
+    DEFAULT_USER_ID = "default"  # partition of requests without a user or station ID, stored in DATABASE_FILE
+    MAX_OPEN_PARTITIONS = 64  # partitions kept open with their aggregate caches
+    DATABASE_BUSY_TIMEOUT = 10  # seconds a writer waits for the database lock
+    CHANGE_LOG_RETENTION = 1000  # writes kept in the change log for cache refreshes
+    AGGREGATE_CACHE_DAYS = 7  # days whose individual records are kept in memory
+    AGGREGATE_CACHE_RECHECK = 1.0  # seconds before the cache re-checks the store despite an unchanged file stamp
+    HISTORY_PAGE_SIZE = 50  # records per /history page by default
+    HISTORY_MAX_PAGE_SIZE = 500
+    EXPORT_CHUNK_SIZE = 1000  # records read from the database per export query
     
     # Flask configuration
     SECRET_KEY = "your-secret-key-here"
     DEBUG = True
     
+    # Profiling configuration, see /admin/profile
+    PROFILING = os.environ.get("PROFILING", "0") == "1"  # timing spans and on-demand stack sampling
+    PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")  # required in the X-Profile-Token header, unset disables captures
+    PROFILE_INTERVAL = 0.01  # seconds between stack samples
+    PROFILE_MAX_SECONDS = 5  # longest capture one request may ask for, it blocks a request thread
+    PROFILE_MAX_DEPTH = 128  # innermost frames kept per sampled stack
+    
+    # Async serving configuration, see asgi.py
+    ASGI_THREADS = 32  # worker threads running Flask routes and blocking calls under ASGI
+    
     # Food classes (your trained model classes)
     FOOD_CLASSES = [
         "Apple", "Banana", "Watermelon", "Strawberry", "Orange",
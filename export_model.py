@@ -0,0 +1,76 @@
+"""
+Model Export Tool
+Converts models/best.pt for the CPU inference backends and checks detection parity
+
+Usage:
+    python export_model.py --backend onnx
+    python export_model.py --backend all --parity-images samples/ [--force]
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import cv2
+
+from config import Config
+from utils.inference_backends import BACKENDS, get_backend, parity_check
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_images(directory, limit):
+    """Read up to ``limit`` images from a directory"""
+    paths = sorted(
+        path for path in glob.glob(os.path.join(directory, "*"))
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    frames = [cv2.imread(path) for path in paths[:limit]]
+    return [frame for frame in frames if frame is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the food model for CPU inference backends")
+    parser.add_argument(
+        "--backend", default=Config.INFERENCE_BACKEND,
+        choices=sorted(BACKENDS) + ["all"], help="backend to export for"
+    )
+    parser.add_argument("--force", action="store_true", help="re-export even if a cached model exists")
+    parser.add_argument("--parity-images", help="directory of images to compare against the torch model")
+    parser.add_argument("--parity-limit", type=int, default=50, help="maximum number of parity images")
+    args = parser.parse_args()
+
+    names = [name for name in BACKENDS if name != "torch"] if args.backend == "all" else [args.backend]
+
+    for name in names:
+        backend = get_backend(name)
+        path = backend.export(force=args.force)
+        print(f"✅ {name}: {path}")
+
+    if not args.parity_images:
+        return 0
+
+    frames = load_images(args.parity_images, args.parity_limit)
+    if not frames:
+        print(f"❌ No images found in {args.parity_images}")
+        return 1
+
+    reference = get_backend("torch").load()
+    failed = False
+    for name in names:
+        if name == "torch":
+            continue
+        report = parity_check(reference, get_backend(name).load(), frames)
+        ok = report["match_rate"] >= Config.PARITY_MIN_MATCH_RATE
+        failed = failed or not ok
+        print(
+            f"{'✅' if ok else '❌'} {name}: matched {report['matched']}/{report['reference_detections']} "
+            f"torch detections ({report['match_rate']:.1%}), {report['candidate_detections']} found, "
+            f"max confidence delta {report['max_confidence_delta']:.3f}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Offline Video Processing Tool
+Runs recorded videos or image folders through FoodDetector and records confirmed food items
+
+Usage:
+    python process_video.py lunch.mp4 --output confirmed.jsonl
+    python process_video.py recordings/*.mp4 frames/ --workers 4 --log
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from utils.calorie_mapper import CalorieMapper
+from utils.food_detector import FoodDetector
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Detector owned by the current worker process
+_detector = None
+
+
+def _init_worker():
+    """Load the model once per worker process"""
+    global _detector
+    _detector = FoodDetector()
+
+
+def plan_shards(path, shard_seconds, image_fps):
+    """
+    Split a video file or image directory into independently processable shards
+
+    Args:
+        path (str): Video file or directory of images
+        shard_seconds (float): Length of each shard in seconds of footage
+        image_fps (float): Frame rate assumed for image directories
+
+    Returns:
+        list: Shard descriptions
+    """
+    if os.path.isdir(path):
+        images = sorted(
+            file for file in glob.glob(os.path.join(path, "*"))
+            if file.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        kind, fps, total = "images", image_fps, len(images)
+    else:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video {path}")
+        kind = "video"
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+    shard_frames = max(int(shard_seconds * fps), 1)
+    return [
+        {
+            "kind": kind,
+            "path": path,
+            "fps": fps,
+            "total": total,
+            "start": start,
+            "end": min(start + shard_frames, total)
+        }
+        for start in range(0, total, shard_frames)
+    ]
+
+
+def iter_frames(shard, first, last, stride):
+    """
+    Read frames ``first`` to ``last`` (exclusive) of a shard's source
+
+    Yields:
+        tuple: (frame index, frame)
+    """
+    if shard["kind"] == "images":
+        images = sorted(
+            file for file in glob.glob(os.path.join(shard["path"], "*"))
+            if file.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        for index in range(first, last, stride):
+            frame = cv2.imread(images[index])
+            if frame is not None:
+                yield index, frame
+        return
+
+    cap = cv2.VideoCapture(shard["path"])
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        for index in range(first, last):
+            if not cap.grab():
+                break
+            if (index - first) % stride:
+                continue
+            ret, frame = cap.retrieve()
+            if ret:
+                yield index, frame
+    finally:
+        cap.release()
+
+
+def process_shard(shard, stride=1):
+    """
+    Detect and confirm food items in one shard
+
+    Frames shortly before and after the shard are processed as well so that
+    tracks crossing a shard boundary are confirmed exactly once: by the shard
+    in which they first appeared.
+
+    Args:
+        shard (dict): Shard from plan_shards
+        stride (int): Process every Nth frame
+
+    Returns:
+        tuple: (confirmed items, number of frames processed)
+    """
+    detector = _detector
+    detector.reset_tracking()
+    tracker = detector.tracker
+
+    fps = shard["fps"]
+    warmup = int(tracker.max_age * fps) + 1
+    tail = int((tracker.confirm_after + tracker.max_age) * fps) + 1
+    first = max(shard["start"] - warmup, 0)
+    last = min(shard["end"] + tail, shard["total"])
+    start_time = shard["start"] / fps
+    end_time = shard["end"] / fps
+
+    confirmed = []
+    frames = 0
+    for index, frame in iter_frames(shard, first, last, stride):
+        timestamp = index / fps
+        _, _, pending = detector.detect_food(frame, timestamp=timestamp)
+        frames += 1
+        for detection in pending:
+            track = tracker.store.get(detection["track_id"])
+            tracker.confirm(detection["track_id"])
+            if not start_time <= track.first_seen < end_time:
+                continue
+            confirmed.append({
+                "source": shard["path"],
+                "frame": index,
+                "time": round(timestamp, 3),
+                "food": detection["food"],
+                "confidence": round(detection["confidence"], 4),
+                "bbox": detection["bbox"],
+                "frame_size": frame.shape[1::-1],
+                "track_id": detection["track_id"]
+            })
+    return confirmed, frames
+
+
+def _process_shard_args(args):
+    return process_shard(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect and confirm food items in recorded footage")
+    parser.add_argument("inputs", nargs="+", help="video files or directories of images")
+    parser.add_argument("--output", help="write confirmed items as JSONL to this file ('-' for stdout)")
+    parser.add_argument("--log", action="store_true", help="log confirmed items through FileHandler")
+    parser.add_argument("--user", help="user or station whose history --log writes to, defaults to the shared one")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each loads the model once")
+    parser.add_argument("--shard-seconds", type=float, default=60.0, help="footage per shard")
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth frame")
+    parser.add_argument("--image-fps", type=float, default=1.0, help="frame rate assumed for image directories")
+    args = parser.parse_args()
+
+    if not args.output and not args.log:
+        parser.error("nothing to do, pass --output and/or --log")
+
+    shards = []
+    for path in args.inputs:
+        shards.extend(plan_shards(path, args.shard_seconds, args.image_fps))
+    if not shards:
+        print("❌ No frames found in the given inputs", file=sys.stderr)
+        return 1
+
+    calorie_mapper = CalorieMapper()
+    file_handler = None
+    if args.log:
+        from utils.partitions import PartitionRegistry, PartitionError
+        try:
+            file_handler = PartitionRegistry().get(args.user, create=True)
+        except PartitionError as e:
+            parser.error(str(e))
+
+    output = None
+    if args.output == "-":
+        output = sys.stdout
+    elif args.output:
+        output = open(args.output, "w")
+
+    jobs = [(shard, args.stride) for shard in shards]
+    started = time.perf_counter()
+    total_frames = 0
+    total_items = 0
+
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker)
+        results = executor.map(_process_shard_args, jobs)
+    else:
+        executor = None
+        _init_worker()
+        results = map(_process_shard_args, jobs)
+
+    try:
+        for shard, (confirmed, frames) in zip(shards, results):
+            total_frames += frames
+            total_items += len(confirmed)
+            for item in confirmed:
+                item["calories"] = calorie_mapper.get_calories(item["food"], item["bbox"], item["frame_size"])
+                if output is not None:
+                    output.write(json.dumps(item) + "\n")
+                if file_handler is not None:
+                    file_handler.log_detection(item["food"], item["confidence"], item["calories"])
+            elapsed = time.perf_counter() - started
+            print(
+                f"{shard['path']} frames {shard['start']}-{shard['end']}: "
+                f"{len(confirmed)} items, {total_frames / elapsed:.1f} frames/s overall",
+                file=sys.stderr
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if output is not None and output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ {total_items} confirmed items from {total_frames} frames "
+        f"in {elapsed:.1f}s ({total_frames / max(elapsed, 1e-9):.1f} frames/s)",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,9 @@
 let detectionActive = false;
 let currentToast = null;
 
+// Shared Server-Sent Events connection for live updates
+const foodEvents = new EventSource('/events');
+
 // Initialize when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
     initializeApp();
@@ -12,9 +15,10 @@ document.addEventListener('DOMContentLoaded', function() {
 function initializeApp() {
     console.log('🚀 Food Calorie Tracker initialized');
     
-    // Update navbar calories periodically
-    updateNavbarCalories();
-    setInterval(updateNavbarCalories, 30000); // Update every 30 seconds
+    // Update navbar calories whenever the daily totals change
+    foodEvents.addEventListener('daily_summary', function(event) {
+        setNavbarCalories(JSON.parse(event.data));
+    });
     
     // Initialize tooltips if Bootstrap is available
     if (typeof bootstrap !== 'undefined') {
@@ -29,18 +33,11 @@ function initializeApp() {
 }
 
 // Update navbar calories display
-function updateNavbarCalories() {
-    fetch('/get_daily_summary')
-        .then(response => response.json())
-        .then(data => {
-            const caloriesElement = document.getElementById('today-calories');
-            if (caloriesElement) {
-                caloriesElement.textContent = data.total_calories || 0;
-            }
-        })
-        .catch(error => {
-            console.error('Error updating navbar calories:', error);
-        });
+function setNavbarCalories(data) {
+    const caloriesElement = document.getElementById('today-calories');
+    if (caloriesElement) {
+        caloriesElement.textContent = data.total_calories || 0;
+    }
 }
 
 // Toggle detection logging
@@ -163,36 +160,16 @@ function showToast(message, type = 'info', duration = 4000) {
 }
 
 // Export data functionality
-function exportData() {
-    showToast('Preparing data export...', 'info');
+function exportData(format = 'csv') {
+    // Let the browser download the streamed export straight to disk
+    const link = document.createElement('a');
+    link.href = `/export_data?format=${format}`;
+    link.download = `food-tracker-export-${new Date().toISOString().split('T')[0]}.${format}`;
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
     
-    fetch('/export_data')
-        .then(response => response.json())
-        .then(data => {
-            if (data.status === 'error') {
-                showToast(data.message, 'error');
-                return;
-            }
-            
-            // Create download link
-            const dataStr = JSON.stringify(data, null, 2);
-            const dataBlob = new Blob([dataStr], {type: 'application/json'});
-            const url = URL.createObjectURL(dataBlob);
-            
-            const link = document.createElement('a');
-            link.href = url;
-            link.download = `food-tracker-export-${new Date().toISOString().split('T')[0]}.json`;
-            document.body.appendChild(link);
-            link.click();
-            document.body.removeChild(link);
-            
-            URL.revokeObjectURL(url);
-            showToast('Data exported successfully!', 'success');
-        })
-        .catch(error => {
-            console.error('Error exporting data:', error);
-            showToast('Error exporting data', 'error');
-        });
+    showToast('Data export started', 'success');
 }
 
 // Clear today's logs
@@ -0,0 +1,242 @@
+"""
+Aggregate Cache Module
+Keeps daily and per-food totals in memory so summary endpoints skip the database
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from utils.storage import empty_summary
+
+
+def _copy_summary(summary):
+    """Copy a daily summary so callers can't mutate the cached one"""
+    return {
+        "total_calories": summary["total_calories"],
+        "foods": dict(summary["foods"]),
+        "detection_count": summary["detection_count"]
+    }
+
+
+class AggregateCache:
+    """
+    Write-through cache of detection aggregates indexed by date and food
+
+    Writes made through this process update the cache incrementally. Writes
+    from other workers are picked up by comparing the database file stamp and,
+    when it moved, reloading only the days listed in the store's change log.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._days = {}  # day -> daily summary
+        self._food_counts = {}  # food -> all-time detection count
+        self._total_calories = 0
+        self._total_detections = 0
+        self._records = OrderedDict()  # day -> records newest first, for recently used days
+        self._generation = None
+        self._stamp = None
+        self._checked_at = 0.0
+
+    def daily_summary(self, day):
+        """
+        Get the summary of one day
+
+        Args:
+            day (str): Date in YYYY-MM-DD format
+
+        Returns:
+            dict: Daily summary data
+        """
+        with self._lock:
+            self._refresh()
+            summary = self._days.get(day)
+            return _copy_summary(summary) if summary else empty_summary()
+
+    def totals(self):
+        """
+        Get all-time totals
+
+        Returns:
+            dict: total_calories, total_detections, days_tracked and food_counts
+        """
+        with self._lock:
+            self._refresh()
+            return {
+                "total_calories": self._total_calories,
+                "total_detections": self._total_detections,
+                "days_tracked": len(self._days),
+                "food_counts": dict(self._food_counts)
+            }
+
+    def records_for_day(self, day):
+        """
+        Get all records of one day, newest first
+
+        Args:
+            day (str): Date in YYYY-MM-DD format
+
+        Returns:
+            list: Detection records
+        """
+        with self._lock:
+            self._refresh()
+            records = self._records.get(day)
+            if records is None:
+                records = self.store.records_for_day(day)
+                self._records[day] = records
+                while len(self._records) > Config.AGGREGATE_CACHE_DAYS:
+                    self._records.popitem(last=False)
+            else:
+                self._records.move_to_end(day)
+            return list(records)
+
+    def record_added(self, record, generation):
+        """
+        Apply a record written by this process
+
+        Args:
+            record (dict): The stored record
+            generation (int): Store generation returned by the write
+        """
+        with self._lock:
+            if not self._follows(generation):
+                return
+            day = record["timestamp"][:10]
+            self._apply(day, record["food"], record["calories"], 1)
+            records = self._records.get(day)
+            if records is not None:
+                records.insert(0, record)
+
+    def record_deleted(self, record, generation):
+        """
+        Apply a deletion made by this process to the record's own day
+
+        Args:
+            record (dict): The deleted record
+            generation (int): Store generation returned by the write
+        """
+        self.records_deleted([record], generation)
+
+    def records_deleted(self, records, generation):
+        """
+        Apply a bulk deletion made by this process
+
+        Each record is subtracted from its own day. The store logs one change
+        per affected day, so the write spans that many generations.
+
+        Args:
+            records (list): The deleted records
+            generation (int): Store generation after the write
+        """
+        by_day = {}
+        for record in records:
+            by_day.setdefault(record["timestamp"][:10], []).append(record)
+        with self._lock:
+            if not self._follows(generation, len(by_day)):
+                return
+            for day, day_records in by_day.items():
+                for record in day_records:
+                    self._apply(day, record["food"], record["calories"], -1)
+                cached = self._records.get(day)
+                if cached is not None:
+                    deleted = {record["id"] for record in day_records}
+                    cached[:] = [item for item in cached if item["id"] not in deleted]
+
+    def invalidate(self):
+        """Drop everything so the next read rebuilds from the store"""
+        with self._lock:
+            self._generation = None
+
+    def _follows(self, generation, changes=1):
+        """Check that a write of ``changes`` log entries directly follows the cached generation"""
+        if self._generation is not None and generation == self._generation + changes:
+            self._generation = generation
+            return True
+        # Another worker wrote in between, let the next read catch up
+        self._stamp = None
+        return False
+
+    def _apply(self, day, food, calories, sign):
+        """Add or subtract one detection from the aggregates"""
+        summary = self._days.setdefault(day, empty_summary())
+        summary["total_calories"] += sign * calories
+        summary["detection_count"] += sign
+        summary["foods"][food] = summary["foods"].get(food, 0) + sign
+        if summary["foods"][food] <= 0:
+            del summary["foods"][food]
+        if summary["detection_count"] <= 0:
+            del self._days[day]
+
+        self._food_counts[food] = self._food_counts.get(food, 0) + sign
+        if self._food_counts[food] <= 0:
+            del self._food_counts[food]
+        self._total_calories += sign * calories
+        self._total_detections += sign
+
+    def _refresh(self):
+        """Catch up with writes from other processes"""
+        if self._generation is None:
+            self._rebuild()
+            return
+
+        stamp = self.store.file_stamp()
+        now = time.monotonic()
+        if stamp == self._stamp and now - self._checked_at < Config.AGGREGATE_CACHE_RECHECK:
+            return
+
+        generation, days, complete = self.store.changes_since(self._generation)
+        if not complete:
+            self._rebuild()
+            return
+        for day in days:
+            self._reload_day(day)
+        self._generation = generation
+        self._stamp = stamp
+        self._checked_at = now
+
+    def _reload_day(self, day):
+        """Replace the aggregates of one day with the stored state"""
+        old = self._days.pop(day, None)
+        if old is not None:
+            for food, count in old["foods"].items():
+                self._food_counts[food] -= count
+                if self._food_counts[food] <= 0:
+                    del self._food_counts[food]
+            self._total_calories -= old["total_calories"]
+            self._total_detections -= old["detection_count"]
+
+        new = self.store.daily_summary(day)
+        if new["detection_count"] > 0:
+            self._days[day] = new
+            for food, count in new["foods"].items():
+                self._food_counts[food] = self._food_counts.get(food, 0) + count
+            self._total_calories += new["total_calories"]
+            self._total_detections += new["detection_count"]
+        self._records.pop(day, None)
+
+    def _rebuild(self):
+        """Load all aggregates from the store"""
+        stamp = self.store.file_stamp()
+        generation, rows = self.store.aggregate_snapshot()
+
+        self._days = {}
+        self._food_counts = {}
+        self._total_calories = 0
+        self._total_detections = 0
+        self._records = OrderedDict()
+        for day, food, count, calories in rows:
+            summary = self._days.setdefault(day, empty_summary())
+            summary["foods"][food] = count
+            summary["detection_count"] += count
+            summary["total_calories"] += calories
+            self._food_counts[food] = self._food_counts.get(food, 0) + count
+            self._total_calories += calories
+            self._total_detections += count
+
+        self._generation = generation
+        self._stamp = stamp
+        self._checked_at = time.monotonic()
@@ -0,0 +1,345 @@
+"""
+Batch Detection Module
+Decodes uploaded images in a thread pool and runs them through the model in batches
+"""
+
+import io
+import math
+import struct
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from config import Config
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# Scale factors libjpeg can apply while decoding, so the full image is never in memory
+REDUCED_DECODE = (
+    (1, cv2.IMREAD_COLOR),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+)
+
+_decode_executor = None
+
+
+class UploadError(ValueError):
+    """Raised when an upload can't be turned into images"""
+
+
+def _executor():
+    """Shared thread pool for image decoding"""
+    global _decode_executor
+    if _decode_executor is None:
+        _decode_executor = ThreadPoolExecutor(
+            max_workers=Config.DECODE_WORKERS, thread_name_prefix="decode"
+        )
+    return _decode_executor
+
+
+def _is_zip(filename, data):
+    return filename.lower().endswith(".zip") or data[:4] == b"PK\x03\x04"
+
+
+def _check_limits(items, expanded_bytes, size):
+    """
+    Make sure one more image fits the limits of the whole request
+
+    Args:
+        items (list): Images collected so far
+        expanded_bytes (int): Encoded bytes collected so far
+        size (int): Encoded size of the next image
+
+    Raises:
+        UploadError: If the image count or the expanded size would go over its limit
+    """
+    if len(items) >= Config.UPLOAD_MAX_IMAGES:
+        raise UploadError(f"Too many images, the limit is {Config.UPLOAD_MAX_IMAGES}")
+    if expanded_bytes + size > Config.UPLOAD_MAX_BYTES:
+        raise UploadError("Upload expands beyond the upload size limit")
+
+
+def _read_zip(data, items, expanded_bytes):
+    """
+    Extract image members from a zip archive into items
+
+    Limits are checked against each member's declared size before it is read,
+    so an archive is never extracted past them.
+
+    Returns:
+        int: Encoded bytes collected so far, including this archive's images
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise UploadError("Invalid zip archive")
+
+    for info in archive.infolist():
+        if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        _check_limits(items, expanded_bytes, info.file_size)
+        try:
+            member = archive.read(info)
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError, zlib.error, EOFError):
+            # Corrupt, encrypted or unsupported members are client errors
+            raise UploadError(f"Could not read {info.filename} from the archive")
+        items.append((info.filename, member))
+        expanded_bytes += len(member)
+    return expanded_bytes
+
+
+def read_uploaded_images(request):
+    """
+    Collect encoded images from a multipart form or a raw zip body
+
+    Args:
+        request (flask.Request): Incoming request
+
+    Returns:
+        list: (name, encoded bytes) pairs in upload order
+
+    Raises:
+        UploadError: If the images of all files and archives together go over
+            Config.UPLOAD_MAX_IMAGES or Config.UPLOAD_MAX_BYTES
+    """
+    items = []
+    expanded_bytes = 0
+    if request.files:
+        for upload in request.files.getlist("images") or list(request.files.values()):
+            data = upload.read()
+            name = upload.filename or "image"
+            if _is_zip(name, data):
+                expanded_bytes = _read_zip(data, items, expanded_bytes)
+            else:
+                _check_limits(items, expanded_bytes, len(data))
+                items.append((name, data))
+                expanded_bytes += len(data)
+    elif request.content_type in ("application/zip", "application/x-zip-compressed"):
+        _read_zip(request.get_data(), items, expanded_bytes)
+    return items
+
+
+def image_size(data):
+    """
+    Read the dimensions of a JPEG, PNG, BMP or WebP image from its header
+
+    Args:
+        data (bytes): Encoded image
+
+    Returns:
+        tuple: (width, height), or None for an unknown format or a truncated header
+    """
+    try:
+        if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        if data[:2] == b"BM":
+            if struct.unpack("<I", data[14:18])[0] == 12:
+                return struct.unpack("<HH", data[18:22])
+            width, height = struct.unpack("<ii", data[18:26])
+            return abs(width), abs(height)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            chunk = data[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = struct.unpack("<I", data[21:25])[0]
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return (
+                    int.from_bytes(data[24:27], "little") + 1,
+                    int.from_bytes(data[27:30], "little") + 1
+                )
+            return None
+        if _is_jpeg(data):
+            return _jpeg_size(data)
+    except struct.error:
+        return None
+    return None
+
+
+def _is_jpeg(data):
+    return data[:2] == b"\xff\xd8"
+
+
+def _jpeg_size(data):
+    """Walk the JPEG segments up to the start-of-frame marker holding the dimensions"""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        # SOF0-SOF15, except DHT, JPG and DAC which share the range
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def _decode_plan(data):
+    """
+    Choose how to decode an image from its header alone
+
+    Returns:
+        tuple: (imdecode flag, reduction factor, decoded width, decoded height)
+
+    Raises:
+        UploadError: If the format is unknown or the image is too large even when reduced
+    """
+    size = image_size(data)
+    if size is None or not all(size):
+        raise UploadError("Could not decode image")
+    width, height = size
+    for factor, flag in REDUCED_DECODE:
+        reduced = (math.ceil(width / factor), math.ceil(height / factor))
+        if reduced[0] * reduced[1] <= Config.DECODE_MAX_PIXELS:
+            # Other decoders would still build the full image before shrinking it
+            if factor > 1 and not _is_jpeg(data):
+                break
+            return (flag, factor) + reduced
+    raise UploadError(f"Image of {width}x{height} exceeds the {Config.DECODE_MAX_PIXELS} pixel limit")
+
+
+def _decoded_bytes(data):
+    """Memory the decoded image will take, 0 if it won't be decoded"""
+    try:
+        _, _, width, height = _decode_plan(data)
+    except UploadError:
+        return 0
+    return width * height * 3
+
+
+def _decode(data):
+    """
+    Decode one image as planned from its header
+
+    The header size can't be used for the frame afterwards: imdecode applies
+    the EXIF orientation, so a rotated photo comes back with width and height
+    swapped.
+
+    Returns:
+        tuple: (decoded frame, reduction factor it was decoded at)
+    """
+    flag, factor, _, _ = _decode_plan(data)
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if frame is None:
+        raise UploadError("Could not decode image")
+    return frame, factor
+
+
+def decode_stream(items):
+    """
+    Decode images in the thread pool while keeping only a few in flight
+
+    At most Config.DECODE_WORKERS images, and Config.BATCH_MAX_BYTES of
+    decoded pixels going by their headers, are decoded ahead of the consumer.
+
+    Args:
+        items (list): (name, encoded bytes) pairs
+
+    Yields:
+        tuple: (index, frame, reduction factor, error) with frame None and an error message
+            if the image wasn't decoded
+    """
+    executor = _executor()
+    in_flight = deque()
+    in_flight_bytes = 0
+    pending = deque(enumerate(data for _, data in items))
+
+    while pending or in_flight:
+        while pending and len(in_flight) < Config.DECODE_WORKERS:
+            index, data = pending[0]
+            nbytes = _decoded_bytes(data)
+            if in_flight and in_flight_bytes + nbytes > Config.BATCH_MAX_BYTES:
+                break
+            pending.popleft()
+            in_flight.append((index, nbytes, executor.submit(_decode, data)))
+            in_flight_bytes += nbytes
+
+        index, nbytes, future = in_flight.popleft()
+        in_flight_bytes -= nbytes
+        try:
+            (frame, factor), error = future.result(), None
+        except UploadError as e:
+            frame, factor, error = None, 1, str(e)
+        yield index, frame, factor, error
+
+
+def iter_batches(decoded):
+    """
+    Group decoded frames into batches bounded by count and pixel memory
+
+    Args:
+        decoded: Iterable of (index, frame, reduction factor, error) tuples
+
+    Yields:
+        list: (index, frame, reduction factor, error) tuples forming one model batch, failed decodes alone
+    """
+    batch = []
+    batch_bytes = 0
+    for index, frame, factor, error in decoded:
+        if frame is None:
+            yield [(index, None, factor, error)]
+            continue
+        if batch and (
+            len(batch) >= Config.BATCH_MAX_SIZE
+            or batch_bytes + frame.nbytes > Config.BATCH_MAX_BYTES
+        ):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append((index, frame, factor, None))
+        batch_bytes += frame.nbytes
+    if batch:
+        yield batch
+
+
+def detect_uploaded_images(food_detector, calorie_mapper, items):
+    """
+    Detect food in uploaded images and attach calories estimated from box sizes
+
+    Args:
+        food_detector (FoodDetector): Detector running the model
+        calorie_mapper (CalorieMapper): Calorie and portion estimation
+        items (list): (name, encoded bytes) pairs
+
+    Returns:
+        tuple: (per-image results in upload order, number of model batches)
+    """
+    images = [None] * len(items)
+    batch_count = 0
+    for batch in iter_batches(decode_stream(items)):
+        index, frame, _, error = batch[0]
+        if frame is None:
+            images[index] = {"name": items[index][0], "error": error}
+            continue
+
+        batch_count += 1
+        per_image = food_detector.detect_batch([frame for _, frame, _, _ in batch])
+        for (index, frame, factor, _), detections in zip(batch, per_image):
+            # Boxes of a reduced decode are scaled back to the full-size, oriented image
+            if factor != 1:
+                for detection in detections:
+                    detection["bbox"] = [value * factor for value in detection["bbox"]]
+            # Servings come from each box relative to the image size
+            totals = calorie_mapper.annotate(detections, (frame.shape[1] * factor, frame.shape[0] * factor))
+            images[index] = {
+                "name": items[index][0],
+                "detections": detections,
+                "total_calories": totals["calories"],
+                "nutrition": totals
+            }
+    return images, batch_count
@@ -3,47 +3,46 @@ Food to Calorie Mapping Module
 Maps detected food items to their approximate calorie values
 """
 
+import numpy as np
+from utils.nutrition import NutritionTable, NUTRIENTS, UNKNOWN_CATEGORY, round_nutrient
+
 class CalorieMapper:
-    def __init__(self):
-        # Calorie mapping for detected food items (per average serving)
-        self.calorie_map = {
-            "Apple": 95,        # 1 medium apple
-            "Orange": 85,       # 1 medium orange  
-            "Banana": 105,      # 1 medium banana
-            "Strawberry": 50,   # 1 cup strawberries
-            "Cucumber": 16,     # 1 cup sliced cucumber
-            "Pizza": 285,       # 1 slice pizza
-            "Watermelon": 46,   # 1 cup watermelon
-            "Bread": 80,        # 1 slice bread
-            "Broccoli": 25,     # 1 cup broccoli
-            "Carrot": 25        # 1 medium carrot
-        }
-        
-        # Food category mapping for nutritional info
-        self.food_categories = {
-            "Apple": "Fruit",
-            "Orange": "Fruit", 
-            "Banana": "Fruit",
-            "Strawberry": "Fruit",
-            "Cucumber": "Vegetable",
-            "Pizza": "Fast Food",
-            "Watermelon": "Fruit",
-            "Bread": "Grain",
-            "Broccoli": "Vegetable",
-            "Carrot": "Vegetable"
-        }
+    def __init__(self, table=None):
+        # Per-serving nutrition and portion references loaded from data/nutrition.csv
+        self.table = table if table is not None else NutritionTable()
     
-    def get_calories(self, food_item):
+    def get_calories(self, food_item, bbox=None, frame_size=None):
         """
         Get calorie count for a detected food item
         
         Args:
             food_item (str): Name of the detected food
+            bbox (list): Optional x1, y1, x2, y2 box used to estimate the portion
+            frame_size (tuple): Width and height of the frame the box is in
             
         Returns:
             int: Calorie count for the food item
         """
-        return self.calorie_map.get(food_item, 0)
+        return self.get_nutrition(food_item, bbox, frame_size)["calories"]
+    
+    def get_nutrition(self, food_item, bbox=None, frame_size=None):
+        """
+        Get calories, macronutrients and estimated servings for a detected food item
+        
+        Args:
+            food_item (str): Name of the detected food
+            bbox (list): Optional x1, y1, x2, y2 box used to estimate the portion
+            frame_size (tuple): Width and height of the frame the box is in
+            
+        Returns:
+            dict: Nutrients, servings and the serving they refer to
+        """
+        boxes = None if bbox is None else [bbox]
+        rows, portions, nutrients = self.table.estimate([food_item], boxes, frame_size)
+        nutrition = {nutrient: round_nutrient(nutrient, value) for nutrient, value in zip(NUTRIENTS, nutrients[0])}
+        nutrition["servings"] = float(portions[0])
+        nutrition["serving"] = self.table.servings[rows[0]] if rows[0] < len(self.table) else None
+        return nutrition
     
     def get_category(self, food_item):
         """
@@ -55,52 +54,73 @@ class CalorieMapper:
         Returns:
             str: Category of the food item
         """
-        return self.food_categories.get(food_item, "Unknown")
+        row = self.table.lookup([food_item])[0]
+        return self.table.categories[self.table.category_ids[row]] if row < len(self.table) else UNKNOWN_CATEGORY
     
     def get_all_foods(self):
         """
         Get all available foods and their calories
         
         Returns:
-            dict: All foods with their calorie values
+            dict: All foods with their per-serving calorie values
         """
-        return self.calorie_map.copy()
+        calories = self.table.per_serving[:-1, 0]
+        return {food: int(value) for food, value in zip(self.table.foods, calories.round())}
     
-    def calculate_total_calories(self, food_detections):
+    def annotate(self, detections, frame_size=None):
+        """
+        Attach calories and servings to detections in one vectorized pass
+        
+        Args:
+            detections (list): Detection dicts with food and optional bbox
+            frame_size (tuple): Width and height of the frame the boxes are in
+            
+        Returns:
+            dict: Rounded nutrient totals of all detections
+        """
+        foods, boxes = self._split(detections)
+        _, portions, nutrients = self.table.estimate(foods, boxes, frame_size)
+        for detection, servings, calories in zip(detections, portions.tolist(), nutrients[:, 0].round()):
+            detection["calories"] = int(calories)
+            detection["servings"] = servings
+        return {nutrient: round_nutrient(nutrient, value) for nutrient, value in zip(NUTRIENTS, nutrients.sum(axis=0))}
+    
+    def calculate_total_calories(self, food_detections, frame_size=None):
         """
         Calculate total calories from a list of detected foods
         
         Args:
-            food_detections (list): List of detected food items
+            food_detections (list): Food names, or detection dicts whose bbox sets the portion
+            frame_size (tuple): Width and height of the frame the boxes are in
             
         Returns:
             int: Total calorie count
         """
-        total = 0
-        for food in food_detections:
-            total += self.get_calories(food)
-        return total
+        foods, boxes = self._split(food_detections)
+        return self.table.totals(foods, boxes, frame_size)["calories"]
     
-    def get_nutritional_summary(self, food_detections):
+    def get_nutritional_summary(self, food_detections, frame_size=None):
         """
         Get nutritional summary by category
         
         Args:
-            food_detections (list): List of detected food items
+            food_detections (list): Food names, or detection dicts whose bbox sets the portion
+            frame_size (tuple): Width and height of the frame the boxes are in
             
         Returns:
             dict: Summary by food category
         """
-        summary = {}
-        for food in food_detections:
-            category = self.get_category(food)
-            calories = self.get_calories(food)
-            
-            if category not in summary:
-                summary[category] = {"count": 0, "calories": 0, "foods": []}
-            
-            summary[category]["count"] += 1
-            summary[category]["calories"] += calories
-            summary[category]["foods"].append(food)
-        
-        return summary
\ No newline at end of file
+        foods, boxes = self._split(food_detections)
+        return self.table.summary(foods, boxes, frame_size)
+    
+    @staticmethod
+    def _split(food_detections):
+        """Separate food names from boxes, items without a box count as one serving"""
+        if all(isinstance(item, str) for item in food_detections):
+            return list(food_detections), None
+        foods = [item if isinstance(item, str) else item["food"] for item in food_detections]
+        boxes = np.full((len(foods), 4), np.nan, dtype=np.float32)
+        for index, item in enumerate(food_detections):
+            if not isinstance(item, str) and item.get("bbox") is not None:
+                boxes[index] = item["bbox"]
+        return foods, boxes
@@ -0,0 +1,134 @@
+"""
+Camera Hub Module
+Shares one camera pipeline between every client watching the video feed
+"""
+
+import asyncio
+import threading
+from contextlib import aclosing
+
+from config import Config
+from utils.frame_pipeline import FramePipeline
+from utils.inference_scheduler import InferenceScheduler
+from utils.stream_controller import StreamController
+
+
+class CameraHub:
+    """
+    Single owner of the camera and its frame pipeline
+
+    The first subscriber opens the camera and starts capture, inference and
+    encoding. Later subscribers attach to the same broadcast, and the pipeline
+    is stopped again once the last subscriber disconnects. The stream
+    controller outlives the pipeline, so a restarted stream keeps the settings
+    learned for this machine. A new pipeline only starts once the previous
+    one has stopped, so two capture threads never hold the camera at once.
+    """
+
+    def __init__(self, food_detector, camera_index=None, on_pending=None, scheduler=None,
+                 controller=None, camera_id=None):
+        self.food_detector = food_detector
+        self.camera_index = Config.CAMERA_INDEX if camera_index is None else camera_index
+        self.camera_id = camera_id or Config.DEFAULT_CAMERA_ID
+        self.on_pending = on_pending
+        self.scheduler = scheduler if scheduler is not None else InferenceScheduler(food_detector)
+        self.controller = controller if controller is not None else StreamController()
+        self.pipeline = None
+        self.subscribers = 0
+        self._stopping = None  # pipeline being stopped outside the lock
+        self._lock = threading.Condition()
+
+    def stream(self):
+        """
+        Iterate over encoded frames for one client
+
+        Yields:
+            bytes: JPEG encoded frame shared with all other clients
+        """
+        pipeline = self._acquire()
+        try:
+            for frame_bytes in pipeline.frames():
+                yield frame_bytes
+        finally:
+            self._release(pipeline)
+
+    async def stream_async(self):
+        """
+        Iterate over encoded frames for one client from a coroutine
+
+        Starting and stopping the pipeline can block on the camera, so both
+        run in a worker thread.
+
+        Yields:
+            memoryview: JPEG encoded frame shared with all other clients
+        """
+        pipeline = await asyncio.to_thread(self._acquire)
+        try:
+            async with aclosing(pipeline.frames_async()) as frames:
+                async for frame_bytes in frames:
+                    yield frame_bytes
+        finally:
+            await asyncio.to_thread(self._release, pipeline)
+
+    def stats(self):
+        """
+        Get subscriber count and pipeline statistics
+
+        Returns:
+            dict: Hub statistics
+        """
+        with self._lock:
+            pipeline = self.pipeline
+            subscribers = self.subscribers
+        return {
+            "camera_id": self.camera_id,
+            "camera_index": self.camera_index,
+            "subscribers": subscribers,
+            "pipeline": pipeline.stats() if pipeline is not None else None
+        }
+
+    def settings(self):
+        """
+        Get the current adaptive streaming settings
+
+        Returns:
+            dict: Inference size, JPEG quality, stride and measured latencies
+        """
+        return self.controller.settings()
+
+    def _acquire(self):
+        """Register a subscriber, starting the pipeline if needed"""
+        with self._lock:
+            if self.pipeline is not None and not self.pipeline.running:
+                # The camera failed, so release the stages and registration that are left
+                self.pipeline.stop()
+                self.pipeline = None
+            if self.pipeline is None:
+                self._lock.wait_for(lambda: self._stopping is None)
+            if self.pipeline is None:
+                self.pipeline = FramePipeline(
+                    self.food_detector,
+                    camera_index=self.camera_index,
+                    on_pending=self.on_pending,
+                    controller=self.controller,
+                    scheduler=self.scheduler,
+                    camera_id=self.camera_id
+                )
+                self.pipeline.start()
+            self.subscribers += 1
+            return self.pipeline
+
+    def _release(self, pipeline):
+        """Unregister a subscriber, stopping the pipeline after the last one"""
+        with self._lock:
+            self.subscribers -= 1
+            if self.subscribers > 0 or pipeline is not self.pipeline:
+                return
+            self.pipeline = None
+            self._stopping = pipeline
+        try:
+            pipeline.stop()
+        finally:
+            with self._lock:
+                self._stopping = None
+                self._lock.notify_all()
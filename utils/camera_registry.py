@@ -0,0 +1,90 @@
+"""
+Camera Registry Module
+Serves several cameras from one shared model through a batched inference scheduler
+"""
+
+from collections import OrderedDict
+
+from config import Config
+from utils.camera_hub import CameraHub
+from utils.inference_scheduler import InferenceScheduler
+from utils.stream_controller import StreamController
+
+
+def parse_source(source):
+    """Turn a configured camera source into an OpenCV capture argument"""
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source
+
+
+class CameraRegistry:
+    """
+    Owns one CameraHub per configured camera
+
+    All hubs share one inference scheduler, so the model is loaded once and
+    frames from different cameras are batched into the same model call. They
+    also share one stream controller, since the cameras compete for the same
+    CPU.
+    """
+
+    def __init__(self, food_detector, cameras=None, on_pending=None):
+        cameras = Config.CAMERAS if cameras is None else cameras
+        self.scheduler = InferenceScheduler(food_detector)
+        self.controller = StreamController()
+        self.hubs = OrderedDict()
+        for camera_id, source in cameras.items():
+            self.hubs[camera_id] = CameraHub(
+                food_detector,
+                camera_index=parse_source(source),
+                on_pending=self._pending_callback(on_pending, camera_id),
+                scheduler=self.scheduler,
+                controller=self.controller,
+                camera_id=camera_id
+            )
+
+    @staticmethod
+    def _pending_callback(on_pending, camera_id):
+        if on_pending is None:
+            return None
+        return lambda pending: on_pending(camera_id, pending)
+
+    def get(self, camera_id):
+        """
+        Get the hub of a camera
+
+        Args:
+            camera_id (str): Camera identifier
+
+        Returns:
+            CameraHub: The camera's hub, or None if it isn't configured
+        """
+        return self.hubs.get(camera_id)
+
+    def ids(self):
+        """Configured camera ids in configuration order"""
+        return list(self.hubs)
+
+    def settings(self):
+        """Current adaptive streaming settings shared by all cameras"""
+        return self.controller.settings()
+
+    def tracked_objects(self):
+        """Number of objects tracked across all running cameras"""
+        return self.scheduler.tracked_objects()
+
+    def stats(self):
+        """
+        Get scheduler and per-camera pipeline statistics
+
+        Returns:
+            dict: Registry statistics
+        """
+        return {
+            "scheduler": {
+                "batches": self.scheduler.batches,
+                "max_batch": self.scheduler.max_batch,
+                "max_wait_ms": round(self.scheduler.max_wait * 1000, 1)
+            },
+            "cameras": {camera_id: hub.stats() for camera_id, hub in self.hubs.items()}
+        }
@@ -0,0 +1,106 @@
+"""
+Detection Array Module
+Converts YOLO results into NumPy arrays and post-processes them in bulk
+"""
+
+import numpy as np
+from config import Config
+
+# Column layout of a detection array: x1, y1, x2, y2, confidence, class_id
+DETECTION_COLUMNS = 6
+CONF_COLUMN = 4
+CLASS_COLUMN = 5
+
+# Class names indexed by class id
+CLASS_NAMES = np.array(Config.FOOD_CLASSES)
+
+
+def empty_detections():
+    """
+    Get an empty detection array
+
+    Returns:
+        np.ndarray: Array of shape (0, 6)
+    """
+    return np.empty((0, DETECTION_COLUMNS), dtype=np.float32)
+
+
+def results_to_array(results):
+    """
+    Stack the boxes of all results into one contiguous array
+
+    Each result is copied off the device once through ``boxes.data`` instead
+    of once per box and attribute. Results that already are detection arrays,
+    as returned by the model server, are used as they are.
+
+    Args:
+        results (list): Results returned by the YOLO model or the model server
+
+    Returns:
+        np.ndarray: Float32 array of shape (N, 6)
+    """
+    arrays = []
+    for result in results:
+        if isinstance(result, np.ndarray):
+            if len(result):
+                arrays.append(result[:, :DETECTION_COLUMNS])
+            continue
+        boxes = result.boxes
+        if boxes is not None and len(boxes):
+            arrays.append(boxes.data.cpu().numpy()[:, :DETECTION_COLUMNS])
+
+    if not arrays:
+        return empty_detections()
+    if len(arrays) == 1:
+        return np.ascontiguousarray(arrays[0], dtype=np.float32)
+    return np.concatenate(arrays).astype(np.float32, copy=False)
+
+
+def filter_detections(detections, threshold=None):
+    """
+    Drop detections below the confidence threshold or with unknown classes
+
+    Args:
+        detections (np.ndarray): Detection array of shape (N, 6)
+        threshold (float): Minimum confidence, defaults to Config.CONFIDENCE_THRESHOLD
+
+    Returns:
+        np.ndarray: Filtered detection array
+    """
+    if threshold is None:
+        threshold = Config.CONFIDENCE_THRESHOLD
+
+    class_ids = detections[:, CLASS_COLUMN]
+    mask = (
+        (detections[:, CONF_COLUMN] >= threshold)
+        & (class_ids >= 0)
+        & (class_ids < len(CLASS_NAMES))
+    )
+    return detections[mask]
+
+
+def class_names(detections):
+    """
+    Map class ids to food names
+
+    Args:
+        detections (np.ndarray): Filtered detection array of shape (N, 6)
+
+    Returns:
+        np.ndarray: Food name per detection
+    """
+    return CLASS_NAMES[detections[:, CLASS_COLUMN].astype(np.intp)]
+
+
+def integer_boxes(detections):
+    """
+    Truncate box coordinates to integer pixels
+
+    Args:
+        detections (np.ndarray): Detection array of shape (N, 6)
+
+    Returns:
+        np.ndarray: Int32 array of shape (N, 4)
+    """
+    return detections[:, :4].astype(np.int32)
+
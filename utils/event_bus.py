@@ -0,0 +1,139 @@
+"""
+Event Bus Module
+Fans out detection and logging events to Server-Sent Events subscribers
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+from config import Config
+from utils.frame_pipeline import DropOldestQueue
+
+
+def format_sse(event, data):
+    """
+    Format one Server-Sent Events message
+
+    Args:
+        event (str): Event name
+        data: JSON serializable payload
+
+    Returns:
+        bytes: Encoded SSE message
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+# Comment line sent when nothing happened, so dead connections are noticed
+KEEPALIVE = b": keepalive\n\n"
+
+
+class _AsyncSubscription:
+    """Subscriber queue of a coroutine, filled from any thread through its event loop"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.messages = deque(maxlen=Config.EVENT_QUEUE_SIZE)  # drops the oldest when full
+        self.ready = asyncio.Event()
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._append, message)
+        except RuntimeError:
+            pass  # the event loop is already closed
+
+    def _append(self, message):
+        self.messages.append(message)
+        self.ready.set()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe hub
+
+    Each subscriber gets its own bounded queue. A subscriber that stops reading
+    loses its oldest events instead of blocking the publisher. Events published
+    with a topic, such as one user's storage changes, only reach subscribers of
+    that topic.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # subscriber queue -> topic
+        self._lock = threading.Lock()
+
+    def publish(self, event, data, topic=None):
+        """
+        Send an event to every subscriber
+
+        Args:
+            event (str): Event name
+            data: JSON serializable payload
+            topic (str): Only send to subscribers of this topic, None sends to all
+        """
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = [
+                queue for queue, subscribed in self._subscribers.items() if topic is None or subscribed == topic
+            ]
+        for queue in subscribers:
+            queue.put(message)
+
+    def subscribe(self, topic=None, initial=None):
+        """
+        Iterate over encoded events for one client
+
+        Args:
+            topic (str): Topic whose events are received besides the ones sent to all
+            initial (callable): Returns the messages that bring the client up to date.
+                It is called once the client is registered, so no event published
+                in between is lost.
+
+        Yields:
+            bytes: SSE message, or a keepalive comment after a quiet period
+        """
+        queue = DropOldestQueue(Config.EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = topic
+        try:
+            if initial is not None:
+                yield from initial()
+            while True:
+                message = queue.get(timeout=Config.EVENT_KEEPALIVE_SECONDS)
+                yield message if message is not None else KEEPALIVE
+        finally:
+            with self._lock:
+                self._subscribers.pop(queue, None)
+
+    async def subscribe_async(self, topic=None, initial=None):
+        """
+        Iterate over encoded events for one client from a coroutine
+
+        Args:
+            topic (str): Topic whose events are received besides the ones sent to all
+            initial (callable): Returns the messages that bring the client up to date.
+                It runs in a worker thread once the client is registered.
+
+        Yields:
+            bytes: SSE message, or a keepalive comment after a quiet period
+        """
+        subscription = _AsyncSubscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[subscription] = topic
+        try:
+            if initial is not None:
+                for message in await asyncio.to_thread(lambda: list(initial())):
+                    yield message
+            while True:
+                if not subscription.messages:
+                    subscription.ready.clear()
+                    try:
+                        await asyncio.wait_for(subscription.ready.wait(), Config.EVENT_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield KEEPALIVE
+                        continue
+                yield subscription.messages.popleft()
+        finally:
+            with self._lock:
+                self._subscribers.pop(subscription, None)
@@ -0,0 +1,80 @@
+"""
+Export Module
+Serializes detection records to CSV or JSON Lines one chunk at a time
+"""
+
+import csv
+import io
+import json
+
+EXPORT_FIELDS = ("id", "timestamp", "food", "confidence", "calories")
+
+# Content type of each supported export format
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson"
+}
+
+# Bytes collected before a chunk is handed to the server
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_csv(records):
+    """
+    Encode records as CSV with a header row
+
+    Args:
+        records: Iterable of detection records
+
+    Yields:
+        str: CSV text chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(records):
+    """
+    Encode records as JSON Lines
+
+    Args:
+        records: Iterable of detection records
+
+    Yields:
+        str: JSONL text chunks
+    """
+    lines = []
+    size = 0
+    for record in records:
+        line = json.dumps(record) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+            size = 0
+    yield "".join(lines)
+
+
+def iter_export(records, export_format):
+    """
+    Encode records in the requested format
+
+    Args:
+        records: Iterable of detection records
+        export_format (str): Key of EXPORT_FORMATS
+
+    Yields:
+        str: Text chunks
+    """
+    if export_format == "csv":
+        return iter_csv(records)
+    return iter_jsonl(records)
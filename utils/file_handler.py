@@ -1,46 +1,83 @@
 """
 File Handler Module
-Handles JSON file operations for data persistence
+Handles detection history persistence through the SQLite storage engine
 """
 
-import json
 import os
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from config import Config
+from utils.storage import DetectionStore, migrate_json_history
+from utils.aggregate_cache import AggregateCache
+from utils.metrics import REGISTRY
+from utils.profiler import Span
+
+STORAGE_SECONDS = REGISTRY.histogram(
+    "storage_operation_seconds", "Time spent in FileHandler storage operations", ["operation"]
+)
+
+def _timed(operation):
+    """Record the duration of a FileHandler method under the given operation name"""
+    timer = STORAGE_SECONDS.labels(operation=operation).time()
+    span = Span(f"storage.{operation}")
+    return lambda method: timer(span(method))
+
+def _timestamp_range(start, end):
+    """
+    Turn from/to query values into timestamp bounds
+    
+    Both accept a date (YYYY-MM-DD) or a full ISO timestamp. A date as upper
+    bound includes the whole day.
+    
+    Returns:
+        tuple: (inclusive start, exclusive end), either may be None
+    
+    Raises:
+        ValueError: If a value isn't a valid date or timestamp
+    """
+    bounds = []
+    for value, is_end in ((start, False), (end, True)):
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid date or timestamp: {value}")
+        if is_end and len(value) == 10:
+            parsed += timedelta(days=1)
+        bounds.append(parsed.date().isoformat() if len(value) == 10 else parsed.isoformat())
+    return tuple(bounds)
 
 class FileHandler:
-    def __init__(self):
+    def __init__(self, on_change=None, db_path=None, partition_id=None):
+        self.on_change = on_change  # called with (event, record) after every write
+        self.partition_id = partition_id or Config.DEFAULT_USER_ID  # user or station owning the history
         self.calorie_logs_file = Config.CALORIE_LOGS_FILE
         self.detection_history_file = Config.DETECTION_HISTORY_FILE
         self._ensure_data_directory()
-        self._initialize_files()
+        self.store = DetectionStore(db_path or Config.DATABASE_FILE)
+        # The legacy JSON history predates partitions and belongs to the default one
+        if self.partition_id == Config.DEFAULT_USER_ID:
+            self._migrate_legacy_files()
+        self.cache = AggregateCache(self.store)
     
     def _ensure_data_directory(self):
         """Create data directory if it doesn't exist"""
-        if not os.path.exists(Config.DATA_DIR):
-            os.makedirs(Config.DATA_DIR)
+        os.makedirs(Config.DATA_DIR, exist_ok=True)
     
-    def _initialize_files(self):
-        """Initialize JSON files if they don't exist"""
-        if not os.path.exists(self.calorie_logs_file):
-            self._write_json(self.calorie_logs_file, {})
-        
-        if not os.path.exists(self.detection_history_file):
-            self._write_json(self.detection_history_file, [])
+    @_timed("migrate_legacy_files")
+    def _migrate_legacy_files(self):
+        """Import the old JSON history the first time the database is opened"""
+        count = migrate_json_history(self.store, self.detection_history_file)
+        if count:
+            print(f"✅ Migrated {count} detections from {self.detection_history_file}")
     
-    def _read_json(self, file_path):
-        """Read and parse JSON file"""
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {} if 'logs' in file_path else []
-    
-    def _write_json(self, file_path, data):
-        """Write data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+    def _notify(self, event, record):
+        """Report a write to the change listener"""
+        if self.on_change is not None:
+            self.on_change(event, record)
     
+    @_timed("log_detection")
     def log_detection(self, food_item, confidence, calories):
         """
         Log a new food detection
@@ -49,10 +86,10 @@ class FileHandler:
             food_item (str): Detected food name
             confidence (float): Detection confidence
             calories (int): Calorie count for the food
+            
+        Returns:
+            dict: The stored record including its ID
         """
-        # Add to detection history
-        history = self._read_json(self.detection_history_file)
-        
         detection_record = {
             "timestamp": datetime.now().isoformat(),
             "food": food_item,
@@ -60,35 +97,13 @@ class FileHandler:
             "calories": calories
         }
         
-        history.append(detection_record)
-        self._write_json(self.detection_history_file, history)
-        
-        # Update daily summary
-        self._update_daily_summary(food_item, calories)
-    
-    def _update_daily_summary(self, food_item, calories):
-        """Update daily calorie summary"""
-        logs = self._read_json(self.calorie_logs_file)
-        today = date.today().isoformat()
-        
-        if today not in logs:
-            logs[today] = {
-                "total_calories": 0,
-                "foods": {},
-                "detection_count": 0
-            }
-        
-        # Update totals
-        logs[today]["total_calories"] += calories
-        logs[today]["detection_count"] += 1
-        
-        # Update food counts
-        if food_item not in logs[today]["foods"]:
-            logs[today]["foods"][food_item] = 0
-        logs[today]["foods"][food_item] += 1
-        
-        self._write_json(self.calorie_logs_file, logs)
+        record_id, generation = self.store.add(detection_record)
+        detection_record = {"id": record_id, **detection_record}
+        self.cache.record_added(detection_record, generation)
+        self._notify("logged", detection_record)
+        return detection_record
     
+    @_timed("get_daily_summary")
     def get_daily_summary(self, target_date=None):
         """
         Get daily calorie summary
@@ -102,13 +117,9 @@ class FileHandler:
         if target_date is None:
             target_date = date.today().isoformat()
         
-        logs = self._read_json(self.calorie_logs_file)
-        return logs.get(target_date, {
-            "total_calories": 0,
-            "foods": {},
-            "detection_count": 0
-        })
+        return self.cache.daily_summary(target_date)
     
+    @_timed("get_recent_detections")
     def get_recent_detections(self, limit=10):
         """
         Get recent detection history
@@ -119,9 +130,43 @@ class FileHandler:
         Returns:
             list: Recent detection records
         """
-        history = self._read_json(self.detection_history_file)
-        return history[-limit:] if history else []
+        return self.store.recent(limit)
+    
+    @_timed("query_history")
+    def query_history(self, start=None, end=None, food=None, cursor=None, limit=None):
+        """
+        Get a page of detection history, newest first
+        
+        Args:
+            start (str): First date or timestamp to include
+            end (str): Last date to include, or exclusive end timestamp
+            food (str): Only return this food
+            cursor (str): next_cursor of the previous page
+            limit (int): Page size, capped at Config.HISTORY_MAX_PAGE_SIZE
+            
+        Returns:
+            tuple: (records, cursor of the next page or None)
+        """
+        limit = min(max(limit or Config.HISTORY_PAGE_SIZE, 1), Config.HISTORY_MAX_PAGE_SIZE)
+        start, end = _timestamp_range(start, end)
+        return self.store.history(start, end, food=food, cursor=cursor, limit=limit)
     
+    def export_records(self, start=None, end=None, food=None):
+        """
+        Iterate over detection history for export, oldest first
+        
+        Args:
+            start (str): First date or timestamp to include
+            end (str): Last date to include, or exclusive end timestamp
+            food (str): Only export this food
+            
+        Returns:
+            generator: Detection records, read from the database in chunks
+        """
+        start, end = _timestamp_range(start, end)
+        return self.store.iter_records(start, end, food=food, chunk_size=Config.EXPORT_CHUNK_SIZE)
+    
+    @_timed("get_weekly_summary")
     def get_weekly_summary(self):
         """
         Get weekly calorie summary
@@ -129,24 +174,17 @@ class FileHandler:
         Returns:
             dict: Weekly summary data
         """
-        logs = self._read_json(self.calorie_logs_file)
-        
         # Get last 7 days
-        from datetime import timedelta
         today = date.today()
         weekly_data = {}
         
         for i in range(7):
-            day = today - timedelta(days=i)
-            day_str = day.isoformat()
-            weekly_data[day_str] = logs.get(day_str, {
-                "total_calories": 0,
-                "foods": {},
-                "detection_count": 0
-            })
+            day_str = (today - timedelta(days=i)).isoformat()
+            weekly_data[day_str] = self.cache.daily_summary(day_str)
         
         return weekly_data
     
+    @_timed("get_all_time_stats")
     def get_all_time_stats(self):
         """
         Get all-time statistics
@@ -154,98 +192,88 @@ class FileHandler:
         Returns:
             dict: All-time stats
         """
-        logs = self._read_json(self.calorie_logs_file)
-        history = self._read_json(self.detection_history_file)
-        
-        total_calories = sum(day_data.get("total_calories", 0) for day_data in logs.values())
-        total_detections = len(history)
-        days_tracked = len(logs)
+        totals = self.cache.totals()
+        total_calories = totals["total_calories"]
+        days_tracked = totals["days_tracked"]
+        food_counts = totals["food_counts"]
         
         # Most detected food
-        food_counts = {}
-        for detection in history:
-            food = detection["food"]
-            food_counts[food] = food_counts.get(food, 0) + 1
-        
         most_detected_food = max(food_counts.items(), key=lambda x: x[1]) if food_counts else ("None", 0)
         
         return {
             "total_calories": total_calories,
-            "total_detections": total_detections,
+            "total_detections": totals["total_detections"],
             "days_tracked": days_tracked,
             "avg_calories_per_day": round(total_calories / max(days_tracked, 1), 1),
             "most_detected_food": most_detected_food[0],
             "most_detected_count": most_detected_food[1]
         }
     
+    @_timed("get_todays_detections")
     def get_todays_detections(self):
         """
         Get all detections from today
         
         Returns:
-            list: Today's detections
+            list: Today's detections, newest first
         """
-        history = self._read_json(self.detection_history_file)
-        today = datetime.now().date().isoformat()
-        
-        # Filter for today's detections
-        todays_items = []
-        for item in history:
-            item_date = datetime.fromisoformat(item['timestamp']).date().isoformat()
-            if item_date == today:
-                todays_items.append(item)
-        
-        # Sort by timestamp (newest first)
-        todays_items.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return todays_items
+        return self.cache.records_for_day(date.today().isoformat())
     
+    @_timed("delete_detection")
     def delete_detection(self, detection_id):
         """
-        Delete a detection by its ID (timestamp)
+        Delete a detection by its ID
         
         Args:
-            detection_id (str): The timestamp ID of the detection to delete
+            detection_id (int or str): The record ID, or the timestamp used as ID by older clients
             
         Returns:
             bool: True if deletion was successful, False otherwise
         """
-        # Read current history
-        history = self._read_json(self.detection_history_file)
-        
-        # Find the detection to delete
-        detection_to_delete = None
-        for detection in history:
-            if detection['timestamp'] == detection_id:
-                detection_to_delete = detection
-                break
-        
-        if not detection_to_delete:
+        if isinstance(detection_id, int) or str(detection_id).isdigit():
+            record, generation = self.store.delete(int(detection_id))
+        else:
+            record, generation = self.store.delete_by_timestamp(detection_id)
+        if record is None:
             return False
         
-        # Remove from history
-        history.remove(detection_to_delete)
-        self._write_json(self.detection_history_file, history)
-        
-        # Update daily summary
-        self._remove_from_daily_summary(detection_to_delete['food'], detection_to_delete['calories'])
-        
+        self.cache.record_deleted(record, generation)
+        self._notify("deleted", record)
         return True
     
-    def _remove_from_daily_summary(self, food_item, calories):
-        """Remove food item from daily summary"""
-        logs = self._read_json(self.calorie_logs_file)
-        today = date.today().isoformat()
+    @_timed("delete_detections")
+    def delete_detections(self, detection_ids):
+        """
+        Delete several detections by ID in one transaction
         
-        if today in logs:
-            # Update totals
-            logs[today]["total_calories"] -= calories
-            logs[today]["detection_count"] -= 1
+        Args:
+            detection_ids (list): Record IDs, unknown IDs are ignored
             
-            # Update food counts
-            if food_item in logs[today]["foods"]:
-                logs[today]["foods"][food_item] -= 1
-                if logs[today]["foods"][food_item] <= 0:
-                    del logs[today]["foods"][food_item]
+        Returns:
+            list: The deleted records
+        """
+        records, generation = self.store.delete_many(detection_ids)
+        if records:
+            self.cache.records_deleted(records, generation)
+            self._notify("cleared", {"ids": [record["id"] for record in records]})
+        return records
+    
+    @_timed("clear_day")
+    def clear_day(self, target_date=None):
+        """
+        Delete every detection of one day
+        
+        Args:
+            target_date (str): Date in YYYY-MM-DD format, defaults to today
             
-            self._write_json(self.calorie_logs_file, logs)
\ No newline at end of file
+        Returns:
+            list: The deleted records
+        """
+        if target_date is None:
+            target_date = date.today().isoformat()
+        
+        records, generation = self.store.delete_day(target_date)
+        if records:
+            self.cache.records_deleted(records, generation)
+            self._notify("cleared", {"ids": [record["id"] for record in records]})
+        return records
@@ -5,96 +5,342 @@ Handles YOLOv8 model loading and food detection from camera feed
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from config import Config
+from utils.detections import (
+    results_to_array, filter_detections, class_names, integer_boxes, empty_detections
+)
+from utils.tracker import DetectionTracker
+from utils.inference_backends import get_backend
+from utils.motion_gate import MotionGate
+from utils.result_cache import ResultCache
+from utils.tiling import INFERENCE_MODES, frame_windows, crop, merge_windows
+from utils.metrics import REGISTRY
+from utils.profiler import Span
+import threading
 import time
 
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "food_inference_seconds", "Time spent in the model per call", ["kind"]
+)
+DETECT_SECONDS = REGISTRY.histogram(
+    "food_detect_seconds", "Total detect_food time including post-processing and tracking"
+)
+INFERENCE_SKIPPED = REGISTRY.counter(
+    "food_inference_skipped_total", "Frames that reused the last result because the scene was unchanged"
+)
+DETECTIONS = REGISTRY.counter("food_detections_total", "Detections the model returned for the frames it ran on")
+
+class DetectionState:
+    """
+    Tracking state of one video source
+    
+    Several sources can share one FoodDetector and its model while each keeps
+    its own tracks, motion reference and last result.
+    """
+    
+    def __init__(self, tracker=None, motion_gate=None):
+        # Tracks pending detections waiting for confirmation
+        self.tracker = tracker if tracker is not None else DetectionTracker()
+        # Reuses the last result while the scene is unchanged
+        if motion_gate is None and Config.MOTION_GATING:
+            motion_gate = MotionGate()
+        self.motion_gate = motion_gate
+        self.last_detections = empty_detections()
+        self.model_seconds = None  # model call time of the last frame of this source, None if it skipped the model
+        self._canvas = None
+    
+    def canvas(self, frame):
+        """
+        Copy a frame into this source's reusable drawing buffer
+        
+        Args:
+            frame (np.ndarray): Frame to draw on
+            
+        Returns:
+            np.ndarray: Buffer holding a copy of the frame, overwritten by the next call
+        """
+        if self._canvas is None or self._canvas.shape != frame.shape or self._canvas.dtype != frame.dtype:
+            self._canvas = np.empty_like(frame)
+        np.copyto(self._canvas, frame)
+        return self._canvas
+    
+    def reset(self):
+        """Forget all tracks and the motion reference"""
+        self.tracker = DetectionTracker()
+        self.last_detections = empty_detections()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
 class FoodDetector:
-    def __init__(self):
-        self.model = None
-        self.pending_detections = {}  # Track pending detections waiting for confirmation
-        self.load_model()
+    def __init__(self, model=None, tracker=None, motion_gate=None, result_cache=None, inference_mode=None):
+        self.model = model
+        # Whole frame, overlapping tiles or configured regions of interest
+        self.inference_mode = inference_mode or Config.INFERENCE_MODE
+        if self.inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode '{self.inference_mode}', expected one of {INFERENCE_MODES}")
+        self.model_version = None if model is None else f"{type(model).__name__}:{id(model)}"
+        # State used by detect_food, other sources bring their own
+        self.state = DetectionState(tracker, motion_gate)
+        # Skips the model for uploaded images that were seen recently
+        if result_cache is None and Config.RESULT_CACHE_SIZE > 0:
+            result_cache = ResultCache()
+        self.result_cache = result_cache
+        self._model_lock = threading.Lock()  # the model is shared by streams and uploads
+        self._load_lock = threading.Lock()
+        self._load_attempted = model is not None
+        if self.model is None and not Config.LAZY_MODEL_LOADING:
+            self._ensure_model()
+    
+    @property
+    def tracker(self):
+        return self.state.tracker
+    
+    @property
+    def motion_gate(self):
+        return self.state.motion_gate
+    
+    @property
+    def last_detections(self):
+        return self.state.last_detections
     
     def load_model(self):
-        """Load YOLOv8 model"""
+        """Load YOLOv8 model through the configured inference backend or model server"""
         try:
-            self.model = YOLO(Config.MODEL_PATH)
-            print(f"✅ Model loaded successfully from {Config.MODEL_PATH}")
+            if Config.MODEL_SERVER_ADDRESS:
+                from utils.model_server import RemoteModel
+                self.model = RemoteModel(Config.MODEL_SERVER_ADDRESS)
+                self.model_version = f"remote:{Config.MODEL_SERVER_ADDRESS}"
+                print(f"✅ Using model server at {Config.MODEL_SERVER_ADDRESS}")
+                return
+            backend = get_backend(Config.INFERENCE_BACKEND)
+            self.model = backend.load()
+            self.model_version = backend.version
+            print(f"✅ Model loaded successfully from {backend.artifact_path} ({backend.name})")
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             self.model = None
     
-    def detect_food(self, frame, draw_on_frame=False):
+    def _ensure_model(self):
+        """
+        Load the model on first use
+        
+        Workers that only serve pages and summaries never pay for ultralytics
+        or the weights. A failed load is not retried on every frame.
+        
+        Returns:
+            The model, or None if it couldn't be loaded
+        """
+        if self.model is None and not self._load_attempted:
+            with self._load_lock:
+                if self.model is None and not self._load_attempted:
+                    self.load_model()
+                    self._load_attempted = True
+        return self.model
+    
+    def detect_food(self, frame, draw_on_frame=False, timestamp=None, imgsz=None):
         """
         Detect food items in a frame
         
         Args:
             frame (np.ndarray): Input frame from camera
-            draw_on_frame (bool): Whether to draw bounding boxes on the frame
+            draw_on_frame (bool): Whether to draw bounding boxes on a copy of the frame,
+                which is reused by the next call that draws
+            timestamp (float): Time of the frame in seconds, defaults to now
+            imgsz (int): Model input size, defaults to the size the model was built for
             
         Returns:
             tuple: (processed_frame, detections_list, pending_detections)
         """
-        if self.model is None:
-            return frame, [], []
+        return self.detect_frames([frame], [self.state], [timestamp], draw_on_frame, imgsz)[0]
+    
+    def detect_frames(self, frames, states, timestamps=None, draw_on_frame=False, imgsz=None):
+        """
+        Detect food in frames from several sources with a single model call
+        
+        Each frame is tracked with the state of its own source. Frames whose
+        motion gate reports an unchanged scene reuse that source's last result.
+        
+        Args:
+            frames (list): One frame per source
+            states (list): DetectionState of each source
+            timestamps (list): Time of each frame in seconds, defaults to now
+            draw_on_frame (bool): Whether to draw bounding boxes on the frames
+            imgsz (int): Model input size, defaults to the size the model was built for
+            
+        Returns:
+            list: (processed_frame, detections_list, pending_detections) per frame
+        """
+        if self._ensure_model() is None:
+            return [(frame, [], []) for frame in frames]
         
-        # Run inference
-        results = self.model(frame, conf=Config.CONFIDENCE_THRESHOLD)
+        started = time.perf_counter()
+        now = time.time()
+        times = [now if t is None else t for t in (timestamps or [None] * len(frames))]
+        
+        # Run inference only for sources whose scene changed since their last run
+        changed = [
+            index for index, (frame, state, current_time) in enumerate(zip(frames, states, times))
+            if state.motion_gate is None or state.motion_gate.should_infer(frame, current_time)
+        ]
+        if len(changed) < len(frames):
+            INFERENCE_SKIPPED.inc(len(frames) - len(changed))
+        for state in states:
+            state.model_seconds = None
+        if changed:
+            detections, model_seconds = self._infer([frames[index] for index in changed], "frame", imgsz)
+            for index, frame_detections, seconds in zip(changed, detections, model_seconds):
+                states[index].last_detections = frame_detections
+                states[index].model_seconds = seconds
+        
+        outputs = [
+            self._track(frame, state, current_time, draw_on_frame)
+            for frame, state, current_time in zip(frames, states, times)
+        ]
+        DETECT_SECONDS.observe(time.perf_counter() - started)
+        return outputs
+    
+    def _infer(self, frames, kind, imgsz=None):
+        """
+        Run the model on the frames that aren't in the result cache
+        
+        Only batch uploads use the cache, where identical images are resent.
+        Unchanged stream frames are already skipped by the motion gate.
+        
+        In tiled and ROI mode every frame is split into crops, the crops of all
+        frames go through one model call, and the detections of each frame are
+        shifted back and merged across tile seams.
+        
+        Args:
+            frames (list): Input frames
+            kind (str): Call type reported in the inference latency metric
+            imgsz (int): Model input size
+            
+        Returns:
+            tuple: (filtered detection array per frame, duration of the model call each frame
+                went through, None for frames answered by the cache)
+        """
+        detections = [None] * len(frames)
+        model_seconds = [None] * len(frames)
+        keys = [None] * len(frames)
+        result_cache = self.result_cache if kind == "batch" else None
+        if result_cache is not None:
+            for index, frame in enumerate(frames):
+                keys[index] = result_cache.key(frame, self.model_version, imgsz, self.inference_mode)
+                detections[index] = result_cache.get(keys[index])
+        
+        # Duplicates within one call run through the model only once
+        missing, duplicates = [], {}
+        first_index = {}
+        for index, cached in enumerate(detections):
+            if cached is not None:
+                continue
+            if keys[index] is not None and keys[index] in first_index:
+                duplicates[index] = first_index[keys[index]]
+            else:
+                first_index[keys[index]] = index
+                missing.append(index)
+        if not missing:
+            return detections, model_seconds
+        
+        options = {"conf": Config.CONFIDENCE_THRESHOLD}
+        if imgsz is not None:
+            options["imgsz"] = imgsz
+        inputs, spans = [], []
+        for index in missing:
+            windows = None if self.inference_mode == "full" else frame_windows(frames[index], self.inference_mode)
+            spans.append((index, windows, len(inputs)))
+            inputs.extend([frames[index]] if windows is None else [crop(frames[index], window) for window in windows])
+        source = inputs[0] if len(inputs) == 1 else inputs
+        with self._model_lock, Span("inference"):
+            started = time.perf_counter()
+            results = self.model(source, **options)
+            elapsed = time.perf_counter() - started
+        INFERENCE_SECONDS.labels(kind=kind).observe(elapsed)
+        
+        for index, windows, start in spans:
+            if windows is None:
+                detections[index] = filter_detections(results_to_array([results[start]]))
+            else:
+                detections[index] = merge_windows(
+                    [filter_detections(results_to_array([result])) for result in results[start:start + len(windows)]],
+                    windows, *frames[index].shape[1::-1]
+                )
+            model_seconds[index] = elapsed
+            DETECTIONS.inc(len(detections[index]))
+            if result_cache is not None:
+                result_cache.put(keys[index], detections[index])
+        for index, original in duplicates.items():
+            detections[index] = detections[original]
+            model_seconds[index] = elapsed
+        return detections, model_seconds
+    
+    def _track(self, frame, state, current_time, draw_on_frame):
+        """Match a source's latest detections to its tracks and collect pending ones"""
+        detections = state.last_detections
         
         # Extract detections
         current_detections = []
         pending_detections = []
-        processed_frame = frame.copy() if draw_on_frame else frame
-        current_time = time.time()
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Get box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    class_id = int(box.cls[0].cpu().numpy())
-                    
-                    # Get class name
-                    if class_id < len(Config.FOOD_CLASSES):
-                        food_name = Config.FOOD_CLASSES[class_id]
-                        detection_key = f"{food_name}_{int(x1)}_{int(y1)}"
-                        
-                        # Check if this is a new detection or an existing pending one
-                        if detection_key not in self.pending_detections:
-                            # New detection, start tracking
-                            self.pending_detections[detection_key] = {
-                                "food": food_name,
-                                "confidence": confidence,
-                                "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                                "first_seen": current_time,
-                                "confirmed": False
-                            }
-                        elif current_time - self.pending_detections[detection_key]["first_seen"] >= 0.5:  # Reduced from 2.0 to 0.5 seconds
-                            # Detection has been present for 0.5 seconds, mark as pending
-                            if not self.pending_detections[detection_key]["confirmed"]:
-                                pending_detections.append({
-                                    "food": food_name,
-                                    "confidence": confidence,
-                                    "bbox": [int(x1), int(y1), int(x2), int(y2)]
-                                })
-                        
-                        # Draw bounding box if requested
-                        if draw_on_frame:
-                            processed_frame = self._draw_detection(
-                                processed_frame, food_name, confidence, 
-                                int(x1), int(y1), int(x2), int(y2)
-                            )
-        
-        # Clean up old pending detections (older than 5 seconds)
-        self.pending_detections = {
-            k: v for k, v in self.pending_detections.items()
-            if current_time - v["first_seen"] < 5.0
-        }
+        processed_frame = state.canvas(frame) if draw_on_frame else frame
+        
+        names = class_names(detections).tolist()
+        tracks = state.tracker.update(detections, names, current_time)
+        # Sent back with a logged item, so portions are measured against the real frame
+        frame_size = [int(frame.shape[1]), int(frame.shape[0])]
+        
+        for track in tracks:
+            detection = {
+                "food": track.food,
+                "confidence": track.confidence,
+                "bbox": track.bbox,
+                "frame_size": frame_size,
+                "track_id": track.track_id
+            }
+            current_detections.append(detection)
+            
+            # Detection has been tracked for long enough, mark as pending
+            if state.tracker.is_pending(track, current_time):
+                pending_detections.append(detection)
+            
+            # Draw bounding box if requested
+            if draw_on_frame:
+                processed_frame = self._draw_detection(
+                    processed_frame, track.food, track.confidence, *track.bbox
+                )
         
         return processed_frame, current_detections, pending_detections
     
+    def reset_tracking(self):
+        """Forget all tracks and the motion reference, e.g. when switching video source"""
+        self.state.reset()
+    
+    def detect_batch(self, frames):
+        """
+        Detect food items in independent images with a single model call
+        
+        Unlike detect_food, no tracking state is kept between images.
+        
+        Args:
+            frames (list): Input images as np.ndarray
+            
+        Returns:
+            list: Detection list for each image, in input order
+        """
+        if self._ensure_model() is None:
+            return [[] for _ in frames]
+        
+        batch_detections = []
+        for detections in self._infer(list(frames), "batch")[0]:
+            batch_detections.append([
+                {"food": food_name, "confidence": confidence, "bbox": bbox}
+                for food_name, confidence, bbox in zip(
+                    class_names(detections).tolist(),
+                    detections[:, 4].tolist(),
+                    integer_boxes(detections).tolist()
+                )
+            ])
+        return batch_detections
+    
     def _draw_detection(self, frame, food_name, confidence, x1, y1, x2, y2):
         """Draw detection on frame (only used if draw_on_frame=True)"""
         # Simplified drawing function - just draw rectangle and label
@@ -127,9 +373,11 @@ class FoodDetector:
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, Config.FRAME_WIDTH)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, Config.FRAME_HEIGHT)
         
+        frame = None
         try:
             while True:
-                ret, frame = cap.read()
+                # Frames are done with before the next read, so one buffer is reused throughout
+                ret, frame = cap.read(frame)
                 if not ret:
                     break
                 
@@ -138,10 +386,11 @@ class FoodDetector:
                 
                 # Encode frame as JPEG
                 _, buffer = cv2.imencode('.jpg', annotated_frame)
-                frame_data = buffer.tobytes()
                 
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
+                # Multipart pieces are yielded separately instead of concatenated
+                yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+                yield buffer.tobytes()
+                yield b'\r\n'
         
         finally:
             cap.release()
@@ -0,0 +1,512 @@
+"""
+Frame Pipeline Module
+Runs camera capture, food detection and JPEG encoding as independent stages
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from config import Config
+from utils.inference_scheduler import InferenceScheduler
+from utils.metrics import REGISTRY
+from utils.profiler import Span
+from utils.stream_controller import StreamController
+
+CAPTURED_FRAMES = REGISTRY.counter("camera_frames_captured_total", "Frames read from the camera", ["camera"])
+DROPPED_FRAMES = REGISTRY.counter(
+    "pipeline_frames_dropped_total", "Frames evicted from a full stage queue", ["camera", "stage"]
+)
+ENCODE_SECONDS = REGISTRY.histogram("stream_encode_seconds", "JPEG encoding time per frame")
+STAGE_FPS = REGISTRY.gauge(
+    "pipeline_stage_fps", "Frames per second produced by each stage", ["camera", "stage"]
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "pipeline_queue_depth", "Frames waiting in front of each stage", ["camera", "stage"]
+)
+FRAME_ALLOCATIONS = REGISTRY.counter(
+    "camera_frame_allocations_total", "Captured frames that needed new memory instead of a pooled buffer", ["camera"]
+)
+
+
+class DropOldestQueue:
+    """
+    Bounded queue that discards its oldest item instead of blocking the producer
+
+    Args:
+        maxsize (int): Items kept before the oldest is dropped
+        on_drop: Called with every dropped item, e.g. to return a buffer to its pool
+    """
+
+    def __init__(self, maxsize, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        """
+        Add an item, evicting the oldest one if the queue is full
+
+        Args:
+            item: Item to enqueue
+
+        Returns:
+            bool: True if an older item was dropped to make room
+        """
+        evicted = None
+        with self._cond:
+            dropped = len(self._items) >= self.maxsize
+            if dropped:
+                evicted = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if dropped and self.on_drop is not None:
+            self.on_drop(evicted)
+        return dropped
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item
+
+        Args:
+            timeout (float): Seconds to wait for an item, None waits forever
+
+        Returns:
+            The oldest item, or None if the wait timed out
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class FramePool:
+    """
+    Reusable capture buffers shared by the stages of one camera
+
+    The capture stage reads into a free buffer with ``cap.read(image=...)``
+    instead of letting OpenCV allocate a new frame every time. A frame is
+    held once for every stage it is handed to and returns to the pool when
+    the last of them releases it, so a buffer is never overwritten while
+    inference or encoding still reads it. When all buffers are busy the
+    capture reads into fresh memory, and that frame joins the pool on
+    release as long as the pool is below its size.
+
+    Args:
+        size (int): Buffers kept for reuse, defaults to Config.FRAME_POOL_SIZE
+    """
+
+    def __init__(self, size=None):
+        self.size = Config.FRAME_POOL_SIZE if size is None else size
+        self._free = deque()
+        self._owned = set()  # ids of the buffers that belong to the pool
+        self._held = {}  # id -> [frame, stages still holding it]
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a free buffer to read the next frame into
+
+        Returns:
+            np.ndarray: Free buffer, or None if every buffer is in use
+        """
+        with self._lock:
+            return self._free.popleft() if self._free else None
+
+    def hold(self, frame, count):
+        """
+        Mark a frame as held by a number of stages
+
+        Args:
+            frame (np.ndarray): Captured frame
+            count (int): Stages that will each call release()
+        """
+        if count <= 0:
+            self._recycle(frame)
+            return
+        with self._lock:
+            self._held[id(frame)] = [frame, count]
+
+    def release(self, frame):
+        """Drop one hold on a frame, recycling it after the last one"""
+        with self._lock:
+            entry = self._held.get(id(frame))
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._held[id(frame)]
+        self._recycle(frame)
+
+    def discard(self, frame):
+        """Forget a buffer OpenCV replaced, e.g. after the camera changed resolution"""
+        with self._lock:
+            self._owned.discard(id(frame))
+
+    def _recycle(self, frame):
+        with self._lock:
+            if id(frame) not in self._owned:
+                if len(self._owned) >= self.size:
+                    return
+                self._owned.add(id(frame))
+            self._free.append(frame)
+
+    def stats(self):
+        """
+        Get pool occupancy
+
+        Returns:
+            dict: Pool size, buffers owned and buffers in use
+        """
+        with self._lock:
+            return {"size": self.size, "buffers": len(self._owned), "in_use": len(self._owned) - len(self._free)}
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class FrameBroadcaster:
+    """
+    Shares the latest encoded frame with any number of subscribers
+
+    Every subscriber receives the same frame object, so a frame is encoded and
+    stored once no matter how many clients watch it. Coroutine subscribers get
+    the published buffer itself. Thread subscribers serve WSGI, which only
+    accepts bytes, so the first of them to see a frame converts it once for all. Subscribers that fall
+    behind jump straight to the newest frame instead of holding back the others.
+    Thread subscribers wait on a condition, coroutine subscribers on a future
+    that publish() resolves through their event loop.
+    """
+
+    def __init__(self):
+        self.subscribers = 0
+        self.skipped = 0
+        self._frame = None
+        self._frame_bytes = None  # the current frame as bytes, made on first use
+        self._seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._waiters = set()  # futures of coroutine subscribers waiting for the next frame
+
+    def publish(self, frame_bytes):
+        """
+        Replace the current frame and wake up all subscribers
+
+        Args:
+            frame_bytes (bytes or memoryview): Encoded frame, not changed after publishing
+        """
+        with self._cond:
+            self._frame = frame_bytes
+            self._frame_bytes = None
+            self._seq += 1
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, set()
+        self._wake_async(waiters)
+
+    def close(self):
+        """Wake up all subscribers and end their streams"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, set()
+        self._wake_async(waiters)
+
+    @staticmethod
+    def _wake_async(waiters):
+        for future in waiters:
+            try:
+                future.get_loop().call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # the subscriber's event loop is already closed
+
+    def subscribe(self):
+        """
+        Iterate over published frames until the broadcaster is closed
+
+        Yields:
+            bytes: Newest encoded frame
+        """
+        last_seq = 0
+        with self._cond:
+            self.subscribers += 1
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != last_seq or self._closed, 0.5)
+                    if self._closed:
+                        return
+                    if self._seq == last_seq:
+                        continue
+                    if last_seq:
+                        self.skipped += self._seq - last_seq - 1
+                    last_seq = self._seq
+                    if self._frame_bytes is None:
+                        self._frame_bytes = bytes(self._frame)
+                    frame_bytes = self._frame_bytes
+                yield frame_bytes
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    async def subscribe_async(self):
+        """
+        Iterate over published frames from a coroutine until the broadcaster is closed
+
+        Waiting costs one future per subscriber instead of a thread.
+
+        Yields:
+            bytes or memoryview: Newest encoded frame, as published
+        """
+        loop = asyncio.get_running_loop()
+        last_seq = 0
+        with self._cond:
+            self.subscribers += 1
+        try:
+            while True:
+                future = None
+                with self._cond:
+                    if self._closed:
+                        return
+                    if self._seq == last_seq:
+                        future = loop.create_future()
+                        self._waiters.add(future)
+                    else:
+                        if last_seq:
+                            self.skipped += self._seq - last_seq - 1
+                        last_seq = self._seq
+                        frame_bytes = self._frame
+                if future is None:
+                    yield frame_bytes
+                    continue
+                try:
+                    await asyncio.wait_for(future, 0.5)
+                except asyncio.TimeoutError:
+                    with self._cond:
+                        self._waiters.discard(future)
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+
+class RateMeter:
+    """Measures how many events per second a stage produces"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.rate = 0.0
+        self._count = 0
+        self._window_start = time.time()
+        self._lock = threading.Lock()
+
+    def tick(self):
+        """Record one event"""
+        with self._lock:
+            self._count += 1
+            now = time.time()
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                self.rate = self._count / elapsed
+                self._count = 0
+                self._window_start = now
+
+
+class FramePipeline:
+    """
+    Camera pipeline with decoupled stages
+
+    The capture thread reads frames at camera rate and hands each one to the
+    encoder queue and to this camera's latest-wins slot in the inference
+    scheduler, which may batch it with frames from other cameras. Detections
+    update as fast as the CPU allows without slowing down the stream. Encoded
+    JPEG frames are published to a broadcaster shared by every client
+    watching the stream.
+
+    A StreamController picks the inference size, inference stride and JPEG
+    quality from the latencies the stages report.
+    """
+
+    def __init__(self, food_detector, camera_index=None, on_pending=None, controller=None,
+                 scheduler=None, camera_id=None):
+        self.camera_index = Config.CAMERA_INDEX if camera_index is None else camera_index
+        self.camera_id = camera_id or Config.DEFAULT_CAMERA_ID
+        self.on_pending = on_pending
+        self.controller = controller if controller is not None else StreamController()
+        self.scheduler = scheduler if scheduler is not None else InferenceScheduler(food_detector)
+
+        self.frame_pool = FramePool()
+        self.encode_queue = DropOldestQueue(Config.ENCODE_QUEUE_SIZE, on_drop=self.frame_pool.release)
+        self.broadcaster = FrameBroadcaster()
+
+        self.capture_rate = RateMeter()
+        self.inference_rate = RateMeter()
+        self.encode_rate = RateMeter()
+
+        for stage, meter in (
+            ("capture", self.capture_rate),
+            ("inference", self.inference_rate),
+            ("encode", self.encode_rate)
+        ):
+            STAGE_FPS.labels(camera=self.camera_id, stage=stage).set_function(
+                lambda meter=meter: meter.rate
+            )
+        QUEUE_DEPTH.labels(camera=self.camera_id, stage="inference").set_function(
+            lambda: self.scheduler.stats(self.camera_id)["queue_depth"]
+        )
+        QUEUE_DEPTH.labels(camera=self.camera_id, stage="encode").set_function(
+            lambda: len(self.encode_queue)
+        )
+
+        self.running = False
+        self._threads = []
+        self._registration = None
+
+    def start(self):
+        """Open the camera and start all pipeline stages"""
+        if self.running:
+            return
+        self.running = True
+        self._registration = self.scheduler.register(self.camera_id, self._on_result, self.controller)
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name=f"capture-{self.camera_id}", daemon=True),
+            threading.Thread(target=self._encode_loop, name=f"encode-{self.camera_id}", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop all pipeline stages and release the camera"""
+        self.running = False
+        self.broadcaster.close()
+        self.scheduler.unregister(self.camera_id, self._registration)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+        self._threads = []
+
+    def frames(self):
+        """
+        Iterate over encoded frames until the pipeline stops
+
+        Yields:
+            bytes: JPEG encoded frame
+        """
+        return self.broadcaster.subscribe()
+
+    def frames_async(self):
+        """
+        Iterate over encoded frames from a coroutine until the pipeline stops
+
+        Yields:
+            memoryview: JPEG encoded frame
+        """
+        return self.broadcaster.subscribe_async()
+
+    def stats(self):
+        """
+        Get per-stage throughput and queue depth
+
+        Returns:
+            dict: Stage statistics
+        """
+        state = self.scheduler.state(self.camera_id)
+        motion_gate = state.motion_gate if state is not None else None
+        return {
+            "running": self.running,
+            "capture": {
+                "fps": round(self.capture_rate.rate, 1)
+            },
+            "inference": dict(
+                self.scheduler.stats(self.camera_id),
+                fps=round(self.inference_rate.rate, 1),
+                motion_gate=motion_gate.stats() if motion_gate is not None else None
+            ),
+            "encode": {
+                "fps": round(self.encode_rate.rate, 1),
+                "queue_depth": len(self.encode_queue),
+                "dropped": self.encode_queue.dropped
+            },
+            "frame_pool": self.frame_pool.stats(),
+            "settings": self.controller.settings(),
+            "broadcast": {
+                "subscribers": self.broadcaster.subscribers,
+                "skipped": self.broadcaster.skipped
+            }
+        }
+
+    def _capture_loop(self):
+        """Read frames from the camera and fan them out to the other stages"""
+        cap = cv2.VideoCapture(self.camera_index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, Config.FRAME_WIDTH)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, Config.FRAME_HEIGHT)
+
+        frame_number = 0
+        try:
+            while self.running:
+                buffer = self.frame_pool.acquire()
+                with Span("capture"):
+                    ret, frame = cap.read(buffer)
+                if not ret:
+                    break
+                if frame is not buffer:
+                    FRAME_ALLOCATIONS.labels(camera=self.camera_id).inc()
+                    if buffer is not None:
+                        self.frame_pool.discard(buffer)
+                self.capture_rate.tick()
+                CAPTURED_FRAMES.labels(camera=self.camera_id).inc()
+                frame_number += 1
+
+                # The encoder and, for every Nth frame, the scheduler each release the frame when done
+                infer = self.controller.should_infer(frame_number)
+                self.frame_pool.hold(frame, 2 if infer else 1)
+                if infer and self.scheduler.submit(
+                    self.camera_id, frame, self.controller.imgsz, release=self.frame_pool.release
+                ):
+                    DROPPED_FRAMES.labels(camera=self.camera_id, stage="inference").inc()
+                if self.encode_queue.put(frame):
+                    DROPPED_FRAMES.labels(camera=self.camera_id, stage="encode").inc()
+        except Exception as e:
+            print(f"Error in capture stage: {str(e)}")
+        finally:
+            cap.release()
+            self.running = False
+            self.broadcaster.close()
+
+    def _on_result(self, new_pending):
+        """Receive this camera's detections from the inference scheduler"""
+        self.inference_rate.tick()
+        if self.on_pending is not None:
+            self.on_pending(new_pending)
+
+    def _encode_loop(self):
+        """Encode captured frames to JPEG for streaming"""
+        while self.running:
+            frame = self.encode_queue.get(timeout=0.5)
+            if frame is None:
+                continue
+            started = time.perf_counter()
+            with Span("encode"):
+                ok, buffer = cv2.imencode(
+                    '.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.controller.jpeg_quality]
+                )
+            self.frame_pool.release(frame)
+            elapsed = time.perf_counter() - started
+            ENCODE_SECONDS.observe(elapsed)
+            self.controller.record_encode(elapsed)
+            if not ok:
+                continue
+            self.encode_rate.tick()
+            # Published as a read-only view of imencode's fresh array instead of a copy
+            self.broadcaster.publish(memoryview(buffer.reshape(-1)).toreadonly())
@@ -0,0 +1,229 @@
+"""
+Inference Backends Module
+Loads the YOLO model through PyTorch, ONNX Runtime or OpenVINO, exporting converted models on demand
+"""
+
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+import numpy as np
+from config import Config
+from utils.detections import results_to_array, filter_detections
+from utils.tracker import iou_matrix
+
+
+class InferenceBackend(ABC):
+    """
+    Base class for a way of running the trained model
+
+    Converted models are cached next to ``Config.MODEL_PATH`` and re-exported
+    whenever the source weights are newer than the cached artifact.
+    """
+
+    name = None
+
+    def __init__(self, source_path=None):
+        self.source_path = source_path or Config.MODEL_PATH
+
+    @property
+    @abstractmethod
+    def artifact_path(self):
+        """Path of the model file or directory this backend loads"""
+
+    @property
+    def version(self):
+        """Identifies the weights this backend loads, changes whenever they are rebuilt"""
+        path = self.artifact_path
+        mtime = int(os.path.getmtime(path)) if os.path.exists(path) else 0
+        return f"{self.name}:{os.path.basename(path)}:{mtime}"
+
+    def is_cached(self):
+        """
+        Check whether an up-to-date converted model exists
+
+        Returns:
+            bool: True if the artifact exists and is newer than the source weights
+        """
+        if not os.path.exists(self.artifact_path):
+            return False
+        if not os.path.exists(self.source_path):
+            return True
+        return os.path.getmtime(self.artifact_path) >= os.path.getmtime(self.source_path)
+
+    def export(self, force=False):
+        """
+        Convert the source weights for this backend
+
+        Args:
+            force (bool): Re-export even if a cached artifact is up to date
+
+        Returns:
+            str: Path of the converted model
+        """
+        if force or not self.is_cached():
+            self._convert()
+        return self.artifact_path
+
+    def load(self):
+        """
+        Load the model, exporting it first if needed
+
+        Returns:
+            YOLO: Model callable as ``model(frame, conf=...)``
+        """
+        from ultralytics import YOLO
+        return YOLO(self.export(), task="detect")
+
+    @abstractmethod
+    def _convert(self):
+        """Build the artifact at artifact_path from the source weights"""
+
+    def _yolo_export(self, export_format, **kwargs):
+        """Run the ultralytics exporter and move the result to the artifact path"""
+        from ultralytics import YOLO
+        exported = YOLO(self.source_path).export(
+            format=export_format, imgsz=Config.INFERENCE_IMGSZ, **kwargs
+        )
+        exported = str(exported)
+        if os.path.abspath(exported) != os.path.abspath(self.artifact_path):
+            if os.path.isdir(self.artifact_path):
+                shutil.rmtree(self.artifact_path)
+            shutil.move(exported, self.artifact_path)
+
+
+class TorchBackend(InferenceBackend):
+    """Original PyTorch weights"""
+
+    name = "torch"
+
+    @property
+    def artifact_path(self):
+        return self.source_path
+
+    def is_cached(self):
+        return os.path.exists(self.source_path)
+
+    def _convert(self):
+        raise FileNotFoundError(f"Model weights not found at {self.source_path}")
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime on CPU"""
+
+    name = "onnx"
+
+    @property
+    def artifact_path(self):
+        return os.path.splitext(self.source_path)[0] + ".onnx"
+
+    def _convert(self):
+        self._yolo_export("onnx", dynamic=True, simplify=True)
+
+
+class OnnxInt8Backend(OnnxBackend):
+    """ONNX Runtime with dynamically quantized int8 weights"""
+
+    name = "onnx-int8"
+
+    @property
+    def artifact_path(self):
+        return os.path.splitext(self.source_path)[0] + ".int8.onnx"
+
+    def _convert(self):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        float_model = OnnxBackend(self.source_path).export()
+        quantize_dynamic(float_model, self.artifact_path, weight_type=QuantType.QUInt8)
+
+
+class OpenVinoBackend(InferenceBackend):
+    """Intel OpenVINO runtime"""
+
+    name = "openvino"
+
+    @property
+    def artifact_path(self):
+        return os.path.splitext(self.source_path)[0] + "_openvino_model"
+
+    def _convert(self):
+        self._yolo_export("openvino", dynamic=True)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (TorchBackend, OnnxBackend, OnnxInt8Backend, OpenVinoBackend)
+}
+
+
+def get_backend(name=None, source_path=None):
+    """
+    Create the backend selected by name
+
+    Args:
+        name (str): Backend name, defaults to Config.INFERENCE_BACKEND
+        source_path (str): PyTorch weights, defaults to Config.MODEL_PATH
+
+    Returns:
+        InferenceBackend: Backend instance
+    """
+    name = name or Config.INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](source_path)
+
+
+def parity_check(reference_model, candidate_model, frames, iou_threshold=0.5):
+    """
+    Compare the detections of two models on the same frames
+
+    Detections are paired one to one, greedily by descending IoU: a
+    reference detection counts as matched if an unused candidate detection
+    of the same class overlaps it with an IoU of at least ``iou_threshold``.
+
+    Args:
+        reference_model: Model used as ground truth, usually the torch backend
+        candidate_model: Model under test
+        frames (list): Frames to run both models on
+        iou_threshold (float): Minimum IoU for a match
+
+    Returns:
+        dict: Detection counts, match rate and largest confidence difference
+    """
+    reference_total = candidate_total = matched = 0
+    max_conf_delta = 0.0
+
+    for frame in frames:
+        reference = filter_detections(
+            results_to_array(reference_model(frame, conf=Config.CONFIDENCE_THRESHOLD))
+        )
+        candidate = filter_detections(
+            results_to_array(candidate_model(frame, conf=Config.CONFIDENCE_THRESHOLD))
+        )
+        reference_total += len(reference)
+        candidate_total += len(candidate)
+        if not len(reference) or not len(candidate):
+            continue
+
+        ious = iou_matrix(reference[:, :4], candidate[:, :4])
+        ious[reference[:, 5][:, None] != candidate[:, 5][None, :]] = 0.0
+        rows, cols = np.nonzero(ious >= iou_threshold)
+        reference_used = np.zeros(len(reference), dtype=bool)
+        candidate_used = np.zeros(len(candidate), dtype=bool)
+        # Each candidate box can reproduce only one reference box
+        for pair in np.argsort(-ious[rows, cols], kind="stable"):
+            ref, cand = rows[pair], cols[pair]
+            if reference_used[ref] or candidate_used[cand]:
+                continue
+            reference_used[ref] = candidate_used[cand] = True
+            matched += 1
+            max_conf_delta = max(max_conf_delta, float(abs(reference[ref, 4] - candidate[cand, 4])))
+
+    return {
+        "frames": len(frames),
+        "reference_detections": reference_total,
+        "candidate_detections": candidate_total,
+        "matched": matched,
+        "match_rate": round(matched / reference_total, 4) if reference_total else 1.0,
+        "max_confidence_delta": round(max_conf_delta, 4)
+    }
@@ -0,0 +1,259 @@
+"""
+Inference Scheduler Module
+Collects frames from every camera into micro-batches for one shared model
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from utils.food_detector import DetectionState
+from utils.metrics import REGISTRY
+
+BATCH_SIZE = REGISTRY.histogram(
+    "inference_batch_size", "Camera frames per shared model call", buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
+BATCH_WAIT_SECONDS = REGISTRY.histogram(
+    "inference_batch_wait_seconds", "Time the oldest frame of a batch waited for the model"
+)
+
+
+class _Camera:
+    """Scheduler bookkeeping for one registered camera"""
+
+    def __init__(self, on_result, controller):
+        self.on_result = on_result
+        self.controller = controller
+        self.state = DetectionState()
+        self.frame = None
+        self.release = None  # hands the waiting frame back to its pool
+        self.imgsz = None  # model input size requested with the waiting frame
+        self.submitted_at = 0.0
+        self.dropped = 0
+
+
+class InferenceScheduler:
+    """
+    Runs detection for all cameras on one model in fair micro-batches
+
+    Each camera has a single latest-wins slot, so a fast camera replaces its
+    own waiting frame instead of queueing more work. When a frame arrives the
+    scheduler waits up to ``max_wait`` seconds for the other cameras, then
+    runs one model call over the ready frames. If more cameras are ready than
+    fit in a batch, they are served in round-robin order, so a busy camera
+    can't starve the others. A batch only holds frames that asked for the
+    same input size. The cameras of a CameraRegistry share one stream
+    controller and so one size, but frames submitted just before and after
+    it changes the size, or from pipelines with their own controller, run in
+    separate batches. Each camera keeps its own tracking state.
+
+    The duration of the model call is reported once per batch to each
+    stream controller with a camera whose frame went through the model, so
+    a shared controller sees one sample per call however many cameras joined.
+    """
+
+    def __init__(self, food_detector, max_batch=None, max_wait=None):
+        self.food_detector = food_detector
+        self.max_batch = max_batch or Config.INFERENCE_BATCH_SIZE
+        self.max_wait = Config.INFERENCE_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.batches = 0
+        self._cameras = OrderedDict()  # camera id -> _Camera, in round-robin order
+        self._running = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def register(self, camera_id, on_result, controller=None):
+        """
+        Add a camera, starting the scheduler with the first one
+
+        Args:
+            camera_id (str): Camera identifier
+            on_result: Called with the pending detections after each of its frames
+            controller (StreamController): Receives the model latency of batches this camera joined
+
+        Returns:
+            object: Registration to pass to unregister
+        """
+        with self._cond:
+            camera = self._cameras[camera_id] = _Camera(on_result, controller)
+            if not self._running:
+                self._running = True
+                # A loop that hasn't noticed the last stop exits once it sees it was replaced
+                self._thread = threading.Thread(target=self._loop, name="inference", daemon=True)
+                self._thread.start()
+            return camera
+
+    def unregister(self, camera_id, registration=None):
+        """
+        Remove a camera, stopping the scheduler after the last one
+
+        Args:
+            camera_id (str): Camera identifier
+            registration: Value returned by register. The camera is only removed
+                while it is still this registration, so a late stop can't remove
+                a pipeline that was restarted under the same ID.
+        """
+        with self._cond:
+            camera = self._cameras.get(camera_id)
+            if camera is not None and registration is not None and camera is not registration:
+                return
+            if camera is not None:
+                del self._cameras[camera_id]
+                _release(camera.frame, camera.release)
+            if self._cameras:
+                return
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    def submit(self, camera_id, frame, imgsz=None, release=None):
+        """
+        Hand the newest frame of a camera to the scheduler
+
+        Args:
+            camera_id (str): Camera identifier
+            frame (np.ndarray): Captured frame
+            imgsz (int): Model input size requested by the stream controller
+            release: Called with the frame once the scheduler no longer needs it
+
+        Returns:
+            bool: True if an older frame of this camera was dropped
+        """
+        with self._cond:
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                _release(frame, release)
+                return False
+            dropped = camera.frame is not None
+            if dropped:
+                camera.dropped += 1
+                _release(camera.frame, camera.release)
+            else:
+                camera.submitted_at = time.monotonic()
+            camera.frame = frame
+            camera.release = release
+            camera.imgsz = imgsz
+            self._cond.notify()
+            return dropped
+
+    def state(self, camera_id):
+        """Get the tracking state of a camera, or None if it isn't registered"""
+        with self._cond:
+            camera = self._cameras.get(camera_id)
+            return camera.state if camera is not None else None
+
+    def stats(self, camera_id):
+        """
+        Get the waiting frame count and drop count of one camera
+
+        Returns:
+            dict: Camera scheduling statistics
+        """
+        with self._cond:
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                return {"queue_depth": 0, "dropped": 0}
+            return {"queue_depth": int(camera.frame is not None), "dropped": camera.dropped}
+
+    def tracked_objects(self):
+        """Number of objects tracked across all cameras"""
+        with self._cond:
+            return sum(len(camera.state.tracker.store) for camera in self._cameras.values())
+
+    def _ready(self):
+        return [camera_id for camera_id, camera in self._cameras.items() if camera.frame is not None]
+
+    def _take_batch(self):
+        """
+        Take up to max_batch waiting frames in round-robin order
+
+        The first camera in the rotation sets the input size, and only frames
+        asking for that size join it. The others wait for the next batch at
+        the front of the rotation.
+
+        Returns:
+            tuple: (batch entries, input size of the batch)
+        """
+        ready = self._ready()
+        if not ready:
+            return [], None
+        imgsz = self._cameras[ready[0]].imgsz
+        batch = []
+        for camera_id in [camera_id for camera_id in ready if self._cameras[camera_id].imgsz == imgsz][:self.max_batch]:
+            camera = self._cameras[camera_id]
+            batch.append((camera_id, camera, camera.frame, camera.submitted_at, camera.release))
+            camera.frame = None
+            camera.release = None
+            # Served cameras go to the back of the rotation
+            self._cameras.move_to_end(camera_id)
+        return batch, imgsz
+
+    def _active(self):
+        """Whether the calling thread is still the scheduler's one loop"""
+        return self._running and self._thread is threading.current_thread()
+
+    def _loop(self):
+        """Wait for frames, collect a batch and run it through the model"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._active() or self._ready(), 0.5)
+                if not self._active():
+                    return
+                if not self._ready():
+                    continue
+
+                # Give the other cameras until the deadline to deliver a frame
+                deadline = time.monotonic() + self.max_wait
+                target = min(self.max_batch, len(self._cameras))
+                while self._active() and len(self._ready()) < target:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._active():
+                    return
+                batch, imgsz = self._take_batch()
+
+            if not batch:
+                continue
+            self._run(batch, imgsz)
+
+    def _run(self, batch, imgsz):
+        """Detect food in one batch and report each camera's pending detections"""
+        BATCH_SIZE.observe(len(batch))
+        BATCH_WAIT_SECONDS.observe(time.monotonic() - min(item[3] for item in batch))
+        try:
+            outputs = self.food_detector.detect_frames(
+                [frame for _, _, frame, _, _ in batch],
+                [camera.state for _, camera, _, _, _ in batch],
+                imgsz=imgsz
+            )
+        except Exception as e:
+            print(f"Error in inference scheduler: {str(e)}")
+            return
+        finally:
+            # Detections hold no reference to the pixels, so the frames can be reused
+            for _, _, frame, _, release in batch:
+                _release(frame, release)
+        self.batches += 1
+        # Frames answered by the motion gate say nothing about model latency
+        controllers = {}
+        for _, camera, _, _, _ in batch:
+            if camera.controller is not None and camera.state.model_seconds is not None:
+                controllers[id(camera.controller)] = (camera.controller, camera.state.model_seconds)
+        for controller, seconds in controllers.values():
+            controller.record_inference(seconds)
+        for (camera_id, camera, _, _, _), (_, _, pending) in zip(batch, outputs):
+            try:
+                camera.on_result(pending)
+            except Exception as e:
+                print(f"Error delivering detections for camera {camera_id}: {str(e)}")
+
+
+def _release(frame, release):
+    if frame is not None and release is not None:
+        release(frame)
@@ -0,0 +1,146 @@
+"""
+Model Server Module
+Runs the food model in one process and serves inference to app workers over a local socket
+
+Usage:
+    export MODEL_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    MODEL_SERVER_ADDRESS=data/model_server.sock python -m utils.model_server
+    MODEL_SERVER_ADDRESS=data/model_server.sock gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+
+from config import Config
+from utils.detections import results_to_array
+from utils.inference_backends import get_backend
+
+
+def _family(address):
+    """Unix sockets for paths, TCP for (host, port) pairs"""
+    return "AF_UNIX" if isinstance(address, str) else "AF_INET"
+
+
+def _authkey():
+    """
+    Get the shared secret both ends authenticate with
+
+    Connections exchange pickles, so whoever knows the key can run code in
+    the other process. There is deliberately no default.
+
+    Raises:
+        RuntimeError: If MODEL_SERVER_AUTHKEY isn't set
+    """
+    if not Config.MODEL_SERVER_AUTHKEY:
+        raise RuntimeError("Set MODEL_SERVER_AUTHKEY to a random secret shared by the model server and its workers")
+    return Config.MODEL_SERVER_AUTHKEY
+
+
+class ModelServer:
+    """
+    Owns the only copy of the model and answers detection requests
+
+    Every connected worker gets its own thread. Model calls are serialized,
+    and results are sent back as detection arrays of shape (N, 6) so that
+    workers never need ultralytics or torch.
+    """
+
+    def __init__(self, address=None, model=None):
+        self.address = address or Config.MODEL_SERVER_ADDRESS
+        self.model = model
+        self._model_lock = threading.Lock()
+
+    def serve_forever(self):
+        """Load the model and accept worker connections until interrupted"""
+        authkey = _authkey()
+        if self.model is None:
+            backend = get_backend(Config.INFERENCE_BACKEND)
+            self.model = backend.load()
+            print(f"✅ Model server loaded {backend.artifact_path} ({backend.name})")
+
+        if _family(self.address) == "AF_UNIX" and os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        with Listener(self.address, family=_family(self.address), authkey=authkey) as listener:
+            print(f"✅ Model server listening on {self.address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """Answer requests from one worker until it disconnects"""
+        with conn:
+            while True:
+                try:
+                    frames, options = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    with self._model_lock:
+                        results = self.model(frames, **options)
+                    reply = ("ok", [results_to_array([result]) for result in results])
+                except Exception as e:
+                    reply = ("error", str(e))
+                conn.send(reply)
+
+
+class RemoteModel:
+    """
+    Client side of the model server, callable like a YOLO model
+
+    Each thread keeps its own connection, opened on first use and reopened
+    after a failure.
+
+    Args:
+        address: Socket path or (host, port) of the model server
+    """
+
+    def __init__(self, address=None):
+        self.address = address or Config.MODEL_SERVER_ADDRESS
+        self.authkey = _authkey()
+        self._local = threading.local()
+
+    def __call__(self, source, **options):
+        """
+        Run the model server on one frame or a list of frames
+
+        Args:
+            source: Frame or list of frames
+            **options: Model options such as conf and imgsz
+
+        Returns:
+            list: One detection array per frame
+        """
+        frames = source if isinstance(source, list) else [source]
+        conn = self._connection()
+        try:
+            conn.send((frames, options))
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            conn.close()
+            raise
+        if status != "ok":
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family=_family(self.address), authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+
+if __name__ == "__main__":
+    if not Config.MODEL_SERVER_ADDRESS:
+        print("❌ Set MODEL_SERVER_ADDRESS to the socket path to listen on")
+        sys.exit(1)
+    if not Config.MODEL_SERVER_AUTHKEY:
+        print("❌ Set MODEL_SERVER_AUTHKEY to a random secret shared with the app workers")
+        sys.exit(1)
+    try:
+        ModelServer().serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,81 @@
+"""
+Motion Gate Module
+Skips model inference while the camera scene stays the same
+"""
+
+import threading
+
+import cv2
+from config import Config
+
+
+class MotionGate:
+    """
+    Cheap scene-change detector placed in front of the model
+
+    Each frame is shrunk to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that went through the model. Inference runs
+    again only when the mean absolute difference exceeds the threshold or the
+    last result is older than the staleness limit.
+    """
+
+    def __init__(self, threshold=None, max_staleness=None, size=None):
+        self.threshold = Config.MOTION_THRESHOLD if threshold is None else threshold
+        self.max_staleness = Config.MOTION_MAX_STALENESS if max_staleness is None else max_staleness
+        self.size = size or Config.MOTION_THUMBNAIL_SIZE
+        self.inferred = 0
+        self.skipped = 0
+        self.last_difference = 0.0
+        self._reference = None
+        self._reference_time = 0.0
+        self._lock = threading.Lock()
+
+    def should_infer(self, frame, now):
+        """
+        Decide whether a frame needs a fresh model run
+
+        Args:
+            frame (np.ndarray): BGR frame
+            now (float): Timestamp of the frame in seconds
+
+        Returns:
+            bool: True if the model should run on this frame
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        thumbnail = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+
+        with self._lock:
+            if self._reference is None or now - self._reference_time >= self.max_staleness:
+                changed = True
+            else:
+                self.last_difference = float(cv2.absdiff(thumbnail, self._reference).mean())
+                changed = self.last_difference >= self.threshold
+
+            if changed:
+                self._reference = thumbnail
+                self._reference_time = now
+                self.inferred += 1
+            else:
+                self.skipped += 1
+            return changed
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always inferred"""
+        with self._lock:
+            self._reference = None
+
+    def stats(self):
+        """
+        Get how many frames were inferred and skipped
+
+        Returns:
+            dict: Gate statistics
+        """
+        with self._lock:
+            total = self.inferred + self.skipped
+            return {
+                "inferred": self.inferred,
+                "skipped": self.skipped,
+                "skip_ratio": round(self.skipped / total, 3) if total else 0.0,
+                "last_difference": round(self.last_difference, 2)
+            }
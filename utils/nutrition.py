@@ -0,0 +1,159 @@
+"""
+Nutrition Module
+Estimates calories and macronutrients of detections from a food table and their box size
+"""
+
+import csv
+
+import numpy as np
+from config import Config
+
+# Nutrient columns of the table, per serving
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+NUTRIENT_COLUMNS = ("calories", "protein_g", "carbs_g", "fat_g")
+
+UNKNOWN_CATEGORY = "Unknown"
+
+
+def round_nutrient(nutrient, value):
+    """Whole calories, macronutrients to a tenth of a gram"""
+    return int(round(value)) if nutrient == "calories" else round(float(value), 1)
+
+
+class NutritionTable:
+    """
+    Per-serving nutrition of hundreds of foods, held as NumPy arrays
+
+    Each row of the data file gives a food, its category, one serving and
+    the share of the frame such a serving covers at the usual camera
+    distance. A detection counts as its box area divided by that reference
+    area, so two pizza slices under one box count as two servings. Portions
+    are clamped to Config.PORTION_RANGE and rounded to Config.PORTION_STEP
+    so box jitter doesn't change the logged numbers from frame to frame.
+
+    Args:
+        path (str): CSV file, defaults to Config.NUTRITION_FILE
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.NUTRITION_FILE
+        with open(self.path, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+        self.foods = [row["food"] for row in rows]
+        self.servings = [row["serving"] for row in rows]
+        self.categories = sorted({row["category"] for row in rows}) + [UNKNOWN_CATEGORY]
+        category_index = {category: index for index, category in enumerate(self.categories)}
+
+        # Lookups ignore case, the model and the data file may differ in spelling
+        self.index = {food.lower(): index for index, food in enumerate(self.foods)}
+        # The last row is all zeros and stands for foods missing from the table
+        self.per_serving = np.zeros((len(rows) + 1, len(NUTRIENTS)), dtype=np.float32)
+        self.per_serving[:-1] = [[float(row[column]) for column in NUTRIENT_COLUMNS] for row in rows]
+        self.serving_area = np.ones(len(rows) + 1, dtype=np.float32)
+        self.serving_area[:-1] = [float(row["serving_area"]) for row in rows]
+        self.category_ids = np.full(len(rows) + 1, category_index[UNKNOWN_CATEGORY], dtype=np.intp)
+        self.category_ids[:-1] = [category_index[row["category"]] for row in rows]
+
+    def __len__(self):
+        return len(self.foods)
+
+    def __contains__(self, food):
+        return food.lower() in self.index
+
+    def lookup(self, foods):
+        """
+        Map food names to table rows
+
+        Args:
+            foods (list): Food names
+
+        Returns:
+            np.ndarray: Row per food, len(self) for unknown foods
+        """
+        missing = len(self.foods)
+        return np.fromiter(
+            (self.index.get(food.lower(), missing) for food in foods), dtype=np.intp, count=len(foods)
+        )
+
+    def portions(self, rows, boxes=None, frame_size=None):
+        """
+        Estimate servings from box areas
+
+        Args:
+            rows (np.ndarray): Table rows from lookup()
+            boxes (np.ndarray): Boxes of shape (N, 4) as x1, y1, x2, y2, NaN rows count as one serving
+            frame_size (tuple): Frame width and height, defaults to the camera frame size
+
+        Returns:
+            np.ndarray: Float32 servings per detection
+        """
+        if boxes is None or not Config.PORTION_ESTIMATION:
+            return np.ones(len(rows), dtype=np.float32)
+
+        width, height = frame_size or (Config.FRAME_WIDTH, Config.FRAME_HEIGHT)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        areas = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+        portions = areas / (width * height) / self.serving_area[rows]
+
+        step = Config.PORTION_STEP
+        portions = np.clip(np.round(portions / step) * step, *Config.PORTION_RANGE)
+        return np.where(np.isnan(portions), 1.0, portions).astype(np.float32)
+
+    def estimate(self, foods, boxes=None, frame_size=None):
+        """
+        Estimate the nutrients of every detection in one pass
+
+        Args:
+            foods (list): Food names
+            boxes (np.ndarray): Optional boxes of shape (N, 4)
+            frame_size (tuple): Frame width and height
+
+        Returns:
+            tuple: (rows, servings of shape (N,), nutrients of shape (N, 4) in NUTRIENTS order)
+        """
+        rows = self.lookup(foods)
+        portions = self.portions(rows, boxes, frame_size)
+        return rows, portions, self.per_serving[rows] * portions[:, None]
+
+    def totals(self, foods, boxes=None, frame_size=None):
+        """
+        Sum the nutrients of a batch of detections
+
+        Returns:
+            dict: Rounded total per nutrient
+        """
+        _, _, nutrients = self.estimate(foods, boxes, frame_size)
+        return {
+            nutrient: round_nutrient(nutrient, value) for nutrient, value in zip(NUTRIENTS, nutrients.sum(axis=0))
+        }
+
+    def summary(self, foods, boxes=None, frame_size=None):
+        """
+        Sum detections and nutrients per food category
+
+        Args:
+            foods (list): Food names
+            boxes (np.ndarray): Optional boxes of shape (N, 4)
+            frame_size (tuple): Frame width and height
+
+        Returns:
+            dict: Category -> count, foods and rounded nutrients, for categories present
+        """
+        rows, _, nutrients = self.estimate(foods, boxes, frame_size)
+        categories = self.category_ids[rows]
+        counts = np.bincount(categories, minlength=len(self.categories))
+        sums = np.stack([
+            np.bincount(categories, weights=nutrients[:, column], minlength=len(self.categories))
+            for column in range(len(NUTRIENTS))
+        ], axis=1)
+
+        summary = {}
+        for category_id in np.flatnonzero(counts):
+            entry = {"count": int(counts[category_id])}
+            entry.update(
+                (nutrient, round_nutrient(nutrient, value)) for nutrient, value in zip(NUTRIENTS, sums[category_id])
+            )
+            entry["foods"] = [food for food, category in zip(foods, categories) if category == category_id]
+            summary[self.categories[category_id]] = entry
+        return summary
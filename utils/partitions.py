@@ -0,0 +1,141 @@
+"""
+Partitions Module
+Keeps each user's or station's detection history in its own database
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from config import Config
+from utils.file_handler import FileHandler
+from utils.metrics import REGISTRY
+
+PARTITION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+OPEN_PARTITIONS = REGISTRY.gauge("storage_open_partitions", "Partitions with an open database and aggregate cache")
+
+
+class PartitionError(ValueError):
+    """Raised for a malformed user or station ID"""
+
+
+def partition_path(partition_id):
+    """
+    Get the database file of a partition
+
+    The default partition keeps using Config.DATABASE_FILE, so history logged
+    before partitioning stays where it is.
+
+    Args:
+        partition_id (str): User or station ID
+
+    Returns:
+        str: Path of the partition's SQLite database
+
+    Raises:
+        PartitionError: If the ID isn't 1-64 letters, digits, '_' or '-'
+    """
+    if not isinstance(partition_id, str) or not PARTITION_ID.match(partition_id):
+        raise PartitionError(f"Invalid user or station ID: {partition_id!r}")
+    if partition_id == Config.DEFAULT_USER_ID:
+        return Config.DATABASE_FILE
+    return os.path.join(Config.PARTITION_DIR, f"{partition_id}.db")
+
+
+class PartitionRegistry:
+    """
+    Owns one FileHandler per user or station
+
+    Each partition has its own SQLite file, write lock, change log and
+    aggregate cache. Logging and summaries only touch the data of one
+    partition, and writers of different partitions never wait on each
+    other. The most recently used partitions stay open. An evicted
+    partition's connection closes once the last request using it is done,
+    and its cache is rebuilt from that partition alone on next use.
+
+    Args:
+        on_change: Called with (partition ID, event, record) after every write
+        max_open (int): Partitions kept open, defaults to Config.MAX_OPEN_PARTITIONS
+    """
+
+    def __init__(self, on_change=None, max_open=None):
+        self.on_change = on_change
+        self.max_open = max_open or Config.MAX_OPEN_PARTITIONS
+        self._handlers = OrderedDict()
+        self._lock = threading.Lock()
+        OPEN_PARTITIONS.set_function(lambda: len(self._handlers))
+
+    def _change_callback(self, partition_id):
+        if self.on_change is None:
+            return None
+        return lambda event, record: self.on_change(partition_id, event, record)
+
+    def get(self, partition_id=None, create=False):
+        """
+        Get the FileHandler of a partition, opening it if needed
+
+        Args:
+            partition_id (str): User or station ID, defaults to Config.DEFAULT_USER_ID
+            create (bool): Create the partition's database if it doesn't exist yet, only
+                writes should, so reads for unknown IDs leave nothing on disk
+
+        Returns:
+            FileHandler: The partition's handler, or None if it doesn't exist and create is False
+
+        Raises:
+            PartitionError: If the ID is malformed
+        """
+        partition_id = partition_id or Config.DEFAULT_USER_ID
+        path = partition_path(partition_id)
+        with self._lock:
+            handler = self._handlers.get(partition_id)
+            if handler is not None:
+                self._handlers.move_to_end(partition_id)
+                return handler
+            if not create and partition_id != Config.DEFAULT_USER_ID and not os.path.exists(path):
+                return None
+
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = FileHandler(
+                on_change=self._change_callback(partition_id),
+                db_path=path,
+                partition_id=partition_id
+            )
+            self._handlers[partition_id] = handler
+            while len(self._handlers) > self.max_open:
+                # Requests still holding the handler keep its connection alive
+                self._handlers.popitem(last=False)
+            return handler
+
+    def ids(self):
+        """
+        List every partition with a database, the default one first
+
+        Returns:
+            list: Partition IDs
+        """
+        try:
+            names = os.listdir(Config.PARTITION_DIR)
+        except FileNotFoundError:
+            names = []
+        partition_ids = sorted(
+            name[:-3] for name in names if name.endswith(".db") and PARTITION_ID.match(name[:-3])
+        )
+        return [Config.DEFAULT_USER_ID] + [
+            partition_id for partition_id in partition_ids if partition_id != Config.DEFAULT_USER_ID
+        ]
+
+    def open_ids(self):
+        """Partitions currently open, least recently used first"""
+        with self._lock:
+            return list(self._handlers)
+
+    def close(self):
+        """Close every open partition"""
+        with self._lock:
+            handlers = list(self._handlers.values())
+            self._handlers.clear()
+        for handler in handlers:
+            handler.store.close()
@@ -0,0 +1,217 @@
+"""
+Profiler Module
+Samples the stacks of every thread and times spans around capture, inference, encoding and storage
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ContextDecorator
+
+from config import Config
+from utils.metrics import REGISTRY
+
+SPAN_SECONDS = REGISTRY.histogram("profile_span_seconds", "Time spent inside profiling spans", ["span"])
+
+# Leaf functions of threads that are waiting rather than working
+IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("socketserver.py", "serve_forever"),
+    ("queue.py", "get"),
+    ("socket.py", "readinto"),
+    ("socket.py", "accept"),
+}
+
+_active_spans = {}  # thread ident -> stack of (name, anchor frame, start time)
+
+
+class Span(ContextDecorator):
+    """
+    Named block of work, timed and marked in sampled stacks while profiling is on
+
+    Used as a context manager or decorator, the span shows up in collapsed
+    stacks right below the function that entered it. That makes time spent in
+    C calls such as cap.read or cv2.imencode visible, since they have no
+    Python frame of their own. With Config.PROFILING off a span does nothing.
+
+    Args:
+        name (str): Span name, keep it to a fixed set so the histogram stays small
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if Config.PROFILING:
+            self._push(sys._getframe(1))
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        """Open the span outside a with block, it is then shown at the root of the thread's stacks"""
+        if Config.PROFILING:
+            self._push(None)
+
+    def stop(self):
+        """Close the span and record its duration"""
+        stack = _active_spans.get(threading.get_ident())
+        if not stack or stack[-1][0] != self.name:
+            return
+        _, _, started = stack.pop()
+        if not stack:
+            _active_spans.pop(threading.get_ident(), None)
+        SPAN_SECONDS.labels(span=self.name).observe(time.perf_counter() - started)
+
+    def _push(self, frame):
+        _active_spans.setdefault(threading.get_ident(), []).append((self.name, frame, time.perf_counter()))
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a capture is requested while another one runs"""
+
+
+class Profile:
+    """
+    Result of one capture
+
+    Args:
+        stacks (Counter): Collapsed stack -> number of samples
+        spans (Counter): Span name -> number of samples taken inside it
+        samples (int): Sampling rounds taken
+        seconds (float): Wall time of the capture
+        overhead (float): Seconds spent taking samples
+    """
+
+    def __init__(self, stacks, spans, samples, seconds, overhead):
+        self.stacks = stacks
+        self.spans = spans
+        self.samples = samples
+        self.seconds = seconds
+        self.overhead = overhead
+
+    def collapsed(self):
+        """
+        Render the stacks in the collapsed format read by flamegraph.pl, speedscope and inferno
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top=20):
+        """
+        Summarize where the sampled threads spent their time
+
+        Args:
+            top (int): Number of most frequent stacks to include
+
+        Returns:
+            dict: Capture settings, share of samples per span and the top stacks
+        """
+        total = max(sum(self.stacks.values()), 1)
+        return {
+            "seconds": round(self.seconds, 3),
+            "samples": self.samples,
+            "overhead_ms_per_sample": round(self.overhead / max(self.samples, 1) * 1000, 3),
+            "spans": {name: round(count / total, 4) for name, count in self.spans.most_common()},
+            "top_stacks": [{"stack": stack, "count": count} for stack, count in self.stacks.most_common(top)]
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for all Python threads
+
+    A capture runs in the calling thread and reads sys._current_frames()
+    every interval, so nothing runs between captures and the profiled
+    threads are never interrupted. Only one capture runs at a time.
+
+    Args:
+        interval (float): Seconds between samples, defaults to Config.PROFILE_INTERVAL
+        max_depth (int): Innermost frames kept per stack, defaults to Config.PROFILE_MAX_DEPTH
+    """
+
+    def __init__(self, interval=None, max_depth=None):
+        self.interval = interval or Config.PROFILE_INTERVAL
+        self.max_depth = max_depth or Config.PROFILE_MAX_DEPTH
+        self._lock = threading.Lock()
+
+    def capture(self, seconds, include_idle=False):
+        """
+        Sample every other thread for a number of seconds
+
+        Args:
+            seconds (float): Capture duration
+            include_idle (bool): Keep samples of threads blocked in a wait
+
+        Returns:
+            Profile: The captured stacks
+
+        Raises:
+            ProfilerBusy: If another capture is running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being captured")
+        try:
+            return self._sample(seconds, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds, include_idle):
+        own = threading.get_ident()
+        stacks = Counter()
+        spans = Counter()
+        samples = 0
+        overhead = 0.0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            sample_started = time.perf_counter()
+            if sample_started >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                active = list(_active_spans.get(ident, ()))
+                stack = self._collapse(names.get(ident, str(ident)), frame, active, include_idle)
+                if stack is not None:
+                    stacks[stack] += 1
+                    spans.update({name for name, _, _ in active})
+            frame = None  # don't keep other threads' frames alive while sleeping
+            samples += 1
+            elapsed = time.perf_counter() - sample_started
+            overhead += elapsed
+            time.sleep(max(self.interval - elapsed, 0.0))
+        return Profile(stacks, spans, samples, time.perf_counter() - started, overhead)
+
+    def _collapse(self, thread_name, frame, active, include_idle):
+        """Turn one thread's frame chain into a collapsed stack, or None for an idle thread"""
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            frames.append(frame)
+            frame = frame.f_back
+        if not frames:
+            return None
+        leaf = frames[0].f_code
+        if not active and not include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FUNCTIONS:
+            return None
+
+        anchored = {}
+        parts = [thread_name.replace(";", ":")]
+        for name, anchor, _ in active:
+            if anchor is None:
+                parts.append(f"[{name}]")
+            else:
+                anchored.setdefault(id(anchor), []).append(name)
+        for frame in reversed(frames):
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            parts.extend(f"[{name}]" for name in anchored.get(id(frame), ()))
+        return ";".join(parts)
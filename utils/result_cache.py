@@ -0,0 +1,156 @@
+"""
+Result Cache Module
+Remembers detection results of uploaded images so exact repeats skip the model
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import Config
+from utils.metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter("result_cache_hits_total", "Frames answered from the result cache")
+CACHE_MISSES = REGISTRY.counter("result_cache_misses_total", "Frames that had to run through the model")
+
+# Rough per-entry overhead of the key, array header and dictionary slot in bytes
+ENTRY_OVERHEAD = 300
+
+
+def frame_digest(frame):
+    """
+    Hash the exact pixels of a frame
+
+    Only identical images share a digest. A cached answer is final for an
+    upload, so near-duplicates must run through the model themselves.
+
+    Args:
+        frame (np.ndarray): Decoded frame
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.blake2b(f"{frame.shape}:{frame.dtype}".encode(), digest_size=32)
+    # Hashed through the buffer protocol, which copies only frames that aren't contiguous
+    digest.update(np.ascontiguousarray(frame))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of filtered detection arrays with size and age limits
+
+    Keys combine the frame digest with everything else that changes the
+    result: model version, confidence threshold, input size and inference mode. Cached arrays
+    are read-only and shared between callers.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = Config.RESULT_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = Config.RESULT_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (stored at, detections)
+        self._lock = threading.Lock()
+
+        REGISTRY.gauge("result_cache_entries", "Frames held in the result cache").set_function(
+            lambda: len(self._entries)
+        )
+        REGISTRY.gauge("result_cache_bytes", "Approximate memory used by the result cache").set_function(
+            lambda: self.bytes
+        )
+
+    def key(self, frame, model_version, imgsz=None, mode=None):
+        """
+        Build the cache key of a frame
+
+        Args:
+            frame (np.ndarray): Input frame
+            model_version (str): Identifies the loaded backend and weights
+            imgsz (int): Model input size used for the frame
+            mode (str): Inference mode, full frame, tiled or regions of interest
+
+        Returns:
+            tuple: Cache key
+        """
+        return (frame_digest(frame), model_version, Config.CONFIDENCE_THRESHOLD, imgsz, mode)
+
+    def get(self, key, now=None):
+        """
+        Look up a result
+
+        Args:
+            key (tuple): Key from key()
+            now (float): Current monotonic time, defaults to now
+
+        Returns:
+            np.ndarray: Cached detections, or None on a miss
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                self._evict(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                CACHE_MISSES.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        CACHE_HITS.inc()
+        return entry[1]
+
+    def put(self, key, detections, now=None):
+        """
+        Store a result, evicting the least recently used entries beyond the size limit
+
+        Args:
+            key (tuple): Key from key()
+            detections (np.ndarray): Filtered detection array
+            now (float): Current monotonic time, defaults to now
+        """
+        if self.max_entries <= 0:
+            return
+        detections.flags.writeable = False
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (now, detections)
+            self.bytes += detections.nbytes + ENTRY_OVERHEAD
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop all entries, e.g. after the model changed"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Get hit rate and memory use
+
+        Returns:
+            dict: Cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes": self.bytes
+            }
+
+    def _evict(self, key):
+        _, detections = self._entries.pop(key)
+        self.bytes -= detections.nbytes + ENTRY_OVERHEAD
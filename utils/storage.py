@@ -0,0 +1,541 @@
+"""
+Storage Module
+SQLite storage engine for detection history, shared safely between workers
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    food TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    calories INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections (timestamp);
+CREATE INDEX IF NOT EXISTS idx_detections_day ON detections (day);
+CREATE INDEX IF NOT EXISTS idx_detections_food_timestamp ON detections (food, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    generation INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL
+);
+"""
+
+RECORD_COLUMNS = "id, timestamp, food, confidence, calories"
+
+# Maximum number of bound parameters per IN (...) list
+DELETE_CHUNK_SIZE = 500
+
+
+def empty_summary():
+    """Daily summary for a day without detections"""
+    return {
+        "total_calories": 0,
+        "foods": {},
+        "detection_count": 0
+    }
+
+
+def _row_to_record(row):
+    """Convert a detections row to the record format used by the API"""
+    return {
+        "id": row[0],
+        "timestamp": row[1],
+        "food": row[2],
+        "confidence": row[3],
+        "calories": row[4]
+    }
+
+
+def encode_cursor(timestamp, row_id):
+    """Turn the position of the last returned row into an opaque page cursor"""
+    return base64.urlsafe_b64encode(f"{timestamp}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Read a page cursor created by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return timestamp, int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class DetectionStore:
+    """
+    Detection history stored in SQLite using write-ahead logging
+
+    Every write runs in its own ``BEGIN IMMEDIATE`` transaction, which takes the
+    database write lock up front. Appends are atomic, and concurrent gunicorn
+    workers queue on the lock instead of overwriting each other's changes.
+    Daily summaries are aggregated from the day index, so a write never has to
+    touch more than the affected row.
+
+    Every write also appends the affected day to the ``changes`` table. Its row
+    ID is the store generation, which lets caches in other processes find out
+    which days to reload.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.DATABASE_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.DATABASE_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run statements in a write transaction holding the database lock
+
+        Yields:
+            sqlite3.Connection: Connection to execute statements on
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        """Run a read query and return all rows"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _record_change(self, conn, day):
+        """Append a change for ``day`` and return the new generation"""
+        generation = conn.execute("INSERT INTO changes (day) VALUES (?)", (day,)).lastrowid
+        if generation % Config.CHANGE_LOG_RETENTION == 0:
+            conn.execute(
+                "DELETE FROM changes WHERE generation <= ?",
+                (generation - Config.CHANGE_LOG_RETENTION,)
+            )
+        return generation
+
+    def file_stamp(self):
+        """
+        Get modification time and size of the database and its WAL file
+
+        Returns:
+            tuple: Stamp that changes whenever any process writes
+        """
+        stamp = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def changes_since(self, generation):
+        """
+        Get the days written since a generation
+
+        Args:
+            generation (int): Generation the caller is up to date with
+
+        Returns:
+            tuple: (current generation, changed days, complete) where complete
+                is False if the change log no longer reaches back that far
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                oldest, newest = self._conn.execute(
+                    "SELECT MIN(generation), MAX(generation) FROM changes"
+                ).fetchone()
+                days = self._conn.execute(
+                    "SELECT DISTINCT day FROM changes WHERE generation > ?", (generation,)
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        complete = oldest is None or generation >= oldest - 1
+        return newest or 0, [row[0] for row in days], complete
+
+    def aggregate_snapshot(self):
+        """
+        Get per-day, per-food aggregates of the whole history
+
+        Returns:
+            tuple: (generation, rows of day, food, count, calories)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                generation = self._conn.execute(
+                    "SELECT COALESCE(MAX(generation), 0) FROM changes"
+                ).fetchone()[0]
+                rows = self._conn.execute(
+                    "SELECT day, food, COUNT(*), SUM(calories) FROM detections "
+                    "GROUP BY day, food ORDER BY MIN(id)"
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        return generation, rows
+
+    def add(self, record):
+        """
+        Append a detection record
+
+        Args:
+            record (dict): Record with timestamp, food, confidence and calories
+
+        Returns:
+            tuple: (row ID of the stored record, store generation after the write)
+        """
+        day = record["timestamp"][:10]
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO detections (timestamp, day, food, confidence, calories) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    record["timestamp"], day, record["food"],
+                    record["confidence"], record["calories"]
+                )
+            )
+            return cursor.lastrowid, self._record_change(conn, day)
+
+    def _delete_where(self, *clauses):
+        """
+        Delete matching records in one transaction and log one change per affected day
+
+        Args:
+            *clauses: (condition, params) pairs, each run as its own statement
+
+        Returns:
+            tuple: (deleted records, store generation or None if nothing matched)
+        """
+        with self.transaction() as conn:
+            rows = []
+            for condition, params in clauses:
+                rows.extend(conn.execute(
+                    f"SELECT day, {RECORD_COLUMNS} FROM detections WHERE {condition}", params
+                ).fetchall())
+                conn.execute(f"DELETE FROM detections WHERE {condition}", params)
+            if not rows:
+                return [], None
+            generation = None
+            for day in sorted({row[0] for row in rows}):
+                generation = self._record_change(conn, day)
+        return [_row_to_record(row[1:]) for row in rows], generation
+
+    def delete(self, record_id):
+        """
+        Delete one record by its ID through a primary key lookup
+
+        Args:
+            record_id (int): ID of the record
+
+        Returns:
+            tuple: (deleted record or None if no record matched, store generation)
+        """
+        records, generation = self._delete_where(("id = ?", (record_id,)))
+        return (records[0] if records else None), generation
+
+    def delete_many(self, record_ids):
+        """
+        Delete several records by ID in one transaction
+
+        Args:
+            record_ids (list): IDs of the records, unknown IDs are ignored
+
+        Returns:
+            tuple: (deleted records, store generation or None if nothing matched)
+        """
+        record_ids = list(dict.fromkeys(int(record_id) for record_id in record_ids))
+        chunks = [
+            record_ids[i:i + DELETE_CHUNK_SIZE] for i in range(0, len(record_ids), DELETE_CHUNK_SIZE)
+        ]
+        return self._delete_where(*(
+            (f"id IN ({', '.join('?' * len(chunk))})", chunk) for chunk in chunks
+        ))
+
+    def delete_day(self, day):
+        """
+        Delete every record of one day
+
+        Args:
+            day (str): Date in YYYY-MM-DD format
+
+        Returns:
+            tuple: (deleted records, store generation or None if nothing matched)
+        """
+        return self._delete_where(("day = ?", (day,)))
+
+    def delete_by_timestamp(self, timestamp):
+        """
+        Delete the first record with the given timestamp
+
+        Kept for clients that still identify records by timestamp.
+
+        Args:
+            timestamp (str): ISO timestamp of the record
+
+        Returns:
+            tuple: (deleted record or None if no record matched, store generation)
+        """
+        records, generation = self._delete_where((
+            "id = (SELECT id FROM detections WHERE timestamp = ? ORDER BY id LIMIT 1)",
+            (timestamp,)
+        ))
+        return (records[0] if records else None), generation
+
+    def daily_summary(self, day):
+        """
+        Aggregate the detections of one day
+
+        Args:
+            day (str): Date in YYYY-MM-DD format
+
+        Returns:
+            dict: Daily summary data
+        """
+        rows = self._query(
+            "SELECT food, COUNT(*), SUM(calories) FROM detections WHERE day = ? "
+            "GROUP BY food ORDER BY MIN(id)",
+            (day,)
+        )
+        summary = empty_summary()
+        for food, count, calories in rows:
+            summary["foods"][food] = count
+            summary["detection_count"] += count
+            summary["total_calories"] += calories
+        return summary
+
+    def records_for_day(self, day):
+        """
+        Get all records of one day, newest first
+
+        Args:
+            day (str): Date in YYYY-MM-DD format
+
+        Returns:
+            list: Detection records
+        """
+        rows = self._query(
+            f"SELECT {RECORD_COLUMNS} FROM detections WHERE day = ? "
+            "ORDER BY timestamp DESC",
+            (day,)
+        )
+        return [_row_to_record(row) for row in rows]
+
+    def recent(self, limit):
+        """
+        Get the most recently logged records, oldest first
+
+        Args:
+            limit (int): Number of records to return
+
+        Returns:
+            list: Detection records
+        """
+        rows = self._query(
+            f"SELECT {RECORD_COLUMNS} FROM detections ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [_row_to_record(row) for row in reversed(rows)]
+
+    def _page(self, start, end, food, after, limit, descending):
+        """
+        Get one page of records in timestamp order using keyset pagination
+
+        The page continues strictly after the (timestamp, id) position of the
+        previous page, so each page is an index range scan no matter how deep
+        into the history it is.
+
+        Returns:
+            list: Rows of id followed by the record columns
+        """
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(end)
+        if food is not None:
+            conditions.append("food = ?")
+            params.append(food)
+        if after is not None:
+            timestamp, row_id = after
+            operator = "<" if descending else ">"
+            conditions.append(
+                f"timestamp {operator}= ? AND (timestamp {operator} ? OR id {operator} ?)"
+            )
+            params.extend([timestamp, timestamp, row_id])
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        order = "DESC" if descending else "ASC"
+        return self._query(
+            f"SELECT {RECORD_COLUMNS} FROM detections {where}"
+            f"ORDER BY timestamp {order}, id {order} LIMIT ?",
+            params + [limit]
+        )
+
+    def history(self, start=None, end=None, food=None, cursor=None, limit=50):
+        """
+        Get a page of records, newest first
+
+        Args:
+            start (str): Inclusive lower timestamp bound
+            end (str): Exclusive upper timestamp bound
+            food (str): Only return this food
+            cursor (str): next_cursor of the previous page
+            limit (int): Maximum number of records
+
+        Returns:
+            tuple: (records, cursor of the next page or None on the last page)
+        """
+        after = decode_cursor(cursor) if cursor else None
+        rows = self._page(start, end, food, after, limit + 1, descending=True)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        return [_row_to_record(row) for row in rows], next_cursor
+
+    def iter_records(self, start=None, end=None, food=None, chunk_size=1000):
+        """
+        Iterate over records oldest first, reading one chunk at a time
+
+        The database lock is only held while a chunk is read, so a long export
+        doesn't block writers.
+
+        Args:
+            start (str): Inclusive lower timestamp bound
+            end (str): Exclusive upper timestamp bound
+            food (str): Only return this food
+            chunk_size (int): Records read per query
+
+        Yields:
+            dict: Detection record
+        """
+        after = None
+        while True:
+            rows = self._page(start, end, food, after, chunk_size, descending=False)
+            for row in rows:
+                yield _row_to_record(row)
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1][1], rows[-1][0])
+
+    def totals(self):
+        """
+        Get all-time totals
+
+        Returns:
+            dict: total_calories, total_detections, days_tracked and food_counts
+        """
+        total_calories, total_detections, days_tracked = self._query(
+            "SELECT COALESCE(SUM(calories), 0), COUNT(*), COUNT(DISTINCT day) FROM detections"
+        )[0]
+        food_counts = self._query(
+            "SELECT food, COUNT(*) FROM detections GROUP BY food ORDER BY MIN(id)"
+        )
+        return {
+            "total_calories": total_calories,
+            "total_detections": total_detections,
+            "days_tracked": days_tracked,
+            "food_counts": dict(food_counts)
+        }
+
+    def get_meta(self, key, default=None):
+        """Read a value from the meta table"""
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_history(store, history_file=None):
+    """
+    Import the legacy detection_history.json into the store once
+
+    Daily summaries are not imported from calorie_logs.json, since they are
+    rebuilt from the history itself.
+
+    Args:
+        store (DetectionStore): Destination store
+        history_file (str): Path to the JSON history, defaults to Config.DETECTION_HISTORY_FILE
+
+    Returns:
+        int: Number of imported records, 0 if the migration already ran
+    """
+    history_file = history_file or Config.DETECTION_HISTORY_FILE
+
+    try:
+        with open(history_file, 'r') as f:
+            history = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        history = []
+
+    with store.transaction() as conn:
+        done = conn.execute(
+            "SELECT value FROM meta WHERE key = 'json_migrated_at'"
+        ).fetchone()
+        if done is not None:
+            return 0
+
+        conn.executemany(
+            "INSERT INTO detections (timestamp, day, food, confidence, calories) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    item["timestamp"],
+                    datetime.fromisoformat(item["timestamp"]).date().isoformat(),
+                    item["food"],
+                    item.get("confidence", 0.0),
+                    item.get("calories", 0)
+                )
+                for item in history
+            ]
+        )
+        for (day,) in conn.execute("SELECT DISTINCT day FROM detections").fetchall():
+            store._record_change(conn, day)
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('json_migrated_at', ?)",
+            (datetime.now().isoformat(),)
+        )
+    return len(history)
+
+
+if __name__ == '__main__':
+    os.makedirs(Config.DATA_DIR, exist_ok=True)
+    count = migrate_json_history(DetectionStore())
+    if count:
+        print(f"✅ Migrated {count} detections into {Config.DATABASE_FILE}")
+    else:
+        print(f"Nothing to migrate, {Config.DATABASE_FILE} is already up to date")
@@ -0,0 +1,152 @@
+"""
+Stream Controller Module
+Adapts inference size, JPEG quality and inference stride to hold a latency budget
+"""
+
+import threading
+import time
+
+from config import Config
+from utils.metrics import REGISTRY
+
+STREAM_SETTING = REGISTRY.gauge("stream_setting", "Current adaptive streaming setting", ["setting"])
+
+# Latencies below this share of the budget count as headroom for better quality
+HEADROOM = 0.6
+
+# Weight of the newest sample in the moving latency averages
+SMOOTHING = 0.3
+
+
+def _smooth(average, sample):
+    return sample if average is None else average + SMOOTHING * (sample - average)
+
+
+class StreamController:
+    """
+    Feedback controller for the live stream
+
+    The inference and encode stages report how long each call took. Every
+    adjustment interval the controller compares the smoothed latencies with
+    their budgets and moves one step at a time:
+
+    - inference over budget: smaller input size first, then a larger stride
+    - inference well under budget: smaller stride first, then a larger input size
+    - encoding over or well under budget: lower or raise the JPEG quality
+
+    After a change the affected average is reset, so the next decision is
+    based only on measurements taken with the new setting.
+    """
+
+    def __init__(self, inference_budget=None, encode_budget=None, enabled=None):
+        self.inference_budget = Config.INFERENCE_LATENCY_BUDGET if inference_budget is None else inference_budget
+        self.encode_budget = Config.ENCODE_LATENCY_BUDGET if encode_budget is None else encode_budget
+        self.enabled = Config.ADAPTIVE_STREAMING if enabled is None else enabled
+        self.imgsz_ladder = tuple(Config.IMGSZ_LADDER)
+        self.min_quality, self.max_quality = Config.JPEG_QUALITY_RANGE
+
+        self.imgsz_index = 0
+        self.jpeg_quality = self.max_quality
+        self.stride = 1
+        self.inference_latency = None
+        self.encode_latency = None
+        self.adjustments = 0
+        self._last_adjust = time.monotonic()
+        self._lock = threading.Lock()
+
+        STREAM_SETTING.labels(setting="imgsz").set_function(lambda: self.imgsz)
+        STREAM_SETTING.labels(setting="jpeg_quality").set_function(lambda: self.jpeg_quality)
+        STREAM_SETTING.labels(setting="stride").set_function(lambda: self.stride)
+
+    @property
+    def imgsz(self):
+        """Input size for the next inference"""
+        return self.imgsz_ladder[self.imgsz_index]
+
+    def should_infer(self, frame_number):
+        """
+        Check whether a captured frame should be sent to inference
+
+        Args:
+            frame_number (int): Running count of captured frames
+
+        Returns:
+            bool: True for every Nth frame, N being the current stride
+        """
+        return frame_number % self.stride == 0
+
+    def record_inference(self, seconds):
+        """Report the duration of one model call"""
+        with self._lock:
+            self.inference_latency = _smooth(self.inference_latency, seconds)
+            self._maybe_adjust()
+
+    def record_encode(self, seconds):
+        """Report the duration of one JPEG encode"""
+        with self._lock:
+            self.encode_latency = _smooth(self.encode_latency, seconds)
+            self._maybe_adjust()
+
+    def settings(self):
+        """
+        Get the current settings and measured latencies
+
+        Returns:
+            dict: Controller state
+        """
+        with self._lock:
+            return {
+                "adaptive": self.enabled,
+                "imgsz": self.imgsz,
+                "jpeg_quality": self.jpeg_quality,
+                "stride": self.stride,
+                "inference_latency_ms": _milliseconds(self.inference_latency),
+                "encode_latency_ms": _milliseconds(self.encode_latency),
+                "inference_budget_ms": _milliseconds(self.inference_budget),
+                "encode_budget_ms": _milliseconds(self.encode_budget),
+                "adjustments": self.adjustments
+            }
+
+    def _maybe_adjust(self):
+        """Move each setting one step if its stage is outside the budget"""
+        now = time.monotonic()
+        if not self.enabled or now - self._last_adjust < Config.ADAPT_INTERVAL:
+            return
+        self._last_adjust = now
+
+        if self.inference_latency is not None and self._adjust_inference(self.inference_latency):
+            self.inference_latency = None
+            self.adjustments += 1
+        if self.encode_latency is not None and self._adjust_encode(self.encode_latency):
+            self.encode_latency = None
+            self.adjustments += 1
+
+    def _adjust_inference(self, latency):
+        if latency > self.inference_budget:
+            if self.imgsz_index < len(self.imgsz_ladder) - 1:
+                self.imgsz_index += 1
+                return True
+            if self.stride < Config.MAX_INFERENCE_STRIDE:
+                self.stride += 1
+                return True
+        elif latency < self.inference_budget * HEADROOM:
+            if self.stride > 1:
+                self.stride -= 1
+                return True
+            if self.imgsz_index > 0:
+                self.imgsz_index -= 1
+                return True
+        return False
+
+    def _adjust_encode(self, latency):
+        if latency > self.encode_budget and self.jpeg_quality > self.min_quality:
+            self.jpeg_quality = max(self.jpeg_quality - Config.JPEG_QUALITY_STEP, self.min_quality)
+            return True
+        if latency < self.encode_budget * HEADROOM and self.jpeg_quality < self.max_quality:
+            self.jpeg_quality = min(self.jpeg_quality + Config.JPEG_QUALITY_STEP, self.max_quality)
+            return True
+        return False
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
@@ -0,0 +1,203 @@
+"""
+Tiling Module
+Splits large frames into tiles or regions of interest and merges their detections
+"""
+
+import numpy as np
+from config import Config
+from utils.detections import CLASS_COLUMN, CONF_COLUMN, empty_detections
+
+INFERENCE_MODES = ("full", "tiled", "roi")
+
+
+def _positions(length, tile, stride):
+    """Evenly spaced window starts covering an axis, the last one flush with the end"""
+    if length <= tile:
+        return np.zeros(1, dtype=np.int32)
+    count = int(np.ceil((length - tile) / stride)) + 1
+    return np.round(np.linspace(0, length - tile, count)).astype(np.int32)
+
+
+def tile_windows(width, height, tile_size=None, overlap=None):
+    """
+    Cover a frame with overlapping square tiles
+
+    Args:
+        width (int): Frame width
+        height (int): Frame height
+        tile_size (int): Tile side in frame pixels, defaults to Config.TILE_SIZE
+        overlap (float): Share of a tile shared with its neighbour, defaults to Config.TILE_OVERLAP
+
+    Returns:
+        np.ndarray: Int32 array of shape (T, 4) with x1, y1, x2, y2 per tile
+    """
+    tile_size = tile_size or Config.TILE_SIZE
+    overlap = Config.TILE_OVERLAP if overlap is None else overlap
+    stride = max(int(tile_size * (1 - overlap)), 1)
+
+    xs = _positions(width, tile_size, stride)
+    ys = _positions(height, tile_size, stride)
+    x1, y1 = np.meshgrid(xs, ys)
+    x1, y1 = x1.ravel(), y1.ravel()
+    return np.stack(
+        [x1, y1, np.minimum(x1 + tile_size, width), np.minimum(y1 + tile_size, height)], axis=1
+    ).astype(np.int32)
+
+
+def region_windows(width, height, regions=None):
+    """
+    Convert configured regions of interest to pixel windows
+
+    Args:
+        width (int): Frame width
+        height (int): Frame height
+        regions (list): (x1, y1, x2, y2) as fractions of the frame, defaults to Config.INFERENCE_REGIONS
+
+    Returns:
+        np.ndarray: Int32 array of shape (R, 4), the whole frame if no region is set
+    """
+    regions = Config.INFERENCE_REGIONS if regions is None else regions
+    if not len(regions):
+        return np.array([[0, 0, width, height]], dtype=np.int32)
+    windows = np.clip(np.asarray(regions, dtype=np.float64), 0.0, 1.0) * (width, height, width, height)
+    windows = np.round(windows).astype(np.int32)
+    return windows[(windows[:, 2] > windows[:, 0]) & (windows[:, 3] > windows[:, 1])]
+
+
+def frame_windows(frame, mode):
+    """
+    Get the crops one frame is split into for an inference mode
+
+    In tiled mode the whole frame is added as an extra window when
+    Config.TILE_INCLUDE_FULL_FRAME is set, so items larger than a tile are
+    still seen in one piece.
+
+    Args:
+        frame (np.ndarray): Input frame
+        mode (str): One of INFERENCE_MODES
+
+    Returns:
+        np.ndarray: Int32 array of shape (W, 4)
+    """
+    height, width = frame.shape[:2]
+    if mode == "roi":
+        return region_windows(width, height)
+    if mode == "tiled":
+        windows = tile_windows(width, height)
+        if len(windows) > 1 and Config.TILE_INCLUDE_FULL_FRAME:
+            windows = np.vstack([windows, [[0, 0, width, height]]]).astype(np.int32)
+        return windows
+    return np.array([[0, 0, width, height]], dtype=np.int32)
+
+
+def crop(frame, window):
+    """Get the view of a frame inside a window, without copying"""
+    x1, y1, x2, y2 = window
+    return frame[y1:y2, x1:x2]
+
+
+def pairwise_overlap(boxes):
+    """
+    Intersection over the smaller box of every pair
+
+    Unlike IoU this stays high when a box cut at a tile seam lies inside the
+    full box of the same item found in a neighbouring tile.
+
+    Args:
+        boxes (np.ndarray): Array of shape (N, 4) with x1, y1, x2, y2
+
+    Returns:
+        np.ndarray: Array of shape (N, N)
+    """
+    x1, y1, x2, y2 = (boxes[:, i] for i in range(4))
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    width = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    height = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    smaller = np.minimum(areas[:, None], areas[None, :])
+    return np.divide(width * height, smaller, out=np.zeros_like(smaller), where=smaller > 0)
+
+
+def nms(detections, threshold=None):
+    """
+    Class-aware non-maximum suppression on a detection array
+
+    The overlap of every pair is computed in one NumPy pass. The greedy pass
+    then only clears one row of a boolean mask per kept detection.
+
+    Args:
+        detections (np.ndarray): Detection array of shape (N, 6)
+        threshold (float): Overlap above which the weaker detection is dropped,
+            defaults to Config.TILE_MERGE_THRESHOLD
+
+    Returns:
+        np.ndarray: Kept detections, strongest first
+    """
+    threshold = Config.TILE_MERGE_THRESHOLD if threshold is None else threshold
+    if len(detections) < 2:
+        return detections
+
+    detections = detections[np.argsort(-detections[:, CONF_COLUMN], kind="stable")]
+    classes = detections[:, CLASS_COLUMN]
+    suppresses = (pairwise_overlap(detections[:, :4]) > threshold) & (classes[:, None] == classes[None, :])
+    # A detection can only suppress weaker ones
+    suppresses = np.triu(suppresses, k=1)
+
+    keep = np.ones(len(detections), dtype=bool)
+    for index in range(len(detections)):
+        if keep[index]:
+            keep &= ~suppresses[index]
+    return detections[keep]
+
+
+def touches_seam(detections, window, width, height, margin=2):
+    """
+    Find detections cut off by a window edge that lies inside the frame
+
+    Args:
+        detections (np.ndarray): Detection array in window coordinates
+        window (np.ndarray): x1, y1, x2, y2 of the window in the frame
+        width (int): Frame width
+        height (int): Frame height
+        margin (int): Distance from the edge in pixels that still counts as touching
+
+    Returns:
+        np.ndarray: Boolean mask of cut detections
+    """
+    x1, y1, x2, y2 = window
+    return (
+        ((detections[:, 0] <= margin) & (x1 > 0))
+        | ((detections[:, 1] <= margin) & (y1 > 0))
+        | ((detections[:, 2] >= x2 - x1 - margin) & (x2 < width))
+        | ((detections[:, 3] >= y2 - y1 - margin) & (y2 < height))
+    )
+
+
+def merge_windows(arrays, windows, width, height):
+    """
+    Shift per-window detections back to frame coordinates and merge duplicates
+
+    When one window is the whole frame, detections cut off by a seam of
+    another window are dropped: overlapping tiles see every small item whole,
+    and the full-frame window sees the large ones whole.
+
+    Args:
+        arrays (list): Detection array of each window
+        windows (np.ndarray): Windows the arrays were detected in
+        width (int): Frame width
+        height (int): Frame height
+
+    Returns:
+        np.ndarray: Merged detection array in frame coordinates
+    """
+    full = np.all(windows == (0, 0, width, height), axis=1)
+    shifted = []
+    for detections, window, is_full in zip(arrays, windows, full):
+        if full.any() and not is_full:
+            detections = detections[~touches_seam(detections, window, width, height)]
+        if len(detections):
+            shifted.append(np.hstack([detections[:, :4] + np.tile(window[:2], 2), detections[:, 4:]]))
+    if not shifted:
+        return empty_detections()
+    if len(shifted) == 1:
+        return shifted[0].astype(np.float32, copy=False)
+    return nms(np.concatenate(shifted).astype(np.float32, copy=False))
@@ -0,0 +1,269 @@
+"""
+Detection Tracker Module
+Follows detected food items across frames with stable track IDs
+"""
+
+import itertools
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+from config import Config
+from utils.detections import integer_boxes
+
+
+class Track:
+    """A single food item followed across frames"""
+
+    __slots__ = (
+        "track_id", "class_id", "food", "confidence", "bbox",
+        "first_seen", "last_seen", "hits", "confirmed"
+    )
+
+    def __init__(self, track_id, class_id, food, confidence, bbox, now):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.food = food
+        self.confidence = confidence
+        self.bbox = bbox
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.confirmed = False
+
+    def age(self, now):
+        """Seconds since the track was created"""
+        return now - self.first_seen
+
+    def to_dict(self):
+        """
+        Get the track as a JSON serializable dict
+
+        Returns:
+            dict: Track data
+        """
+        return {
+            "track_id": self.track_id,
+            "food": self.food,
+            "confidence": self.confidence,
+            "bbox": self.bbox,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "hits": self.hits,
+            "confirmed": self.confirmed
+        }
+
+
+class TrackStore(ABC):
+    """
+    Storage interface for active tracks
+
+    Implementations must keep tracks ordered by ``last_seen`` so that expired
+    tracks can be removed from the front without scanning the others.
+    """
+
+    @abstractmethod
+    def add(self, track):
+        """Store a new track"""
+
+    @abstractmethod
+    def get(self, track_id):
+        """Get a track by ID, or None if it isn't stored"""
+
+    @abstractmethod
+    def touch(self, track):
+        """Mark a track as the most recently seen one"""
+
+    @abstractmethod
+    def expire(self, cutoff):
+        """Remove and return tracks last seen before ``cutoff``"""
+
+    @abstractmethod
+    def tracks(self):
+        """All stored tracks, least recently seen first"""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of stored tracks"""
+
+
+class InMemoryTrackStore(TrackStore):
+    """Track store backed by an OrderedDict kept in last-seen order"""
+
+    def __init__(self):
+        self._tracks = OrderedDict()
+
+    def add(self, track):
+        self._tracks[track.track_id] = track
+
+    def get(self, track_id):
+        return self._tracks.get(track_id)
+
+    def touch(self, track):
+        self._tracks.move_to_end(track.track_id)
+
+    def expire(self, cutoff):
+        expired = []
+        while self._tracks:
+            track = next(iter(self._tracks.values()))
+            if track.last_seen >= cutoff:
+                break
+            expired.append(self._tracks.popitem(last=False)[1])
+        return expired
+
+    def tracks(self):
+        return list(self._tracks.values())
+
+    def __len__(self):
+        return len(self._tracks)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Compute pairwise intersection over union
+
+    Args:
+        boxes_a (np.ndarray): Boxes of shape (M, 4) as x1, y1, x2, y2
+        boxes_b (np.ndarray): Boxes of shape (N, 4) as x1, y1, x2, y2
+
+    Returns:
+        np.ndarray: IoU matrix of shape (M, N)
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class DetectionTracker:
+    """
+    IoU and centroid based multi-object tracker
+
+    Detections are matched to existing tracks of the same class by IoU. Pairs
+    with little overlap still match when their centres are close relative to
+    the track size, which keeps IDs stable while an item is being moved.
+    """
+
+    def __init__(self, store=None, iou_threshold=None, centroid_threshold=None,
+                 max_age=None, confirm_after=None):
+        self.store = store if store is not None else InMemoryTrackStore()
+        self.iou_threshold = Config.TRACK_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+        self.centroid_threshold = (
+            Config.TRACK_CENTROID_THRESHOLD if centroid_threshold is None else centroid_threshold
+        )
+        self.max_age = Config.TRACK_MAX_AGE if max_age is None else max_age
+        self.confirm_after = Config.TRACK_CONFIRM_SECONDS if confirm_after is None else confirm_after
+        self._next_id = itertools.count(1)
+
+    def update(self, detections, names, now):
+        """
+        Match detections to tracks, creating tracks for unmatched detections
+
+        Args:
+            detections (np.ndarray): Filtered detection array of shape (N, 6)
+            names (list): Food name per detection
+            now (float): Timestamp of the frame in seconds
+
+        Returns:
+            list: Track matched to each detection, in detection order
+        """
+        self.store.expire(now - self.max_age)
+
+        tracks = self.store.tracks()
+        assigned = [None] * len(detections)
+        if tracks and len(detections):
+            for track_index, det_index in self._assign(tracks, detections):
+                assigned[det_index] = tracks[track_index]
+
+        boxes = integer_boxes(detections).tolist()
+        confidences = detections[:, 4].tolist()
+        class_ids = detections[:, 5].astype(np.int32).tolist()
+
+        for det_index, track in enumerate(assigned):
+            bbox = boxes[det_index]
+            confidence = confidences[det_index]
+            if track is None:
+                track = Track(
+                    next(self._next_id), class_ids[det_index],
+                    names[det_index], confidence, bbox, now
+                )
+                self.store.add(track)
+                assigned[det_index] = track
+            else:
+                track.bbox = bbox
+                track.confidence = confidence
+                track.last_seen = now
+                track.hits += 1
+                self.store.touch(track)
+
+        return assigned
+
+    def is_pending(self, track, now):
+        """
+        Check whether a track has been visible long enough to offer for logging
+
+        Args:
+            track (Track): Track to check
+            now (float): Current timestamp in seconds
+
+        Returns:
+            bool: True if the track is old enough and not yet confirmed
+        """
+        return not track.confirmed and track.age(now) >= self.confirm_after
+
+    def confirm(self, track_id):
+        """
+        Mark a track as confirmed so it is no longer reported as pending
+
+        Args:
+            track_id (int): ID of the track
+
+        Returns:
+            bool: True if the track exists
+        """
+        track = self.store.get(track_id)
+        if track is None:
+            return False
+        track.confirmed = True
+        return True
+
+    def _assign(self, tracks, detections):
+        """Greedily pair tracks and detections by descending match score"""
+        track_boxes = np.array([track.bbox for track in tracks], dtype=np.float32)
+        track_classes = np.array([track.class_id for track in tracks])
+        det_boxes = detections[:, :4]
+
+        scores = iou_matrix(track_boxes, det_boxes)
+
+        # Fall back to centroid distance, normalised by the track diagonal
+        track_centres = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        det_centres = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+        diagonals = np.hypot(*(track_boxes[:, 2:] - track_boxes[:, :2]).T)
+        distances = np.linalg.norm(track_centres[:, None, :] - det_centres[None, :, :], axis=2)
+        distances /= np.maximum(diagonals, 1.0)[:, None]
+
+        overlapping = scores >= self.iou_threshold
+        near = distances < self.centroid_threshold
+        same_class = track_classes[:, None] == detections[:, 5].astype(track_classes.dtype)[None, :]
+
+        # Centroid-only matches get a negative score so they rank below any IoU match
+        scores = np.where(overlapping, scores, -distances)
+        candidates = np.flatnonzero((overlapping | near) & same_class)
+        order = candidates[np.argsort(-scores.ravel()[candidates], kind="stable")]
+
+        pairs = []
+        used_tracks = set()
+        used_detections = set()
+        for flat_index in order.tolist():
+            track_index, det_index = divmod(flat_index, scores.shape[1])
+            if track_index in used_tracks or det_index in used_detections:
+                continue
+            used_tracks.add(track_index)
+            used_detections.add(det_index)
+            pairs.append((track_index, det_index))
+        return pairs